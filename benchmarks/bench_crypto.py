@@ -0,0 +1,48 @@
+# bench_crypto.py - сравнение поштучной и пакетной расшифровки паролей
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.security import EncryptionManager
+
+
+def measure(label, func, count):
+    """Запускает func и печатает время и пропускную способность"""
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed * 1000:9.1f} мс  {count / elapsed:10.0f} операций/с")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк шифрования паролей")
+    parser.add_argument('--count', type=int, default=20_000, help="количество паролей")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        encryption = EncryptionManager(key_path=os.path.join(directory, 'bench.key'))
+        passwords = [f"password-{i:08d}" for i in range(args.count)]
+        tokens = [result.value for result in encryption.encrypt_many(passwords)]
+
+        print(f"\nПаролей: {args.count}, CPU: {os.cpu_count()}")
+        loop = measure("encrypt_password (цикл)",
+                       lambda: [encryption.encrypt_password(p) for p in passwords], args.count)
+        batch = measure("encrypt_many", lambda: encryption.encrypt_many(passwords), args.count)
+        print(f"{'ускорение':<32} {loop / batch:9.2f}x")
+
+        loop = measure("decrypt_password (цикл)",
+                       lambda: [encryption.decrypt_password(t) for t in tokens], args.count)
+        batch = measure("decrypt_many", lambda: encryption.decrypt_many(tokens), args.count)
+        print(f"{'ускорение':<32} {loop / batch:9.2f}x")
+
+        results = encryption.decrypt_many(tokens)
+        assert [result.value for result in results] == passwords
+
+
+if __name__ == "__main__":
+    main()
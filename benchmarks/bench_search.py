@@ -0,0 +1,92 @@
+# bench_search.py - замер задержки поиска на большом количестве записей
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль отсортированного списка"""
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def measure(label, func, terms):
+    """Запускает func для каждого запроса и печатает задержки"""
+    timings = []
+    found = 0
+    for term in terms:
+        started = time.perf_counter()
+        result = func(term)
+        timings.append((time.perf_counter() - started) * 1000)
+        found += len(result)
+    timings.sort()
+    print(f"{label:<28} p50={percentile(timings, 0.50):8.3f} мс  "
+          f"p95={percentile(timings, 0.95):8.3f} мс  "
+          f"max={timings[-1]:8.3f} мс  найдено={found}")
+
+
+def check_fulltext(db, terms):
+    """Проверяет, что отбор по FULLTEXT-индексу не теряет строк:
+    MATCH + LIKE должен находить то же, что LIKE без индекса.
+    Возвращает список запросов, для которых результаты различаются.
+    """
+    backend = db.backend
+    mismatched = []
+    for term in terms:
+        condition, params = backend.search_condition(term, 'substring', fulltext=False)
+        expected = backend.query(f"SELECT id FROM passwords WHERE {condition}", params)
+        found = backend.query(
+            f"SELECT id FROM passwords WHERE MATCH(service, username) AGAINST (%s IN BOOLEAN MODE) AND ({condition})",
+            [f'"{term}"'] + params
+        )
+        if {row['id'] for row in found} != {row['id'] for row in expected}:
+            mismatched.append(term)
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска паролей в базе данных (таблица должна быть заполнена)")
+    parser.add_argument('--queries', type=int, default=200, help="количество запросов каждого вида")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    if not db.pool:
+        return 1
+    db.ensure_search_indexes()
+
+    rows = db.get_passwords_page(10_000)
+    if not rows:
+        print("[ERROR] Таблица passwords пуста")
+        db.close()
+        return 1
+    rng = random.Random(7)
+    samples = [rng.choice(rows) for _ in range(args.queries)]
+    prefix_terms = [row['service'][:3] for row in samples]
+    substring_terms = [row['username'][2:6] for row in samples]
+
+    print(f"Записей: {db.count_passwords()}, запросов: {args.queries}")
+
+    measure("prefix", lambda term: db.search_passwords(term, mode='prefix'), prefix_terms)
+    measure("substring", lambda term: db.search_passwords(term), substring_terms)
+
+    if db.fulltext_available:
+        # Термины с n-граммами из стоп-слов ('ma', 'ai', 'il' содержат 'a', 'i')
+        terms = ['mail', 'gmail', 'is', 'of'] + [term for term in substring_terms if term.isalnum()][:50]
+        mismatched = check_fulltext(db, terms)
+        if mismatched:
+            print(f"[ERROR] MATCH + LIKE теряет строки для запросов: {', '.join(mismatched)}")
+            db.close()
+            return 1
+        print(f"[SUCCESS] MATCH + LIKE совпадает с LIKE для {len(terms)} запросов")
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+# bench_vault.py - задержки и пропускная способность основных операций хранилища
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.vault import SIZES, make_records, open_vault
+
+# Ухудшение p50 или пропускной способности больше этой доли - регрессия
+DEFAULT_THRESHOLD = 0.10
+# Размер страницы, если GUI недоступен (в GUI - VIEW_PAGE_SIZE)
+DEFAULT_PAGE_SIZE = 200
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль отсортированного списка"""
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def measure(operation, func, args_list, size=None):
+    """Вызывает func для каждого набора аргументов; возвращает сводку.
+
+    Сообщения модулей (print) на время замера подавляются.
+    """
+    timings = []
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        for args in args_list:
+            call_started = time.perf_counter()
+            func(*args)
+            timings.append((time.perf_counter() - call_started) * 1000)
+        elapsed = time.perf_counter() - started
+
+    timings.sort()
+    result = {
+        'operation': operation,
+        'size': size,
+        'calls': len(timings),
+        'seconds': elapsed,
+        'ops_per_second': len(timings) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        'max_ms': timings[-1],
+    }
+    print(f"{size or '-':>9} {operation:<32} p50={result['p50_ms']:9.3f} мс  p95={result['p95_ms']:9.3f} мс  "
+          f"p99={result['p99_ms']:9.3f} мс  {result['ops_per_second']:10.0f} оп/с")
+    return result
+
+
+def make_view_renderer():
+    """Возвращает функцию отрисовки страницы таблицы кодом GUI
+    (PasswordManagerGUI.append_view_page) или None без дисплея / Tk
+    """
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        from types import SimpleNamespace
+
+        from src.gui import VIEW_PAGE_SIZE, PasswordManagerGUI
+
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        print(f"[INFO] Отрисовка таблицы не замеряется: {e}")
+        return None
+
+    view = SimpleNamespace(
+        view_tree=ttk.Treeview(root, columns=('service', 'username', 'password', 'created_at'), show='headings'),
+        view_rows={}, view_loaded=0, view_total=0, view_loading=False, view_last_key=None
+    )
+
+    def render(rows):
+        view.view_tree.delete(*view.view_tree.get_children())
+        view.view_rows.clear()
+        PasswordManagerGUI.append_view_page(view, rows)
+        root.update_idletasks()
+
+    render.page_size = VIEW_PAGE_SIZE
+    return render
+
+
+def bench_crypto(encryption, calls):
+    """Шифрование не зависит от размера хранилища - замеряется один раз"""
+    passwords = [password for _, _, password in make_records(calls, seed=1)]
+    tokens = [encryption.encrypt_password(password) for password in passwords]
+    return [
+        measure("encrypt_password", encryption.encrypt_password, [(p,) for p in passwords]),
+        measure("decrypt_password", encryption.decrypt_password, [(t,) for t in tokens]),
+        measure("encrypt_many[1000]", encryption.encrypt_many,
+                [(passwords[i:i + 1000],) for i in range(0, len(passwords), 1000)]),
+        measure("decrypt_many[1000]", encryption.decrypt_many,
+                [(tokens[i:i + 1000],) for i in range(0, len(tokens), 1000)]),
+    ]
+
+
+def bench_size(db, encryption, size, calls, render=None, page_size=DEFAULT_PAGE_SIZE):
+    """Операции с хранилищем из size записей.
+
+    Записи, добавленные замером вставки, затем удаляются замером
+    удаления - хранилище остается пригодным для следующего запуска.
+    """
+    rng = random.Random(size)
+    full_scans = max(1, min(5, 1_000_000 // size))
+
+    rows = []
+    results = [measure("get_all_passwords", lambda: rows.append(db.get_all_passwords()),
+                       [()] * full_scans, size)]
+    accounts = [(row['service'], row['username']) for row in rng.sample(rows[-1], min(calls, len(rows[-1])))]
+    del rows[:]
+
+    results.append(measure("count_passwords", db.count_passwords, [()] * calls, size))
+    results.append(measure("get_passwords_page[first]", db.get_passwords_page, [(page_size,)] * calls, size))
+    results.append(measure("get_passwords_page[keyset]", lambda after: db.get_passwords_page(page_size, after=after),
+                           [(account,) for account in accounts], size))
+    results.append(measure("get_password", db.get_password, accounts, size))
+    results.append(measure("search_passwords[prefix]", lambda term: db.search_passwords(term, mode='prefix'),
+                           [(service[:3],) for service, _ in accounts], size))
+    results.append(measure("search_passwords[substring]", db.search_passwords,
+                           [(username[2:6],) for _, username in accounts], size))
+
+    tokens = [result.value for result in encryption.encrypt_many([f"updated-{i}" for i in range(len(accounts))])]
+    results.append(measure("add_or_update_password[update]", db.add_or_update_password,
+                           [(service, username, token) for (service, username), token in zip(accounts, tokens)], size))
+    new_accounts = [(f"bench-{i}.local", f"user{i}") for i in range(len(accounts))]
+    results.append(measure("add_or_update_password[insert]", db.add_or_update_password,
+                           [account + (token,) for account, token in zip(new_accounts, tokens)], size))
+    results.append(measure("delete_password", db.delete_password, new_accounts, size))
+
+    version = db.get_change_version()
+    results.append(measure("get_changes", db.get_changes, [(max(0, version - page_size),)] * calls, size))
+
+    if render is not None:
+        pages = [(db.get_passwords_page(page_size, after=account),) for account in accounts[:max(1, calls // 10)]]
+        results.append(measure(f"render_view_page[{page_size}]", render, pages, size))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Сравнивает результаты с сохраненными; возвращает список регрессий"""
+    previous = {(item['size'], item['operation']): item for item in baseline['results']}
+    regressions = []
+    print(f"\nСравнение с {baseline.get('revision') or 'базовой версией'} ({baseline.get('timestamp')}):")
+    for item in results:
+        old = previous.get((item['size'], item['operation']))
+        if old is None:
+            continue
+        latency = item['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] > 0 else 0.0
+        throughput = item['ops_per_second'] / old['ops_per_second'] - 1 if old['ops_per_second'] > 0 else 0.0
+        regressed = latency > threshold or throughput < -threshold
+        if regressed:
+            regressions.append(item)
+        print(f"{item['size'] or '-':>9} {item['operation']:<32} p50 {latency:+7.1%}  "
+              f"оп/с {throughput:+7.1%}" + ("  РЕГРЕССИЯ" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк операций хранилища паролей")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES[:3]),
+                        help=f"размеры синтетического хранилища (например {' '.join(map(str, SIZES))})")
+    parser.add_argument('--engine', choices=('sqlite', 'mysql'), default='sqlite',
+                        help="sqlite - встроенный файл; mysql - тестовая база из config.config (будет очищена)")
+    parser.add_argument('--calls', type=int, default=200, help="вызовов каждой точечной операции")
+    parser.add_argument('--vault-dir', help="каталог для файлов хранилищ (повторно используются между запусками)")
+    parser.add_argument('--output', help="сохранить результаты в JSON")
+    parser.add_argument('--compare', help="JSON с предыдущими результатами для сравнения")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое ухудшение при сравнении (доля)")
+    parser.add_argument('--no-render', action='store_true', help="не замерять отрисовку таблицы")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        directory = args.vault_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(directory, exist_ok=True)
+        render = None if args.no_render else make_view_renderer()
+
+        print(f"CPU: {os.cpu_count()}, хранилище: {args.engine}, вызовов: {args.calls}")
+        results = []
+        for size in args.sizes:
+            def report(rows, seconds):
+                print(f"\r[INFO] Генерация хранилища: {rows}/{size} ({rows / seconds:.0f} записей/с)",
+                      end='', flush=True, file=sys.stderr)
+
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                db, encryption = open_vault(size, directory, engine=args.engine, progress=report)
+            print(file=sys.stderr)
+            try:
+                if not results:
+                    results.extend(bench_crypto(encryption, max(args.calls, 1000)))
+                results.extend(bench_size(db, encryption, size, args.calls, render=render,
+                                          page_size=getattr(render, 'page_size', DEFAULT_PAGE_SIZE)))
+            finally:
+                with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                    db.close()
+
+    document = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'engine': args.engine,
+        'calls': args.calls,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(document, output_file, ensure_ascii=False, indent=2)
+        print(f"[INFO] Результаты сохранены: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        if regressions:
+            print(f"[ERROR] Регрессий: {len(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
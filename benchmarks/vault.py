@@ -0,0 +1,80 @@
+# vault.py - синтетическое хранилище паролей для бенчмарков
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager
+from src.security import EncryptionManager
+from src.storage.sqlite import SQLiteBackend
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DOMAINS = ('com', 'net', 'org', 'io', 'ru', 'dev')
+PASSWORD_CHARS = string.ascii_letters + string.digits + "!@#$%^&*"
+
+
+def make_records(count, seed=42):
+    """Генерирует count различных записей (service, username, password).
+
+    Записи детерминированы seed: один и тот же размер дает одно и то же
+    хранилище, поэтому результаты разных версий сравнимы.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        name = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+        user = ''.join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(rng.randint(6, 14)))
+        password = ''.join(rng.choice(PASSWORD_CHARS) for _ in range(rng.randint(10, 20)))
+        # Номер в имени пользователя гарантирует уникальность (service, username)
+        yield f"{name}.{rng.choice(DOMAINS)}", f"{user}{i}@mail.{rng.choice(DOMAINS)}", password
+
+
+def populate(db, encryption, count, batch_size=5000, seed=42, progress=None):
+    """Заполняет хранилище count синтетическими записями; возвращает время, с"""
+    started = time.perf_counter()
+    written = 0
+    batch = []
+
+    def flush():
+        nonlocal written
+        results = encryption.encrypt_many([password for _, _, password in batch])
+        db.bulk_upsert([(service, username, result.value)
+                        for (service, username, _), result in zip(batch, results)], chunk_size=batch_size)
+        written += len(batch)
+        if progress is not None:
+            progress(written, time.perf_counter() - started)
+
+    for record in make_records(count, seed=seed):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+    if batch:
+        flush()
+    return time.perf_counter() - started
+
+
+def open_vault(count, directory, engine='sqlite', progress=None):
+    """Возвращает (db, encryption) с хранилищем из count записей.
+
+    engine='sqlite' - встроенный файл SQLite в directory; готовый файл
+    нужного размера используется повторно (генерация 1M записей занимает
+    минуты). engine='mysql' - база из config.config: таблица очищается и
+    заполняется заново, поэтому нужна отдельная тестовая база.
+    """
+    encryption = EncryptionManager(key_path=os.path.join(directory, 'bench.key'))
+
+    if engine == 'sqlite':
+        path = os.path.join(directory, f'vault-{count}.sqlite3')
+        db = DatabaseManager(backend=SQLiteBackend(path))
+    else:
+        db = DatabaseManager()
+    if not db.pool or not db.create_table():
+        raise RuntimeError("Не удалось подготовить хранилище для бенчмарка")
+
+    if db.count_passwords() != count:
+        db.backend.execute("DELETE FROM passwords")
+        populate(db, encryption, count, progress=progress)
+    return db, encryption
@@ -10,4 +10,79 @@ DB_CONFIG = {
     'database': 'password_manager',
     'charset': 'utf8mb4',
     'cursorclass': 'pymysql.cursors.DictCursor'
-}
\ No newline at end of file
+}
+
+# Хранилище (необязательно, по умолчанию MySQL с параметрами DB_CONFIG).
+# 'sqlite' - встроенная база в одном файле: сервер не нужен, запросы
+# выполняются без сетевых задержек; подходит для одного пользователя
+STORAGE_CONFIG = {
+    'engine': 'mysql',             # 'mysql' или 'sqlite'
+    'path': 'passwords.sqlite3'    # файл базы для 'sqlite'
+}
+
+# Пул соединений с БД (необязательно)
+POOL_CONFIG = {
+    'max_size': 5,                 # максимум одновременно открытых соединений
+    'idle_timeout': 300,           # закрывать соединения, простаивающие дольше, с
+    'health_check_interval': 30,   # проверять соединение ping'ом после простоя, с
+    'checkout_timeout': 10         # ожидание свободного соединения, с
+}
+
+# Кэш расшифрованных паролей в памяти (необязательно, по умолчанию выключен)
+SECRET_CACHE_CONFIG = {
+    'enabled': False,
+    'max_entries': 256,            # максимум паролей в кэше
+    'ttl': 60                      # время жизни пароля в кэше, с
+}
+
+# Локальная копия хранилища в SQLite (необязательно, по умолчанию выключена).
+# Просмотр и поиск работают без сетевых задержек и без связи с сервером;
+# изменения, сделанные офлайн, отправляются при следующей синхронизации
+REPLICA_CONFIG = {
+    'enabled': False,
+    'path': 'replica.sqlite3',     # файл реплики (пароли в нем зашифрованы)
+    'sync_interval': 30            # период синхронизации с сервером, с
+}
+
+# Мастер-пароль (необязательно, по умолчанию выключен). Ключ выводится из
+# мастер-пароля через scrypt и хранится только в памяти, файл ключей
+# encryption.key шифруется им. Параметры scrypt подбираются при первом
+# запуске под целевое время разблокировки и сохраняются вместе с солью
+MASTER_PASSWORD_CONFIG = {
+    'enabled': False,
+    'kdf_path': 'master.kdf',      # файл с солью и параметрами KDF
+    'target_ms': 500,              # целевое время разблокировки, мс
+    'max_memory_mb': 256           # предел памяти scrypt, МБ
+}
+
+# Генератор паролей (кнопка "Сгенерировать")
+GENERATOR_CONFIG = {
+    'mode': 'password',            # 'password' или 'passphrase'
+    'length': 16,                  # длина пароля
+    'symbols': True,               # спецсимволы
+    'exclude_lookalikes': True,    # без похожих символов (l, 1, O, 0...)
+    'required': ''                 # символы, обязательные в каждом пароле
+    # для 'passphrase': 'words': 6, 'separator': '-', 'capitalize': False, 'add_number': False
+}
+
+# Метрики времени операций (БД, шифрование, интерфейс); вкладка "Диагностика"
+METRICS_CONFIG = {
+    'enabled': True,
+    'export_path': None,           # например 'metrics.json' или 'metrics.prom' (Prometheus)
+    'export_interval': 60          # период записи файла, с
+}
+
+# Кэш проверки схемы БД: CREATE TABLE, проверка индексов и очистка старых
+# отметок об удалении выполняются не при каждом запуске, а раз в max_age_hours
+SCHEMA_CACHE_CONFIG = {
+    'enabled': True,
+    'path': 'schema_cache.json',   # файл с результатами проверки
+    'max_age_hours': 24            # проверять схему заново через, ч
+}
+
+# Миграции схемы (необязательно). Существующие записи обновляются порциями
+# по диапазону id в коротких транзакциях, чтобы не блокировать таблицу
+MIGRATION_CONFIG = {
+    'batch_size': 1000,            # строк в одной транзакции
+    'batch_pause_ms': 10           # пауза между порциями, мс
+}
@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from src.database import POOL_CONFIG, DatabaseManager
+from src.importer import import_stats, iter_batches, normalize_record
+
+logger = logging.getLogger(__name__)
+
+# Записей на странице iter_pages по умолчанию
+DEFAULT_PAGE_SIZE = 1000
+
+
+class AsyncDatabaseManager:
+    """Асинхронный доступ к хранилищу для серверных процессов и пакетных заданий.
+
+    Методы - корутины с теми же параметрами и результатами, что у
+    DatabaseManager. Запросы выполняются DatabaseManager в собственном
+    пуле потоков размером с пул соединений: каждый поток держит не больше
+    одного соединения, поэтому сотни одновременных корутин не упираются в
+    checkout_timeout, а ждут своей очереди в пуле потоков. SQL, хранилища,
+    метрики и слушатели изменений - общие с синхронным кодом.
+    """
+
+    def __init__(self, db, max_workers=None):
+        self.db = db
+        if max_workers is None:
+            max_workers = db.pool.max_size if db.pool else POOL_CONFIG.get('max_size', 5)
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pm-async-db')
+
+    @classmethod
+    async def open(cls, backend=None, max_workers=None):
+        """Подключается к хранилищу, не блокируя цикл событий"""
+        loop = asyncio.get_running_loop()
+        db = await loop.run_in_executor(None, DatabaseManager, backend)
+        return cls(db, max_workers=max_workers)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def run(self, func, *args, **kwargs):
+        """Выполняет блокирующий вызов func(*args, **kwargs) в пуле потоков"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def is_available(self):
+        return self.db.is_available()
+
+    async def close(self):
+        await self.run(self.db.close)
+        self.executor.shutdown(wait=True)
+
+    # --- Схема ---
+
+    async def create_table(self):
+        return await self.run(self.db.create_table)
+
+    async def ensure_schema(self):
+        return await self.run(self.db.ensure_schema)
+
+    # --- Чтение ---
+
+    async def count_passwords(self):
+        return await self.run(self.db.count_passwords)
+
+    async def get_passwords_page(self, limit, after=None):
+        return await self.run(self.db.get_passwords_page, limit, after=after)
+
+    async def iter_pages(self, page_size=DEFAULT_PAGE_SIZE):
+        """Асинхронно отдает все записи страницами (по ключу service, username)"""
+        after = None
+        while True:
+            rows = await self.get_passwords_page(page_size, after=after)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]['service'], rows[-1]['username'])
+
+    async def get_password(self, service, username=None):
+        return await self.run(self.db.get_password, service, username)
+
+    async def search_passwords(self, search_term, mode='substring', limit=None):
+        return await self.run(self.db.search_passwords, search_term, mode=mode, limit=limit)
+
+    async def get_change_version(self):
+        return await self.run(self.db.get_change_version)
+
+    async def get_changes(self, since_version=0, limit=1000):
+        return await self.run(self.db.get_changes, since_version, limit=limit)
+
+    # --- Запись ---
+
+    async def add_or_update_password(self, service, username, encrypted_password):
+        return await self.run(self.db.add_or_update_password, service, username, encrypted_password)
+
+    async def delete_password(self, service, username):
+        return await self.run(self.db.delete_password, service, username)
+
+    async def bulk_upsert(self, rows, chunk_size=1000):
+        return await self.run(self.db.bulk_upsert, list(rows), chunk_size=chunk_size)
+
+    async def bulk_import(self, records, encryption, batch_size=1000, progress=None):
+        """Импортирует записи (словари, как у src.importer.read_records).
+
+        Чтение и шифрование следующей порции идут в пуле потоков цикла
+        событий одновременно с записью предыдущей. Возвращает статистику
+        в формате BulkImporter.
+        """
+        loop = asyncio.get_running_loop()
+        stats = import_stats()
+        started = time.perf_counter()
+
+        def valid_records():
+            for record in records:
+                normalized = normalize_record(record)
+                if normalized is None:
+                    stats['skipped'] += 1
+                    continue
+                yield normalized
+
+        def encrypt_next(batches):
+            batch = next(batches, None)
+            if batch is None:
+                return None
+            results = encryption.encrypt_many([password for _, _, password in batch])
+            stats['failed'] += sum(1 for result in results if result.error is not None)
+            return [(service, username, result.value)
+                    for (service, username, _), result in zip(batch, results) if result.error is None]
+
+        batches = iter_batches(valid_records(), batch_size)
+        writing = None
+        try:
+            while True:
+                rows = await loop.run_in_executor(None, encrypt_next, batches)
+                if writing is not None:
+                    current, writing = writing, None
+                    stats['rows'] += await current
+                    if progress is not None:
+                        progress(stats['rows'], time.perf_counter() - started)
+                if rows is None:
+                    break
+                writing = asyncio.ensure_future(self.bulk_upsert(rows, chunk_size=batch_size))
+        finally:
+            if writing is not None:
+                # Чтение или шифрование прервалось, пока писалась предыдущая
+                # порция: дожидаемся записи, чтобы ее ошибка не потерялась
+                try:
+                    stats['rows'] += await writing
+                except Exception as e:
+                    logger.error(f"Ошибка записи порции при прерванном импорте: {e}")
+
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = elapsed
+        stats['rows_per_second'] = stats['rows'] / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Асинхронный импорт завершен: {stats}")
+        return stats
+
+
+async def benchmark(db, lookups, concurrency):
+    """Сравнивает последовательные и одновременные запросы get_password"""
+    accounts = []
+    async for rows in db.iter_pages():
+        accounts.extend((row['service'], row['username']) for row in rows)
+    if not accounts:
+        print("[ERROR] Хранилище пустое - нечего запрашивать")
+        return None
+    accounts = [random.choice(accounts) for _ in range(lookups)]
+
+    started = time.perf_counter()
+    for service, username in accounts[:max(1, lookups // 10)]:
+        await db.get_password(service, username)
+    sequential = max(1, lookups // 10) / (time.perf_counter() - started)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(service, username):
+        async with semaphore:
+            return await db.get_password(service, username)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(lookup(service, username) for service, username in accounts))
+    concurrent = lookups / (time.perf_counter() - started)
+    return {'records': len(set(accounts)), 'sequential_per_second': sequential,
+            'concurrent_per_second': concurrent}
+
+
+def main(argv=None):
+    """Проверка одновременных запросов: python -m src.async_database [--lookups N]"""
+    parser = argparse.ArgumentParser(description="Пропускная способность асинхронного доступа к хранилищу")
+    parser.add_argument('--lookups', type=int, default=2000, help="число запросов get_password")
+    parser.add_argument('--concurrency', type=int, default=200, help="одновременных корутин")
+    parser.add_argument('--workers', type=int, help="потоков для запросов (по умолчанию размер пула соединений)")
+    args = parser.parse_args(argv)
+
+    async def run():
+        db = await AsyncDatabaseManager.open(max_workers=args.workers)
+        async with db:
+            if not db.is_available():
+                return 1
+            try:
+                stats = await benchmark(db, args.lookups, args.concurrency)
+            except Exception as e:
+                print(f"[ERROR] Ошибка при выполнении запросов: {e}")
+                return 1
+            if stats is None:
+                return 1
+            print(f"[INFO] Последовательно: {stats['sequential_per_second']:.0f} запросов/с, "
+                  f"одновременно ({args.concurrency} корутин, {db.max_workers} потоков): "
+                  f"{stats['concurrent_per_second']:.0f} запросов/с")
+            return 0
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
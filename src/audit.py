@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import string
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.importer import iter_batches
+
+logger = logging.getLogger(__name__)
+
+# Оценка стойкости 0..4 по энтропии с учетом штрафов, бит
+SCORE_THRESHOLDS = (28, 36, 60, 80)
+SCORE_LABELS = ("очень слабый", "слабый", "средний", "сильный", "очень сильный")
+# Пароли с оценкой ниже этой считаются слабыми
+DEFAULT_MIN_SCORE = 2
+MIN_LENGTH = 10
+
+COMMON_PASSWORDS = frozenset((
+    '123456', '12345678', '123456789', '1234567890', '12345', '1234', '111111', '000000',
+    'password', 'password1', 'passw0rd', 'qwerty', 'qwerty123', 'qwertyuiop', 'abc123',
+    'iloveyou', 'admin', 'admin123', 'welcome', 'letmein', 'monkey', 'dragon', 'master',
+    'sunshine', 'princess', 'football', 'baseball', 'superman', 'trustno1', '1q2w3e4r',
+    'zaq12wsx', 'qazwsx', 'asdfghjkl', 'changeme', 'secret', 'пароль', 'йцукен',
+))
+# Ряды клавиатуры и алфавиты для поиска последовательностей ("abcd", "4321", "qwer")
+SEQUENCES = (
+    string.ascii_lowercase, string.digits, 'qwertyuiop', 'asdfghjkl', 'zxcvbnm',
+    'йцукенгшщзхъ', 'фывапролджэ', 'ячсмитьбю',
+)
+SEQUENCE_LENGTH = 4
+
+
+def character_pool(password):
+    """Размер алфавита по классам символов, встречающимся в пароле"""
+    pool = 0
+    if any(char in string.ascii_lowercase for char in password):
+        pool += 26
+    if any(char in string.ascii_uppercase for char in password):
+        pool += 26
+    if any(char in string.digits for char in password):
+        pool += 10
+    if any(char in string.punctuation or char == ' ' for char in password):
+        pool += 33
+    if any(ord(char) > 127 for char in password):
+        # Кириллица и другие символы вне ASCII
+        pool += 66
+    return pool
+
+
+def has_sequence(lowered):
+    for sequence in SEQUENCES:
+        for start in range(len(sequence) - SEQUENCE_LENGTH + 1):
+            fragment = sequence[start:start + SEQUENCE_LENGTH]
+            if fragment in lowered or fragment[::-1] in lowered:
+                return True
+    return False
+
+
+def score_password(password):
+    """Оценивает стойкость пароля.
+
+    Возвращает (оценка 0..4, энтропия в битах, список замечаний).
+    Энтропия считается по длине и алфавиту и уменьшается за типичные
+    слабости: распространенный пароль, повторы, последовательности.
+    """
+    reasons = []
+    lowered = password.casefold()
+    if lowered in COMMON_PASSWORDS or lowered.rstrip(string.digits + '!') in COMMON_PASSWORDS:
+        return 0, 0.0, ["распространенный пароль"]
+
+    pool = character_pool(password)
+    # Повторяющиеся символы почти не добавляют стойкости
+    effective_length = min(len(password), 2 * len(set(password)))
+    bits = effective_length * math.log2(pool) if pool else 0.0
+
+    if len(password) < MIN_LENGTH:
+        reasons.append(f"короче {MIN_LENGTH} символов")
+    if len(set(password)) * 3 <= len(password):
+        reasons.append("много повторяющихся символов")
+    if has_sequence(lowered):
+        bits *= 0.75
+        reasons.append("содержит последовательность символов")
+    if pool in (10, 26):
+        reasons.append("символы одного типа")
+
+    score = sum(1 for threshold in SCORE_THRESHOLDS if bits >= threshold)
+    return score, bits, reasons
+
+
+def normalize_service(service):
+    """Приводит название сервиса к виду для поиска дубликатов ("https://www.Mail.ru/" -> "mail.ru")"""
+    name = service.strip().casefold()
+    for prefix in ('https://', 'http://', 'www.'):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    return name.rstrip('/')
+
+
+class PasswordAudit:
+    """Проверка всех паролей хранилища: слабые, повторно используемые и
+    дублирующиеся записи.
+
+    Строки читаются потоковым курсором (DatabaseManager.iter_passwords)
+    порциями по batch_size и расшифровываются пакетно
+    (EncryptionManager.decrypt_many, в пуле потоков). Пока порция
+    расшифровывается и анализируется, из базы читается следующая, так что
+    в памяти одновременно не больше двух порций открытых паролей.
+
+    Для поиска повторов открытый пароль заменяется ключевым хешем BLAKE2b
+    со случайным ключом, который живет только во время проверки: индекс
+    содержит хеши и ссылки на записи, но не пароли.
+    """
+
+    def __init__(self, db, encryption, batch_size=1000, min_score=DEFAULT_MIN_SCORE):
+        self.db = db
+        self.encryption = encryption
+        self.batch_size = batch_size
+        self.min_score = min_score
+        self.hash_key = os.urandom(32)
+        # хеш пароля -> записи с этим паролем
+        self.reuse_index = {}
+        # (нормализованный сервис, имя пользователя) -> записи
+        self.account_index = {}
+        self.weak = []
+        self.stats = {'rows': 0, 'failed': 0, 'weak': 0, 'reused_groups': 0, 'reused_entries': 0,
+                      'duplicate_groups': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+
+    def password_hash(self, password):
+        return hashlib.blake2b(password.encode('utf-8'), key=self.hash_key, digest_size=16).digest()
+
+    def analyze_batch(self, batch):
+        """Расшифровывает и проверяет порцию; возвращает найденные в ней
+        слабые пароли (открытые пароли после проверки не сохраняются)
+        """
+        results = self.encryption.decrypt_many([row['password_text'] for row in batch])
+        weak = []
+        for row, result in zip(batch, results):
+            entry = {'id': row['id'], 'service': row['service'], 'username': row['username']}
+
+            self.account_index.setdefault(
+                (normalize_service(row['service']), row['username'].casefold()), []
+            ).append(entry)
+
+            if result.error is not None:
+                self.stats['failed'] += 1
+                logger.error(f"Запись {row['service']} ({row['username']}) не проверена: {result.error!r}")
+                continue
+
+            self.reuse_index.setdefault(self.password_hash(result.value), []).append(entry)
+
+            score, bits, reasons = score_password(result.value)
+            if score < self.min_score:
+                weak.append(dict(entry, score=score, label=SCORE_LABELS[score],
+                                 entropy_bits=round(bits, 1), reasons=reasons))
+        return weak
+
+    def run(self, progress=None):
+        """Проверяет все записи.
+
+        progress(stats, weak) вызывается после каждой порции: stats -
+        накопленная статистика, weak - слабые пароли из этой порции.
+        """
+        started = time.perf_counter()
+        pending = None
+
+        def finish(future):
+            weak = future.result()
+            self.weak.extend(weak)
+            self.stats['weak'] += len(weak)
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                self.stats['rows_per_second'] = self.stats['rows'] / elapsed if elapsed > 0 else 0.0
+                progress(self.stats, weak)
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='pm-audit') as worker:
+            for batch in iter_batches(self.db.iter_passwords(batch_size=self.batch_size), self.batch_size):
+                future = worker.submit(self.analyze_batch, batch)
+                if pending is not None:
+                    finish(pending)
+                self.stats['rows'] += len(batch)
+                pending = future
+            if pending is not None:
+                finish(pending)
+
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = elapsed
+        self.stats['rows_per_second'] = self.stats['rows'] / elapsed if elapsed > 0 else 0.0
+
+        reused = self.reused()
+        self.stats['reused_groups'] = len(reused)
+        self.stats['reused_entries'] = sum(len(group) for group in reused)
+        self.stats['duplicate_groups'] = len(self.duplicates())
+        logger.info(f"Проверка паролей завершена: {self.stats}")
+        return self.stats
+
+    def reused(self):
+        """Группы записей с одинаковым паролем (самые большие - первыми)"""
+        groups = [entries for entries in self.reuse_index.values() if len(entries) > 1]
+        return sorted(groups, key=len, reverse=True)
+
+    def duplicates(self):
+        """Группы записей одной учетной записи под разными написаниями сервиса"""
+        return [entries for entries in self.account_index.values() if len(entries) > 1]
+
+    def report(self):
+        """Отчет без открытых паролей (для сохранения в JSON)"""
+        return {
+            'stats': self.stats,
+            'weak': self.weak,
+            'reused': self.reused(),
+            'duplicates': self.duplicates(),
+        }
+
+
+def main(argv=None):
+    """Проверка паролей из командной строки: python -m src.audit [--report FILE]"""
+    parser = argparse.ArgumentParser(description="Поиск слабых и повторно используемых паролей")
+    parser.add_argument('--batch-size', type=int, default=1000, help="записей в одной порции")
+    parser.add_argument('--min-score', type=int, default=DEFAULT_MIN_SCORE,
+                        help="пароли с оценкой ниже (0..4) считаются слабыми")
+    parser.add_argument('--report', help="сохранить отчет в JSON-файл")
+    args = parser.parse_args(argv)
+
+    from src.database import DatabaseManager
+    from src.kdf import InvalidMasterPassword
+    from src.security import KeyringError, create_encryption_manager
+
+    try:
+        encryption = create_encryption_manager()
+    except (InvalidMasterPassword, KeyringError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    db = DatabaseManager()
+    if not db.pool:
+        return 1
+
+    def report(stats, weak):
+        print(f"\r[INFO] Проверено {stats['rows']} записей ({stats['rows_per_second']:.0f} записей/с), "
+              f"слабых: {stats['weak']}", end='', flush=True)
+
+    try:
+        audit = PasswordAudit(db, encryption, batch_size=args.batch_size, min_score=args.min_score)
+        stats = audit.run(progress=report)
+        print()
+
+        for entry in audit.weak:
+            print(f"  [слабый] {entry['service']} ({entry['username']}): {entry['label']}"
+                  + (f" - {', '.join(entry['reasons'])}" if entry['reasons'] else ""))
+        for group in audit.reused():
+            accounts = ', '.join(f"{entry['service']} ({entry['username']})" for entry in group)
+            print(f"  [повтор] один пароль у {len(group)} записей: {accounts}")
+        for group in audit.duplicates():
+            accounts = ', '.join(f"{entry['service']} ({entry['username']})" for entry in group)
+            print(f"  [дубликат] {accounts}")
+
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as report_file:
+                json.dump(audit.report(), report_file, ensure_ascii=False, indent=2)
+            print(f"[INFO] Отчет сохранен: {args.report}")
+
+        print(f"[SUCCESS] Проверено {stats['rows']} записей за {stats['seconds']:.1f} с "
+              f"({stats['rows_per_second']:.0f} записей/с): слабых {stats['weak']}, "
+              f"повторов {stats['reused_groups']} ({stats['reused_entries']} записей), "
+              f"дубликатов {stats['duplicate_groups']}, ошибок расшифровки {stats['failed']}")
+        return 0 if stats['failed'] == 0 else 1
+    except Exception as e:
+        print()
+        print(f"[ERROR] Ошибка проверки паролей: {e}")
+        logger.error(f"Ошибка проверки паролей: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+import argparse
+import getpass
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+
+from cryptography.fernet import Fernet
+
+from src.importer import BulkImporter, iter_batches
+from src.kdf import InvalidMasterPassword, MasterKey
+
+logger = logging.getLogger(__name__)
+
+# Формат архива:
+#   MAGIC | VERSION | кадр параметров KDF | кадр* | 0x00000000
+# кадр = длина (4 байта, big-endian) + данные. Первый кадр - параметры
+# scrypt ключа архива в JSON (соль, n, r, p, проверочный токен), остальные -
+# Fernet-токены от zlib-сжатых порций записей в формате JSON Lines.
+# Пустой кадр в конце отличает полный архив от оборванного.
+BACKUP_MAGIC = b'PMBACKUP'
+BACKUP_VERSION = 1
+FRAME_HEADER = struct.Struct('>I')
+# Пароль резервной копии для неинтерактивного запуска (скрипты)
+BACKUP_PASSWORD_ENV = 'PM_BACKUP_PASSWORD'
+
+
+def prompt_backup_password(first_run):
+    """Пароль резервной копии: из BACKUP_PASSWORD_ENV или запрос в терминале
+    (first_run - новый архив, пароль вводится дважды)
+    """
+    password = os.environ.get(BACKUP_PASSWORD_ENV)
+    if password:
+        return password
+    if not first_run:
+        return getpass.getpass("Пароль резервной копии: ")
+    while True:
+        password = getpass.getpass("Новый пароль резервной копии: ")
+        if password and password == getpass.getpass("Повторите пароль резервной копии: "):
+            return password
+        print("[ERROR] Пароли пусты или не совпадают, попробуйте еще раз")
+
+
+def open_private(path, mode='wb', **kwargs):
+    """Создает файл заново с правами только для владельца (0600)"""
+    if os.path.exists(path):
+        os.remove(path)
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    return os.fdopen(descriptor, mode, **kwargs)
+
+
+class BackupWriter:
+    """Пишет архив порциями: в памяти не больше одной порции записей.
+
+    master_key - kdf.MasterKey, выведенный из пароля резервной копии;
+    его параметры (без ключа) записываются в заголовок архива.
+    """
+
+    def __init__(self, stream, master_key, chunk_rows=1000, compression_level=6):
+        self.stream = stream
+        self.fernet = Fernet(master_key.key)
+        self.chunk_rows = chunk_rows
+        self.compression_level = compression_level
+        self.chunk = []
+        self.rows = 0
+        params = json.dumps(master_key.params).encode('utf-8')
+        self.stream.write(BACKUP_MAGIC + bytes([BACKUP_VERSION]))
+        self.stream.write(FRAME_HEADER.pack(len(params)))
+        self.stream.write(params)
+
+    def write(self, record):
+        self.chunk.append(json.dumps(record, ensure_ascii=False))
+        if len(self.chunk) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.chunk:
+            return
+        payload = zlib.compress(('\n'.join(self.chunk)).encode('utf-8'), self.compression_level)
+        token = self.fernet.encrypt(payload)
+        self.stream.write(FRAME_HEADER.pack(len(token)))
+        self.stream.write(token)
+        self.rows += len(self.chunk)
+        self.chunk = []
+
+    def close(self):
+        self.flush()
+        self.stream.write(FRAME_HEADER.pack(0))
+
+
+def read_frame(stream):
+    size_bytes = stream.read(FRAME_HEADER.size)
+    if len(size_bytes) < FRAME_HEADER.size:
+        raise ValueError("Резервная копия оборвана: нет завершающего кадра")
+    (size,) = FRAME_HEADER.unpack(size_bytes)
+    data = stream.read(size)
+    if len(data) < size:
+        raise ValueError("Резервная копия оборвана посреди кадра")
+    return data
+
+
+def open_backup(stream, password):
+    """Проверяет заголовок архива и выводит его ключ из пароля.
+
+    Неверный пароль - исключение InvalidMasterPassword.
+    """
+    header = stream.read(len(BACKUP_MAGIC) + 1)
+    if len(header) <= len(BACKUP_MAGIC) or header[:len(BACKUP_MAGIC)] != BACKUP_MAGIC:
+        raise ValueError("Файл не является резервной копией менеджера паролей")
+    if header[len(BACKUP_MAGIC)] != BACKUP_VERSION:
+        raise ValueError(f"Неподдерживаемая версия резервной копии: {header[len(BACKUP_MAGIC)]}")
+
+    try:
+        params = json.loads(read_frame(stream).decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Поврежден заголовок резервной копии") from None
+    try:
+        return MasterKey.from_params(password, params, path=None)
+    except InvalidMasterPassword:
+        raise InvalidMasterPassword("Неверный пароль резервной копии") from None
+
+
+def read_backup(stream, password):
+    """Потоково читает записи архива"""
+    fernet = Fernet(open_backup(stream, password).key)
+
+    while True:
+        token = read_frame(stream)
+        if not token:
+            return
+        payload = zlib.decompress(fernet.decrypt(token)).decode('utf-8')
+        for line in payload.split('\n'):
+            yield json.loads(line)
+
+
+def export_vault(db, encryption, path, password, chunk_rows=1000, progress=None):
+    """Экспортирует все пароли в зашифрованный архив.
+
+    Ключ архива выводится из password через scrypt с новой солью;
+    параметры KDF хранятся в заголовке, поэтому архив расшифровывается
+    одним паролем. Строки читаются потоковым курсором
+    (DatabaseManager.iter_passwords), расшифровываются ключом хранилища и
+    сразу перешифровываются ключом архива. Архив сначала пишется во
+    временный файл.
+    """
+    master_key = MasterKey.derive(password, path=None)
+    started = time.perf_counter()
+    failed = 0
+    temp_path = path + '.tmp'
+
+    try:
+        with open_private(temp_path) as stream:
+            writer = BackupWriter(stream, master_key, chunk_rows=chunk_rows)
+            rows = db.iter_passwords(batch_size=chunk_rows)
+            for batch in iter_batches(rows, chunk_rows):
+                results = encryption.decrypt_many([row['password_text'] for row in batch])
+                for row, result in zip(batch, results):
+                    if result.error is not None:
+                        failed += 1
+                        logger.error(f"Запись {row['service']} ({row['username']}) не экспортирована: {result.error!r}")
+                        continue
+
+                    writer.write({
+                        'service': row['service'],
+                        'username': row['username'],
+                        'password': result.value,
+                        'created_at': str(row['created_at']),
+                    })
+                if progress is not None:
+                    progress(writer.rows + len(writer.chunk), time.perf_counter() - started)
+            writer.close()
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'rows': writer.rows,
+        'failed': failed,
+        'seconds': elapsed,
+        'rows_per_second': writer.rows / elapsed if elapsed > 0 else 0.0,
+    }
+    logger.info(f"Экспорт завершен: {stats}")
+    return stats
+
+
+def restore_vault(db, encryption, path, password, batch_size=1000, processes=0, progress=None):
+    """Восстанавливает архив через пакетный импорт (BulkImporter).
+
+    Записи архива уже в формате хранилища, поэтому normalize_record к ним
+    не применяется - пароли восстанавливаются байт в байт.
+    """
+    with open(path, 'rb') as stream:
+        importer = BulkImporter(db, encryption, batch_size=batch_size, processes=processes)
+        records = ((record['service'], record['username'], record['password'])
+                   for record in read_backup(stream, password))
+        return importer.run(records, progress=progress, normalized=True)
+
+
+def main(argv=None):
+    """Резервное копирование из командной строки: python -m src.backup export|restore FILE"""
+    parser = argparse.ArgumentParser(description="Зашифрованная резервная копия паролей")
+    parser.add_argument('command', choices=('export', 'restore'))
+    parser.add_argument('path', help="файл архива")
+    parser.add_argument('--chunk-rows', type=int, default=1000, help="записей в одном кадре / транзакции")
+    parser.add_argument('--processes', type=int, default=0, help="процессов для шифрования при восстановлении")
+    args = parser.parse_args(argv)
+
+    from src.database import DatabaseManager
+    from src.security import KeyringError, create_encryption_manager
+
+    try:
+        encryption = create_encryption_manager()
+    except (InvalidMasterPassword, KeyringError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    db = DatabaseManager()
+    if not db.pool:
+        return 1
+    if not db.ensure_schema():
+        print("[ERROR] Не удалось создать таблицу")
+        db.close()
+        return 1
+
+    def report(rows, seconds):
+        rate = rows / seconds if seconds > 0 else 0.0
+        print(f"\r[INFO] Обработано {rows} записей ({rate:.0f} записей/с)", end='', flush=True)
+
+    try:
+        password = prompt_backup_password(first_run=args.command == 'export')
+        if args.command == 'export':
+            stats = export_vault(db, encryption, args.path, password,
+                                 chunk_rows=args.chunk_rows, progress=report)
+            print()
+            print(f"[SUCCESS] Экспортировано {stats['rows']} записей за {stats['seconds']:.1f} с, "
+                  f"ошибок расшифровки: {stats['failed']}")
+        else:
+            stats = restore_vault(db, encryption, args.path, password,
+                                  batch_size=args.chunk_rows, processes=args.processes, progress=report)
+            print()
+            print(f"[SUCCESS] Восстановлено {stats['rows']} записей за {stats['seconds']:.1f} с, "
+                  f"ошибок шифрования: {stats['failed']}")
+        return 0
+    except Exception as e:
+        print()
+        print(f"[ERROR] Ошибка резервного копирования: {e}")
+        logger.error(f"Ошибка резервного копирования: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
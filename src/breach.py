@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+
+from src.importer import iter_batches
+
+logger = logging.getLogger(__name__)
+
+# Компактный индекс утечек:
+#   MAGIC | VERSION | таблица префиксов | запись*
+# Таблица префиксов - PREFIX_COUNT + 1 смещений (uint64, в записях): записи
+# с первыми двумя байтами хеша p лежат в [table[p], table[p + 1]).
+# Запись - первые KEY_SIZE байт SHA-1 и число появлений в утечках (uint32).
+# 8 байт хеша при миллиарде записей дают ложное совпадение с вероятностью
+# порядка 1e-10 на проверку, а индекс в 3-4 раза меньше исходного файла.
+INDEX_MAGIC = b'PMBREACH'
+INDEX_VERSION = 1
+PREFIX_COUNT = 1 << 16
+KEY_SIZE = 8
+RECORD = struct.Struct('>8sI')
+OFFSET = struct.Struct('<Q')
+HEADER_SIZE = len(INDEX_MAGIC) + 1
+TABLE_SIZE = (PREFIX_COUNT + 1) * OFFSET.size
+
+HASH_HEX_LENGTH = 40
+
+
+def sha1_hex(password):
+    return hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
+
+
+class BreachCorpus:
+    """Локальная база утекших паролей для проверки без сети.
+
+    Принимает текстовый файл в формате HIBP "SHA1:число" с сортировкой по
+    хешу (ordered by hash) или построенный из него индекс (build_index).
+    Файл отображается в память (mmap): поиск - двоичный, читаются только
+    нужные страницы, поэтому размер файла не ограничен объемом памяти.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Пустой файл нельзя отобразить в память
+            self.file.close()
+            raise ValueError(f"Файл базы утечек пуст: {path}")
+
+        self.is_index = self.mm[:len(INDEX_MAGIC)] == INDEX_MAGIC
+        if self.is_index:
+            if self.mm[len(INDEX_MAGIC)] != INDEX_VERSION:
+                self.close()
+                raise ValueError(f"Неподдерживаемая версия индекса утечек: {path}")
+            self.records_start = HEADER_SIZE + TABLE_SIZE
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+    def lookup(self, digest_hex):
+        """Возвращает число появлений хеша SHA-1 (hex) в утечках, 0 - не найден"""
+        digest_hex = digest_hex.upper()
+        if self.is_index:
+            return self.lookup_index(bytes.fromhex(digest_hex))
+        return self.lookup_text(digest_hex.encode('ascii'))
+
+    def contains_password(self, password):
+        return self.lookup(sha1_hex(password))
+
+    def lookup_text(self, target):
+        """Двоичный поиск по строкам отсортированного текстового файла"""
+        mm = self.mm
+        lo, hi = 0, len(mm)
+        # lo всегда указывает на начало строки; ищем первую строку с хешем >= target
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = max(mm.rfind(b'\n', lo, mid) + 1, lo)
+            end = mm.find(b'\n', start)
+            if end == -1:
+                end = len(mm)
+            if mm[start:start + HASH_HEX_LENGTH] < target:
+                lo = end + 1
+            else:
+                hi = start
+
+        if mm[lo:lo + HASH_HEX_LENGTH] != target:
+            return 0
+        end = mm.find(b'\n', lo)
+        line = mm[lo:end if end != -1 else len(mm)].strip()
+        _, _, count = line.partition(b':')
+        return int(count) if count.isdigit() else 1
+
+    def lookup_index(self, digest):
+        """Поиск в корзине префикса компактного индекса"""
+        prefix = int.from_bytes(digest[:2], 'big')
+        table_offset = HEADER_SIZE + prefix * OFFSET.size
+        lo = OFFSET.unpack_from(self.mm, table_offset)[0]
+        end = hi = OFFSET.unpack_from(self.mm, table_offset + OFFSET.size)[0]
+        key = digest[:KEY_SIZE]
+
+        mm = self.mm
+        base = self.records_start
+        size = RECORD.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            position = base + mid * size
+            if mm[position:position + KEY_SIZE] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        position = base + lo * size
+        if lo < end and mm[position:position + KEY_SIZE] == key:
+            return RECORD.unpack_from(mm, position)[1]
+        return 0
+
+    def benchmark(self, lookups=100000):
+        """Скорость поиска: случайные (почти всегда отсутствующие) хеши"""
+        digests = [os.urandom(20).hex().upper() for _ in range(lookups)]
+        started = time.perf_counter()
+        for digest_hex in digests:
+            self.lookup(digest_hex)
+        elapsed = time.perf_counter() - started
+        return {'lookups': lookups, 'seconds': elapsed,
+                'lookups_per_second': lookups / elapsed if elapsed > 0 else 0.0}
+
+
+def build_index(source_path, index_path, progress=None):
+    """Строит компактный индекс из отсортированного текстового файла HIBP.
+
+    Файл читается потоково; индекс сначала пишется во временный файл.
+    Возвращает число записей.
+    """
+    table = [0] * (PREFIX_COUNT + 1)
+    records = 0
+    previous = b''
+    temp_path = index_path + '.tmp'
+
+    try:
+        with open(source_path, 'rb') as source, open(temp_path, 'wb') as index:
+            index.write(INDEX_MAGIC + bytes([INDEX_VERSION]))
+            index.write(bytes(TABLE_SIZE))
+
+            for line in source:
+                digest_hex, _, count = line.strip().partition(b':')
+                if len(digest_hex) != HASH_HEX_LENGTH:
+                    continue
+                digest = bytes.fromhex(digest_hex.decode('ascii'))
+                if digest < previous:
+                    raise ValueError("Файл не отсортирован по хешу - скачайте вариант ordered by hash")
+                previous = digest
+
+                table[int.from_bytes(digest[:2], 'big') + 1] += 1
+                index.write(RECORD.pack(digest[:KEY_SIZE], min(int(count or 1), 0xFFFFFFFF)))
+                records += 1
+                if progress is not None and records % 1000000 == 0:
+                    progress(records)
+
+            # Количества по префиксам -> смещения начала корзин
+            for prefix in range(PREFIX_COUNT):
+                table[prefix + 1] += table[prefix]
+            index.seek(HEADER_SIZE)
+            index.write(b''.join(OFFSET.pack(offset) for offset in table))
+        os.replace(temp_path, index_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    logger.info(f"Индекс утечек построен: {index_path}, {records} записей")
+    return records
+
+
+class BreachScan:
+    """Проверяет все пароли хранилища по базе утечек.
+
+    Строки читаются потоково порциями, EncryptionManager.digest_many
+    расшифровывает и хеширует их в пуле потоков - открытые пароли не
+    выходят за пределы EncryptionManager. В результатах - только записи.
+    """
+
+    def __init__(self, db, encryption, corpus, batch_size=1000):
+        self.db = db
+        self.encryption = encryption
+        self.corpus = corpus
+        self.batch_size = batch_size
+        self.breached = []
+        self.stats = {'rows': 0, 'breached': 0, 'failed': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+
+    def run(self, progress=None):
+        started = time.perf_counter()
+        for batch in iter_batches(self.db.iter_passwords(batch_size=self.batch_size), self.batch_size):
+            digests = self.encryption.digest_many([row['password_text'] for row in batch])
+            for row, result in zip(batch, digests):
+                if result.error is not None:
+                    self.stats['failed'] += 1
+                    logger.error(f"Запись {row['service']} ({row['username']}) не проверена: {result.error!r}")
+                    continue
+                count = self.corpus.lookup(result.value)
+                if count:
+                    self.breached.append({'id': row['id'], 'service': row['service'],
+                                          'username': row['username'], 'count': count})
+                    self.stats['breached'] += 1
+
+            self.stats['rows'] += len(batch)
+            if progress is not None:
+                progress(self.stats['rows'], time.perf_counter() - started)
+
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = elapsed
+        self.stats['rows_per_second'] = self.stats['rows'] / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Проверка по базе утечек завершена: {self.stats}")
+        return self.stats
+
+
+def main(argv=None):
+    """Проверка по базе утечек: python -m src.breach scan|build-index|benchmark FILE"""
+    parser = argparse.ArgumentParser(description="Проверка паролей по локальной базе утечек (HIBP SHA-1)")
+    parser.add_argument('command', choices=('scan', 'build-index', 'benchmark'))
+    parser.add_argument('path', help="файл HIBP (SHA1:число, ordered by hash) или индекс")
+    parser.add_argument('--output', help="файл индекса для build-index (по умолчанию PATH.idx)")
+    parser.add_argument('--batch-size', type=int, default=1000, help="записей в одной порции")
+    parser.add_argument('--lookups', type=int, default=100000, help="число поисков для benchmark")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build-index':
+        output = args.output or args.path + '.idx'
+        started = time.perf_counter()
+        try:
+            records = build_index(args.path, output, progress=lambda records: print(
+                f"\r[INFO] Обработано {records} хешей", end='', flush=True))
+        except (OSError, ValueError) as e:
+            print()
+            print(f"[ERROR] Ошибка построения индекса: {e}")
+            return 1
+        print()
+        print(f"[SUCCESS] Индекс {output}: {records} хешей за {time.perf_counter() - started:.1f} с")
+        return 0
+
+    try:
+        corpus = BreachCorpus(args.path)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Не удалось открыть базу утечек: {e}")
+        return 1
+
+    with corpus:
+        if args.command == 'benchmark':
+            stats = corpus.benchmark(args.lookups)
+            kind = "индекс" if corpus.is_index else "текстовый файл"
+            print(f"[INFO] {kind}: {stats['lookups']} поисков за {stats['seconds']:.2f} с "
+                  f"({stats['lookups_per_second']:.0f} поисков/с)")
+            return 0
+
+        from src.database import DatabaseManager
+        from src.kdf import InvalidMasterPassword
+        from src.security import KeyringError, create_encryption_manager
+
+        try:
+            encryption = create_encryption_manager()
+        except (InvalidMasterPassword, KeyringError) as e:
+            print(f"[ERROR] {e}")
+            return 1
+        db = DatabaseManager()
+        if not db.pool:
+            return 1
+
+        def report(rows, seconds):
+            rate = rows / seconds if seconds > 0 else 0.0
+            print(f"\r[INFO] Проверено {rows} записей ({rate:.0f} записей/с)", end='', flush=True)
+
+        try:
+            scan = BreachScan(db, encryption, corpus, batch_size=args.batch_size)
+            stats = scan.run(progress=report)
+            print()
+            for entry in scan.breached:
+                print(f"  [утечка] {entry['service']} ({entry['username']}): встречается {entry['count']} раз")
+            print(f"[SUCCESS] Проверено {stats['rows']} записей за {stats['seconds']:.1f} с "
+                  f"({stats['rows_per_second']:.0f} записей/с): в утечках {stats['breached']}, "
+                  f"ошибок расшифровки {stats['failed']}")
+            return 0 if stats['failed'] == 0 else 1
+        except Exception as e:
+            print()
+            print(f"[ERROR] Ошибка проверки по базе утечек: {e}")
+            logger.error(f"Ошибка проверки по базе утечек: {e}")
+            return 1
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+# Мастер-пароль для неинтерактивного запуска (скрипты); без переменной
+# пароль запрашивается в терминале
+MASTER_PASSWORD_ENV = 'PM_MASTER_PASSWORD'
+
+
+class CommandError(Exception):
+    """Ошибка команды: сообщение для пользователя, код возврата 1"""
+
+
+def ask_master_password(first_run):
+    password = os.environ.get(MASTER_PASSWORD_ENV)
+    if password:
+        return password
+    from src.kdf import prompt_master_password
+    return prompt_master_password(first_run)
+
+
+def open_encryption(create=False):
+    """Загружает ключи; без create не создает новый ключ на месте пропавшего"""
+    from src.security import DEFAULT_KEY_PATH, create_encryption_manager
+
+    if not create and not os.path.exists(DEFAULT_KEY_PATH):
+        raise CommandError(f"Файл ключа {DEFAULT_KEY_PATH} не найден - сначала добавьте пароль или запустите приложение")
+    return create_encryption_manager(ask_password=ask_master_password)
+
+
+def open_database(schema=False):
+    """Подключается к хранилищу; схема проверяется только для записи
+    (и пропускается, если уже проверена недавно - DatabaseManager.ensure_schema)
+    """
+    from src.database import DatabaseManager
+
+    db = DatabaseManager()
+    if not db.pool:
+        raise CommandError("Не удалось подключиться к базе данных")
+    if schema and not db.ensure_schema():
+        db.close()
+        raise CommandError("Не удалось создать таблицу")
+    return db
+
+
+def read_new_password(args):
+    """Пароль для add: --generate, stdin (в скрипте) или запрос.
+
+    Аргумента с паролем нет намеренно: командная строка видна другим
+    пользователям через ps и /proc/*/cmdline и попадает в историю shell.
+    """
+    if args.generate:
+        from src.generator import create_generator
+        try:
+            from config.config import GENERATOR_CONFIG
+        except ImportError:
+            GENERATOR_CONFIG = {}
+        return create_generator(GENERATOR_CONFIG).generate(), True
+    if not sys.stdin.isatty():
+        return sys.stdin.readline().rstrip('\r\n'), False
+    import getpass
+    return getpass.getpass(f"Пароль для {args.service} ({args.username}): "), False
+
+
+def command_get(args, output):
+    db = open_database()
+    try:
+        rows = db.get_password(args.service, args.username)
+    finally:
+        db.close()
+
+    if not rows:
+        raise CommandError(f"Запись {args.service}" + (f" ({args.username})" if args.username else "") + " не найдена")
+    if len(rows) > 1:
+        usernames = ', '.join(row['username'] for row in rows)
+        raise CommandError(f"У сервиса {args.service} несколько записей, укажите пользователя: {usernames}")
+
+    encryption = open_encryption()
+    output.write(encryption.decrypt_password(rows[0]['password_text']) + '\n')
+
+
+def command_add(args, output):
+    password, generated = read_new_password(args)
+    if not password:
+        raise CommandError("Пароль не может быть пустым")
+
+    encryption = open_encryption(create=True)
+    db = open_database(schema=True)
+    try:
+        action = db.add_or_update_password(args.service, args.username, encryption.encrypt_password(password))
+    finally:
+        db.close()
+    print(f"[SUCCESS] Пароль для {args.service} ({args.username}) {action}")
+    if generated:
+        output.write(password + '\n')
+
+
+def write_accounts(rows, output):
+    count = 0
+    for row in rows:
+        output.write(f"{row['service']}\t{row['username']}\n")
+        count += 1
+    return count
+
+
+def command_search(args, output):
+    db = open_database()
+    try:
+        rows = db.search_passwords(args.term, mode='prefix' if args.prefix else 'substring', limit=args.limit)
+    finally:
+        db.close()
+    write_accounts(rows, output)
+
+
+def command_list(args, output):
+    db = open_database()
+    try:
+        count = write_accounts(db.iter_passwords(), output)
+    finally:
+        db.close()
+    print(f"[INFO] Записей: {count}")
+
+
+def command_import(args, output):
+    from src.importer import BulkImporter
+
+    encryption = open_encryption(create=True)
+    db = open_database(schema=True)
+    try:
+        stats = BulkImporter(db, encryption, batch_size=args.batch_size).import_file(args.path, file_format=args.format)
+    finally:
+        db.close()
+    print(f"[SUCCESS] Импортировано {stats['rows']} записей за {stats['seconds']:.1f} с "
+          f"({stats['rows_per_second']:.0f} записей/с), пропущено {stats['skipped']}")
+    if stats['failed']:
+        raise CommandError(f"Не удалось зашифровать {stats['failed']} записей")
+
+
+def command_export(args, output):
+    """Выгружает пароли в зашифрованный архив (src.backup), с --plaintext -
+    в открытом виде в CSV или JSON Lines (формат импорта)
+    """
+    from src.backup import export_vault, prompt_backup_password
+
+    if not args.plaintext:
+        if args.format:
+            raise CommandError("--format задает формат открытой выгрузки и используется только с --plaintext")
+        encryption = open_encryption()
+        password = prompt_backup_password(first_run=True)
+        if not password:
+            raise CommandError("Пароль резервной копии не введен")
+        db = open_database()
+        try:
+            stats = export_vault(db, encryption, args.path, password, chunk_rows=args.batch_size)
+        finally:
+            db.close()
+        print(f"[SUCCESS] Экспортировано {stats['rows']} записей в зашифрованный архив {args.path}, "
+              f"ошибок расшифровки: {stats['failed']}")
+        if stats['failed']:
+            raise CommandError(f"Не удалось расшифровать {stats['failed']} записей")
+        return
+
+    print("[INFO] Внимание: пароли будут записаны в открытом виде - удалите файл сразу после использования",
+          file=sys.stderr)
+    export_plaintext(args)
+
+
+def export_plaintext(args):
+    """Открытая выгрузка в CSV / JSON Lines; файл доступен только владельцу"""
+    import csv
+    import json
+
+    from src.backup import open_private
+    from src.importer import iter_batches
+
+    file_format = args.format or ('csv' if args.path.lower().endswith('.csv') else 'jsonl')
+    encryption = open_encryption()
+    db = open_database()
+    rows = failed = 0
+    temp_path = args.path + '.tmp'
+    try:
+        with open_private(temp_path, 'w', newline='', encoding='utf-8') as export_file:
+            writer = csv.writer(export_file) if file_format == 'csv' else None
+            if writer is not None:
+                writer.writerow(('service', 'username', 'password'))
+            for batch in iter_batches(db.iter_passwords(batch_size=args.batch_size), args.batch_size):
+                results = encryption.decrypt_many([row['password_text'] for row in batch])
+                for row, result in zip(batch, results):
+                    if result.error is not None:
+                        failed += 1
+                        continue
+                    if writer is not None:
+                        writer.writerow((row['service'], row['username'], result.value))
+                    else:
+                        export_file.write(json.dumps({'service': row['service'], 'username': row['username'],
+                                                      'password': result.value}, ensure_ascii=False) + '\n')
+                    rows += 1
+        os.replace(temp_path, args.path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        db.close()
+
+    print(f"[SUCCESS] Экспортировано {rows} записей в {args.path}, ошибок расшифровки: {failed}")
+    if failed:
+        raise CommandError(f"Не удалось расшифровать {failed} записей")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description="Менеджер паролей без графического интерфейса")
+    parser.add_argument('--timing', action='store_true', help="вывести время выполнения команды")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    get = commands.add_parser('get', help="вывести пароль")
+    get.add_argument('service')
+    get.add_argument('username', nargs='?', help="обязателен, если у сервиса несколько записей")
+    get.set_defaults(handler=command_get)
+
+    add = commands.add_parser('add', help="добавить или обновить пароль")
+    add.add_argument('service')
+    add.add_argument('username')
+    add.add_argument('--generate', action='store_true',
+                     help="сгенерировать пароль по GENERATOR_CONFIG и вывести его (иначе из stdin или запрос в терминале)")
+    add.set_defaults(handler=command_add)
+
+    search = commands.add_parser('search', help="найти записи по сервису или пользователю")
+    search.add_argument('term')
+    search.add_argument('--prefix', action='store_true', help="поиск по началу строки")
+    search.add_argument('--limit', type=int, default=None, help="максимум записей")
+    search.set_defaults(handler=command_search)
+
+    listing = commands.add_parser('list', help="список всех записей (без паролей)")
+    listing.set_defaults(handler=command_list)
+
+    importing = commands.add_parser('import', help="импорт из CSV / JSON")
+    importing.add_argument('path')
+    importing.add_argument('--format', choices=('csv', 'json'), help="формат файла (по умолчанию по расширению)")
+    importing.add_argument('--batch-size', type=int, default=1000, help="размер порции и транзакции")
+    importing.set_defaults(handler=command_import)
+
+    export = commands.add_parser('export', help="экспорт в зашифрованный архив (как python -m src.backup export)")
+    export.add_argument('path')
+    export.add_argument('--plaintext', action='store_true',
+                        help="выгрузить открытые пароли в CSV / JSON Lines вместо архива")
+    export.add_argument('--format', choices=('csv', 'jsonl'),
+                        help="формат открытой выгрузки (по умолчанию по расширению)")
+    export.add_argument('--batch-size', type=int, default=1000, help="записей в одной порции")
+    export.set_defaults(handler=command_export)
+    return parser
+
+
+def main(argv=None):
+    """Командная строка: python -m src.cli get|add|search|list|import|export ...
+
+    В stdout пишется только результат команды (пароль, список записей),
+    служебные сообщения модулей перенаправляются в stderr. Модули
+    импортируются по мере надобности, а схема БД проверяется только
+    командами записи - так короткие команды запускаются быстро.
+    """
+    args = build_parser().parse_args(argv)
+    output = sys.stdout
+    started = time.perf_counter()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            args.handler(args, output)
+            code = 0
+        except CommandError as e:
+            print(f"[ERROR] {e}")
+            code = 1
+        except Exception as e:
+            print(f"[ERROR] Ошибка команды {args.command}: {e}")
+            code = 1
+        if args.timing:
+            print(f"[INFO] {args.command}: {(time.perf_counter() - started) * 1000:.0f} мс")
+    output.flush()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
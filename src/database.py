@@ -1,47 +1,91 @@
-import pymysql
+import json
 import logging
-from config.config import DB_CONFIG
+import os
+import time
+from datetime import datetime, timedelta
+from src.metrics import metrics
+from src.storage import create_backend
+from src.storage.migrations import DEFAULT_BATCH_SIZE, MigrationRunner, latest_version
+
+try:
+    from config.config import DB_CONFIG
+except ImportError:
+    DB_CONFIG = {}
+
+try:
+    from config.config import POOL_CONFIG
+except ImportError:
+    POOL_CONFIG = {}
+
+try:
+    from config.config import STORAGE_CONFIG
+except ImportError:
+    STORAGE_CONFIG = {}
+
+try:
+    from config.config import SCHEMA_CACHE_CONFIG
+except ImportError:
+    SCHEMA_CACHE_CONFIG = {}
+
+try:
+    from config.config import MIGRATION_CONFIG
+except ImportError:
+    MIGRATION_CONFIG = {}
 
 logger = logging.getLogger(__name__)
 
+# Срок хранения отметок об удалении для ленты изменений, дней
+TOMBSTONE_RETENTION_DAYS = 30
+
+DEFAULT_SCHEMA_CACHE_PATH = 'schema_cache.json'
+# Через сколько часов схема проверяется заново, даже если не менялась
+SCHEMA_CHECK_HOURS = 24
+
+
 class DatabaseManager:
-    def __init__(self):
-        self.connection = None
+    """Операции с паролями поверх выбранного хранилища.
+
+    Хранилище (MySQL или встроенный SQLite) задается в STORAGE_CONFIG;
+    SQL и соединения инкапсулирует src.storage, здесь - проверки,
+    сообщения пользователю и уведомление слушателей об изменениях.
+    """
+    
+    def __init__(self, backend=None):
+        self.backend = backend or create_backend(STORAGE_CONFIG, DB_CONFIG, POOL_CONFIG)
+        self.listeners = []
         self.connect()
     
+    @property
+    def pool(self):
+        """Пул соединений хранилища (None - нет подключения)"""
+        return self.backend.pool
+    
+    @property
+    def fulltext_available(self):
+        return self.backend.fulltext_available
+    
+    @property
+    def disconnect_errors(self):
+        """Ошибки, после которых соединение с хранилищем считается потерянным"""
+        return self.backend.disconnect_errors
+    
+    @metrics.timed('db.connect')
     def connect(self):
         """Устанавливает соединение с базой данных"""
         try:
-            # Проверяем наличие всех необходимых параметров
-            required_fields = ['host', 'user', 'password', 'database']
-            for field in required_fields:
-                if field not in DB_CONFIG:
-                    raise ValueError(f"Отсутствует обязательный параметр: {field}")
-            
-            # Подключаемся к базе данных
-            self.connection = pymysql.connect(
-                host=DB_CONFIG['host'],
-                user=DB_CONFIG['user'],
-                password=DB_CONFIG['password'],
-                database=DB_CONFIG['database'],
-                charset=DB_CONFIG.get('charset', 'utf8mb4'),
-                cursorclass=pymysql.cursors.DictCursor
-            )
+            self.backend.connect()
             
-            logger.info("Подключение к БД установлено")
+            logger.info(f"Подключение к БД установлено ({self.backend.name})")
             print("[SUCCESS] Успешное подключение к базе данных")
             return True
             
-        except pymysql.Error as e:
+        except self.backend.errors as e:
             error_msg = f"Ошибка подключения к базе данных: {e}"
             logger.error(error_msg)
             print(f"[ERROR] {error_msg}")
             print("Проверьте:")
-            print(f"  - Хост: {DB_CONFIG.get('host', 'не указан')}")
-            print(f"  - Пользователь: {DB_CONFIG.get('user', 'не указан')}")
-            print(f"  - База данных: {DB_CONFIG.get('database', 'не указана')}")
-            print(f"  - Убедитесь, что MySQL сервер запущен")
-            print(f"  - Убедитесь, что база данных '{DB_CONFIG.get('database')}' существует")
+            for hint in self.backend.connection_hints():
+                print(f"  - {hint}")
             return False
         
         except Exception as e:
@@ -50,140 +94,385 @@ class DatabaseManager:
             print(f"[ERROR] {error_msg}")
             return False
     
+    def is_available(self):
+        """Можно ли выполнять запросы"""
+        return bool(self.pool)
+    
+    def add_listener(self, callback):
+        """Подписывает callback(action, service, username) на изменения записей.
+        
+        Для пакетных операций service и username равны None. Вызывается
+        в потоке, выполнившем запись.
+        """
+        self.listeners.append(callback)
+    
+    def notify(self, action, service=None, username=None):
+        """Сообщает слушателям об изменении записей"""
+        for callback in self.listeners:
+            try:
+                callback(action, service, username)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике изменений: {e}")
+    
+    @metrics.timed('db.create_table')
     def create_table(self):
-        """Создает таблицу для хранения паролей"""
-        if not self.connection:
+        """Создает таблицу для хранения паролей и применяет недостающие
+        миграции схемы (src.storage.migrations)
+        """
+        if not self.pool:
             print("[ERROR] Нет подключения к БД для создания таблицы")
             return False
             
         try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS passwords (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        service VARCHAR(255) NOT NULL,
-                        username VARCHAR(255) NOT NULL,
-                        password_text VARCHAR(500) NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE KEY unique_service_username (service, username)
-                    ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
-                """)
-                self.connection.commit()
-                logger.info("Таблица создана/проверена")
-                print("[SUCCESS] Таблица passwords создана/проверена")
-                return True
+            runner = MigrationRunner(
+                self.backend,
+                batch_size=MIGRATION_CONFIG.get('batch_size', DEFAULT_BATCH_SIZE),
+                batch_pause=MIGRATION_CONFIG.get('batch_pause_ms', 10) / 1000,
+                progress=lambda message: print(f"[INFO] {message}")
+            )
+            applied = runner.run()
+            if applied:
+                print(f"[SUCCESS] Схема обновлена до версии {applied[-1].version}")
+            logger.info("Таблица создана/проверена")
+            print("[SUCCESS] Таблица passwords создана/проверена")
+            
+            self.ensure_search_indexes()
+            self.prune_tombstones()
+            return True
                 
-        except pymysql.Error as e:
+        except self.backend.errors as e:
             error_msg = f"Ошибка при создании таблицы: {e}"
             logger.error(error_msg)
             print(f"[ERROR] {error_msg}")
             return False
     
+    def ensure_schema(self):
+        """Проверяет схему (create_table), если она не проверялась недавно.
+        
+        Успешная проверка запоминается в файле SCHEMA_CACHE_CONFIG['path']
+        для адреса хранилища: при следующих запусках CREATE TABLE, проверка
+        индексов и очистка отметок об удалении пропускаются, пока не
+        появится новая миграция или не пройдет max_age_hours.
+        """
+        location = self.backend.location() if self.pool else None
+        if location is None or not SCHEMA_CACHE_CONFIG.get('enabled', True):
+            return self.create_table()
+        
+        path = SCHEMA_CACHE_CONFIG.get('path', DEFAULT_SCHEMA_CACHE_PATH)
+        max_age = SCHEMA_CACHE_CONFIG.get('max_age_hours', SCHEMA_CHECK_HOURS) * 3600
+        cache = load_schema_cache(path)
+        entry = cache.get(location)
+        if (entry and entry.get('version') == latest_version(self.backend)
+                and 0 <= time.time() - entry.get('verified_at', 0) < max_age):
+            self.backend.fulltext_available = entry.get('fulltext', False)
+            metrics.increment('db.schema_cache.hit')
+            logger.debug("Схема %s уже проверена, create_table пропущен", location)
+            return True
+        
+        if not self.create_table():
+            return False
+        cache[location] = {'version': latest_version(self.backend), 'verified_at': time.time(),
+                           'fulltext': self.fulltext_available}
+        save_schema_cache(path, cache)
+        return True
+    
+    def invalidate_schema_cache(self):
+        """Забывает результат проверки схемы - следующий ensure_schema выполнит create_table"""
+        location = self.backend.location()
+        path = SCHEMA_CACHE_CONFIG.get('path', DEFAULT_SCHEMA_CACHE_PATH)
+        cache = load_schema_cache(path)
+        if cache.pop(location, None) is not None:
+            save_schema_cache(path, cache)
+    
+    def ensure_search_indexes(self):
+        """Создает индексы для поиска, если их еще нет.
+        
+        Возвращает True, если доступен полнотекстовый поиск подстроки;
+        иначе поиск подстроки работает через LIKE.
+        """
+        try:
+            return self.backend.ensure_search_indexes()
+                
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при создании индексов поиска: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            self.backend.fulltext_available = False
+            return False
+    
+    @metrics.timed('db.add_or_update_password')
     def add_or_update_password(self, service, username, encrypted_password):
         """Добавляет или обновляет пароль"""
-        if not self.connection:
+        if not self.pool:
             raise Exception("Нет подключения к базе данных")
             
         try:
-            with self.connection.cursor() as cursor:
-                # Проверяем существование записи
-                check_sql = "SELECT id FROM passwords WHERE service = %s AND username = %s"
-                cursor.execute(check_sql, (service, username))
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # Обновляем существующую запись
-                    update_sql = "UPDATE passwords SET password_text = %s, created_at = CURRENT_TIMESTAMP WHERE service = %s AND username = %s"
-                    cursor.execute(update_sql, (encrypted_password, service, username))
-                    action = "обновлен"
-                else:
-                    # Добавляем новую запись
-                    insert_sql = "INSERT INTO passwords (service, username, password_text) VALUES (%s, %s, %s)"
-                    cursor.execute(insert_sql, (service, username, encrypted_password))
-                    action = "добавлен"
-                
-                self.connection.commit()
-                logger.info(f"Пароль для {service} {action}")
-                print(f"[SUCCESS] Пароль для {service} успешно {action}")
-                return action
+            inserted = self.backend.upsert(service, username, encrypted_password)
+            action = "добавлен" if inserted else "обновлен"
+            
+            self.notify('upsert', service, username)
+            logger.info("Пароль для %s %s", service, action)
+            return action
                 
-        except pymysql.Error as e:
+        except self.backend.errors as e:
             error_msg = f"Ошибка при сохранении пароля: {e}"
             logger.error(error_msg)
             print(f"[ERROR] {error_msg}")
             raise
     
+    @metrics.timed('db.bulk_upsert')
+    def bulk_upsert(self, rows, chunk_size=1000):
+        """Пакетно добавляет или обновляет записи.
+        
+        rows - итерируемый объект кортежей (service, username, encrypted_password).
+        Каждая порция из chunk_size строк записывается одним executemany
+        в отдельной транзакции. Возвращает количество записанных строк.
+        """
+        if not self.pool:
+            raise Exception("Нет подключения к базе данных")
+        
+        try:
+            total = self.backend.bulk_upsert(rows, chunk_size=chunk_size)
+            
+            self.notify('bulk')
+            logger.info(f"Пакетно записано {total} записей")
+            return total
+            
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при пакетной записи паролей: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.update_password_texts')
+    def update_password_texts(self, updates):
+        """Заменяет шифротексты записей одной транзакцией.
+        
+        updates - список кортежей (new_password_text, id, old_password_text).
+        Запись обновляется, только если ее шифротекст не изменился с момента
+        чтения, поэтому параллельное сохранение пароля не будет затерто.
+        Возвращает количество обновленных записей.
+        """
+        if not self.pool:
+            raise Exception("Нет подключения к базе данных")
+        if not updates:
+            return 0
+        
+        try:
+            updated = self.backend.update_password_texts(updates)
+            
+            self.notify('bulk')
+            return updated
+                
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при обновлении шифротекстов: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.get_all_passwords')
     def get_all_passwords(self):
         """Возвращает все пароли"""
-        if not self.connection:
+        if not self.pool:
             raise Exception("Нет подключения к базе данных")
             
         try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT service, username, password_text, created_at 
-                    FROM passwords 
-                    ORDER BY service, username
-                """)
-                results = cursor.fetchall()
-                print(f"[SUCCESS] Загружено {len(results)} записей из базы данных")
-                return results
+            results = self.backend.fetch_all()
+            logger.debug("Загружено %d записей из базы данных", len(results))
+            return results
                 
-        except pymysql.Error as e:
+        except self.backend.errors as e:
             error_msg = f"Ошибка при загрузке паролей: {e}"
             logger.error(error_msg)
             print(f"[ERROR] {error_msg}")
             raise
     
-    def search_passwords(self, search_term):
-        """Ищет пароли по сервису"""
-        if not self.connection:
+    @metrics.timed('db.get_passwords_page')
+    def get_passwords_page(self, limit, after=None):
+        """Возвращает страницу паролей после ключа (service, username).
+        
+        Используется keyset-пагинация по уникальному индексу
+        (service, username): стоимость запроса не зависит от номера
+        страницы. Для следующей страницы передайте (service, username)
+        последней записи текущей страницы.
+        """
+        if not self.pool:
             raise Exception("Нет подключения к базе данных")
             
         try:
-            with self.connection.cursor() as cursor:
-                sql = """
-                    SELECT service, username, password_text, created_at 
-                    FROM passwords 
-                    WHERE service LIKE %s 
-                    ORDER BY service, username
-                """
-                cursor.execute(sql, (f'%{search_term}%',))
-                results = cursor.fetchall()
-                print(f"[SUCCESS] Найдено {len(results)} записей по запросу '{search_term}'")
-                return results
+            return self.backend.fetch_page(limit, after=after)
                 
-        except pymysql.Error as e:
-            error_msg = f"Ошибка при поиске: {e}"
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при загрузке страницы паролей: {e}"
             logger.error(error_msg)
             print(f"[ERROR] {error_msg}")
             raise
     
-    def delete_password(self, service, username):
-        """Удаляет пароль"""
-        if not self.connection:
+    def iter_passwords(self, batch_size=1000):
+        """Построчно отдает все пароли, не загружая таблицу в память.
+        
+        Использует отдельное соединение вне пула (для MySQL - небуферизованный
+        SSDictCursor), чтобы долгий обход не занимал соединения пула.
+        """
+        try:
+            yield from self.backend.iter_rows(batch_size=batch_size)
+                    
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при потоковом чтении паролей: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.get_change_version')
+    def get_change_version(self):
+        """Возвращает текущую версию хранилища (для последующего get_changes)"""
+        if not self.pool:
             raise Exception("Нет подключения к базе данных")
             
         try:
-            with self.connection.cursor() as cursor:
-                # Сначала проверим существование записи
-                check_sql = "SELECT id FROM passwords WHERE service = %s AND username = %s"
-                cursor.execute(check_sql, (service, username))
-                existing = cursor.fetchone()
+            return self.backend.current_version()
                 
-                if not existing:
-                    raise Exception(f"Запись для {service} ({username}) не найдена")
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при чтении версии хранилища: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.get_changes')
+    def get_changes(self, since_version=0, limit=1000):
+        """Возвращает изменения с версией больше since_version.
+        
+        Каждая запись (добавление, обновление, перешифровка) получает новую
+        версию, удаление оставляет отметку с версией. Результат - словарь:
+          rows    - добавленные или измененные записи (с полем version);
+          deleted - удаленные записи (id, service, username, version);
+          version - версия, с которой запрашивать следующую порцию;
+          more    - есть еще изменения (порция ограничена limit);
+          reset   - отметки об удалении уже очищены, нужна полная перезагрузка.
+        Сначала применяйте deleted, затем rows: id удаленной записи может
+        быть выдан новой.
+        """
+        if not self.pool:
+            raise Exception("Нет подключения к базе данных")
+            
+        try:
+            return self.backend.fetch_changes(since_version, limit=limit)
+                
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при загрузке изменений: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.prune_tombstones')
+    def prune_tombstones(self, older_than_days=TOMBSTONE_RETENTION_DAYS):
+        """Удаляет отметки об удалении старше older_than_days дней.
+        
+        Клиенты, не синхронизировавшиеся дольше этого срока, получат
+        reset=True и перезагрузят данные целиком.
+        """
+        if not self.pool:
+            return 0
+            
+        before = (datetime.now() - timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            pruned = self.backend.prune_tombstones(before)
+            if pruned:
+                logger.info(f"Удалено {pruned} отметок об удалении старше {older_than_days} дней")
+            return pruned
                 
-                # Удаляем запись
-                delete_sql = "DELETE FROM passwords WHERE service = %s AND username = %s"
-                cursor.execute(delete_sql, (service, username))
-                self.connection.commit()
+        except self.backend.errors as e:
+            logger.error(f"Ошибка при очистке отметок об удалении: {e}")
+            return 0
+    
+    @metrics.timed('db.get_password_ids')
+    def get_password_ids(self):
+        """Возвращает id всех записей (для поиска удаленных записей)"""
+        if not self.pool:
+            raise Exception("Нет подключения к базе данных")
+            
+        try:
+            return self.backend.fetch_ids()
                 
-                logger.info(f"Пароль для {service} удален")
-                print(f"[SUCCESS] Пароль для {service} ({username}) удален")
-                return True
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при загрузке id записей: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.count_passwords')
+    def count_passwords(self):
+        """Возвращает количество сохраненных паролей"""
+        if not self.pool:
+            raise Exception("Нет подключения к базе данных")
+            
+        try:
+            return self.backend.count()
                 
-        except pymysql.Error as e:
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при подсчете паролей: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.get_password')
+    def get_password(self, service, username=None):
+        """Возвращает записи сервиса (одну, если указан username) по
+        уникальному ключу (service, username) - без просмотра таблицы
+        """
+        if not self.pool:
+            raise Exception("Нет подключения к базе данных")
+            
+        try:
+            return self.backend.fetch_account(service, username)
+                
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при чтении пароля: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.search_passwords')
+    def search_passwords(self, search_term, mode='substring', limit=None):
+        """Ищет пароли по сервису и имени пользователя без учета регистра.
+        
+        mode='prefix' - поиск по началу названия сервиса или имени
+        пользователя, использует индексы (service, username) и idx_username.
+        mode='substring' - поиск подстроки; в MySQL при наличии
+        FULLTEXT-индекса ft_service_username (ngram) кандидаты отбираются
+        по нему, а точное совпадение проверяется через LIKE.
+        """
+        if not self.pool:
+            raise Exception("Нет подключения к базе данных")
+        if mode not in ('prefix', 'substring'):
+            raise ValueError(f"Неизвестный режим поиска: {mode}")
+            
+        try:
+            results = self.backend.search(search_term, mode=mode, limit=limit)
+            logger.debug("Найдено %d записей по запросу '%s'", len(results), search_term)
+            return results
+                
+        except self.backend.errors as e:
+            error_msg = f"Ошибка при поиске: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise
+    
+    @metrics.timed('db.delete_password')
+    def delete_password(self, service, username):
+        """Удаляет пароль"""
+        if not self.pool:
+            raise Exception("Нет подключения к базе данных")
+            
+        try:
+            if self.backend.delete(service, username) == 0:
+                raise Exception(f"Запись для {service} ({username}) не найдена")
+            
+            self.notify('delete', service, username)
+            logger.info("Пароль для %s (%s) удален", service, username)
+            return True
+                
+        except self.backend.errors as e:
             error_msg = f"Ошибка при удалении: {e}"
             logger.error(error_msg)
             print(f"[ERROR] {error_msg}")
@@ -192,11 +481,10 @@ class DatabaseManager:
     def test_connection(self):
         """Тестирует соединение с базой данных"""
         try:
-            if self.connection and self.connection.open:
-                with self.connection.cursor() as cursor:
-                    cursor.execute("SELECT 1")
-                    print("[SUCCESS] Соединение с БД активно")
-                    return True
+            if self.pool:
+                self.backend.ping()
+                print("[SUCCESS] Соединение с БД активно")
+                return True
             else:
                 print("[ERROR] Соединение с БД не активно")
                 return False
@@ -204,13 +492,40 @@ class DatabaseManager:
             print(f"[ERROR] Ошибка тестирования соединения: {e}")
             return False
     
+    def pool_metrics(self):
+        """Возвращает метрики пула соединений для мониторинга"""
+        return self.backend.metrics()
+    
     def close(self):
-        """Закрывает соединение с БД"""
-        if self.connection:
+        """Закрывает соединения с БД"""
+        if self.pool:
             try:
-                self.connection.close()
+                logger.info(f"Метрики пула соединений: {self.pool.metrics()}")
+                self.backend.close()
                 logger.info("Соединение с БД закрыто")
                 print("[SUCCESS] Соединение с базой данных закрыто")
             except Exception as e:
                 logger.error(f"Ошибка при закрытии соединения: {e}")
-                print(f"[ERROR] Ошибка при закрытии соединения: {e}")
\ No newline at end of file
+                print(f"[ERROR] Ошибка при закрытии соединения: {e}")
+
+
+def load_schema_cache(path):
+    """Читает сохраненные результаты проверки схемы ({адрес: запись})"""
+    try:
+        with open(path, encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_schema_cache(path, cache):
+    """Атомарно записывает результаты проверки схемы"""
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(cache, cache_file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+    except OSError as e:
+        # Без кэша схема просто проверяется при каждом запуске
+        logger.warning(f"Не удалось сохранить кэш проверки схемы: {e}")
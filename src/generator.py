@@ -0,0 +1,275 @@
+import argparse
+import math
+import os
+import secrets
+import string
+import sys
+import time
+from functools import lru_cache
+from itertools import combinations
+
+DEFAULT_SYMBOLS = "!@#$%^&*-_=+?"
+# Символы, которые легко спутать при чтении и ручном вводе
+LOOKALIKES = "Il1|O0o`'\""
+WORDLIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wordlist.txt')
+
+# Сколько байт запрашивать у ОС за раз
+RANDOM_BUFFER_SIZE = 4096
+# Больше ограничений - слишком много слагаемых в формуле включений-исключений
+MAX_CONSTRAINTS = 12
+
+
+@lru_cache(maxsize=4)
+def load_wordlist(path=WORDLIST_PATH):
+    """Загружает список слов для парольных фраз (по слову в строке)"""
+    with open(path, encoding='utf-8') as wordlist_file:
+        words = tuple(sorted({line.strip() for line in wordlist_file if line.strip()}))
+    if len(words) < 2:
+        raise ValueError(f"Список слов слишком мал: {path}")
+    return words
+
+
+class RandomSource:
+    """Криптостойкий источник случайных индексов.
+
+    Байты берутся из secrets.token_bytes блоками по buffer_size, а
+    индекс в диапазоне [0, n) получается отбором без смещения: значения
+    из неполного последнего «круга» остатков отбрасываются. Не
+    потокобезопасен - у каждого потока должен быть свой источник.
+    """
+
+    def __init__(self, buffer_size=RANDOM_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.buffer = b''
+        self.offset = 0
+
+    def take(self, size):
+        if len(self.buffer) - self.offset < size:
+            self.buffer = secrets.token_bytes(max(self.buffer_size, size))
+            self.offset = 0
+        chunk = self.buffer[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def indices(self, n, count):
+        """Возвращает count равномерно распределенных чисел из [0, n)"""
+        if not 0 < n <= 65536:
+            raise ValueError(f"Размер диапазона вне пределов 1..65536: {n}")
+        if n == 1:
+            return [0] * count
+
+        width = 1 if n <= 256 else 2
+        space = 256 ** width
+        limit = space - space % n
+
+        result = []
+        while len(result) < count:
+            need = count - len(result)
+            # С запасом на отброшенные значения, чтобы обычно хватало одного блока
+            data = self.take(width * (need + need // 2 + 2))
+            values = data if width == 1 else memoryview(data).cast('H')
+            result.extend(value % n for value in values if value < limit)
+        del result[count:]
+        return result
+
+
+class PasswordPolicy:
+    """Требования к паролю.
+
+    required - символы, каждый из которых должен встретиться в пароле;
+    require_each_class - хотя бы один символ каждого включенного класса;
+    exclude - символы, которые не должны встречаться.
+    """
+
+    def __init__(self, length=16, lowercase=True, uppercase=True, digits=True, symbols=True,
+                 symbol_set=DEFAULT_SYMBOLS, exclude_lookalikes=True, exclude='', required='',
+                 require_each_class=True):
+        self.length = length
+        self.lowercase = lowercase
+        self.uppercase = uppercase
+        self.digits = digits
+        self.symbols = symbols
+        self.symbol_set = symbol_set
+        self.exclude_lookalikes = exclude_lookalikes
+        self.exclude = exclude
+        self.required = required
+        self.require_each_class = require_each_class
+
+    def classes(self):
+        """Включенные классы символов без исключенных символов"""
+        excluded = set(self.exclude)
+        if self.exclude_lookalikes:
+            excluded.update(LOOKALIKES)
+
+        classes = []
+        for enabled, chars in ((self.lowercase, string.ascii_lowercase),
+                               (self.uppercase, string.ascii_uppercase),
+                               (self.digits, string.digits),
+                               (self.symbols, self.symbol_set)):
+            if enabled:
+                chars = ''.join(dict.fromkeys(char for char in chars if char not in excluded))
+                if chars:
+                    classes.append(chars)
+        return classes
+
+
+class PasswordGenerator:
+    """Генератор паролей по PasswordPolicy.
+
+    Пароль выбирается равномерно среди всех строк нужной длины, которые
+    удовлетворяют политике (кандидат, нарушающий ее, отбрасывается
+    целиком), поэтому entropy_bits - точное значение log2 от числа
+    допустимых паролей.
+    """
+
+    def __init__(self, policy=None, source=None):
+        self.policy = policy or PasswordPolicy()
+        self.source = source or RandomSource()
+
+        classes = self.policy.classes()
+        self.alphabet = ''.join(dict.fromkeys(''.join(classes)))
+        if not self.alphabet:
+            raise ValueError("Политика не оставляет ни одного символа")
+
+        missing = [char for char in self.policy.required if char not in self.alphabet]
+        if missing:
+            raise ValueError(f"Обязательные символы не входят в алфавит: {''.join(missing)}")
+
+        self.constraints = [frozenset(chars) for chars in classes] if self.policy.require_each_class else []
+        self.constraints += [frozenset(char) for char in dict.fromkeys(self.policy.required)]
+        if len(self.constraints) > MAX_CONSTRAINTS:
+            raise ValueError(f"Слишком много обязательных символов и классов (максимум {MAX_CONSTRAINTS})")
+
+        self.valid_count = self.count_valid()
+        if self.valid_count == 0:
+            raise ValueError("Длина пароля меньше числа обязательных символов и классов")
+        self.entropy_bits = math.log2(self.valid_count)
+        # Доля кандидатов, прошедших проверку (для оценки скорости)
+        self.acceptance = self.valid_count / len(self.alphabet) ** self.policy.length
+
+    def count_valid(self):
+        """Число паролей, удовлетворяющих ограничениям (включения-исключения)"""
+        size = len(self.alphabet)
+        length = self.policy.length
+        total = 0
+        for k in range(len(self.constraints) + 1):
+            for subset in combinations(self.constraints, k):
+                # Пароли без единого символа из множеств subset
+                forbidden = len(frozenset().union(*subset))
+                total += (-1) ** k * (size - forbidden) ** length
+        return total
+
+    def satisfies(self, password):
+        chars = set(password)
+        return all(not constraint.isdisjoint(chars) for constraint in self.constraints)
+
+    def generate(self):
+        alphabet = self.alphabet
+        while True:
+            password = ''.join([alphabet[i] for i in self.source.indices(len(alphabet), self.policy.length)])
+            if self.satisfies(password):
+                return password
+
+    def generate_many(self, count):
+        """Пакетная генерация: count независимых паролей"""
+        return [self.generate() for _ in range(count)]
+
+
+class PassphrasePolicy:
+    """Парольная фраза из слов встроенного списка"""
+
+    def __init__(self, words=6, separator='-', capitalize=False, add_number=False, wordlist_path=WORDLIST_PATH):
+        self.words = words
+        self.separator = separator
+        self.capitalize = capitalize
+        self.add_number = add_number
+        self.wordlist_path = wordlist_path
+
+
+class PassphraseGenerator:
+    """Генератор парольных фраз с тем же интерфейсом, что PasswordGenerator"""
+
+    def __init__(self, policy=None, source=None):
+        self.policy = policy or PassphrasePolicy()
+        self.source = source or RandomSource()
+        if self.policy.words < 1:
+            raise ValueError("В фразе должно быть хотя бы одно слово")
+        self.wordlist = load_wordlist(self.policy.wordlist_path)
+        self.entropy_bits = self.policy.words * math.log2(len(self.wordlist))
+        if self.policy.add_number:
+            self.entropy_bits += math.log2(10)
+
+    def generate(self):
+        words = [self.wordlist[i] for i in self.source.indices(len(self.wordlist), self.policy.words)]
+        if self.policy.capitalize:
+            words = [word.capitalize() for word in words]
+        if self.policy.add_number:
+            position, digit = self.source.indices(len(words), 1)[0], self.source.indices(10, 1)[0]
+            words[position] += str(digit)
+        return self.policy.separator.join(words)
+
+    def generate_many(self, count):
+        return [self.generate() for _ in range(count)]
+
+
+def create_generator(config=None, source=None):
+    """Создает генератор по словарю настроек (GENERATOR_CONFIG).
+
+    mode='passphrase' - параметры PassphrasePolicy, иначе PasswordPolicy.
+    """
+    options = dict(config or {})
+    if options.pop('mode', 'password') == 'passphrase':
+        return PassphraseGenerator(PassphrasePolicy(**options), source=source)
+    return PasswordGenerator(PasswordPolicy(**options), source=source)
+
+
+def strength_label(entropy_bits):
+    """Словесная оценка стойкости по энтропии"""
+    if entropy_bits < 50:
+        return "слабый"
+    if entropy_bits < 80:
+        return "средний"
+    if entropy_bits < 128:
+        return "сильный"
+    return "очень сильный"
+
+
+def main(argv=None):
+    """Пакетная генерация: python -m src.generator --count 1000 [--passphrase]"""
+    parser = argparse.ArgumentParser(description="Генерация паролей и парольных фраз")
+    parser.add_argument('--count', type=int, default=1, help="количество паролей")
+    parser.add_argument('--length', type=int, default=16, help="длина пароля")
+    parser.add_argument('--no-symbols', action='store_true', help="без спецсимволов")
+    parser.add_argument('--allow-lookalikes', action='store_true', help="разрешить похожие символы (l, 1, O, 0...)")
+    parser.add_argument('--required', default='', help="символы, обязательные в каждом пароле")
+    parser.add_argument('--passphrase', action='store_true', help="парольная фраза вместо пароля")
+    parser.add_argument('--words', type=int, default=6, help="слов в парольной фразе")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.passphrase:
+            generator = PassphraseGenerator(PassphrasePolicy(words=args.words))
+        else:
+            generator = PasswordGenerator(PasswordPolicy(
+                length=args.length,
+                symbols=not args.no_symbols,
+                exclude_lookalikes=not args.allow_lookalikes,
+                required=args.required
+            ))
+    except ValueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    passwords = generator.generate_many(args.count)
+    elapsed = time.perf_counter() - started
+
+    sys.stdout.write('\n'.join(passwords) + '\n')
+    rate = args.count / elapsed if elapsed > 0 else 0.0
+    print(f"[INFO] {args.count} шт. за {elapsed:.3f} с ({rate:.0f}/с), энтропия "
+          f"{generator.entropy_bits:.1f} бит ({strength_label(generator.entropy_bits)})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
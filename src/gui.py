@@ -1,42 +1,229 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, simpledialog, filedialog
 import logging
+import time
+from bisect import bisect_left, insort
 from datetime import datetime
-import random
-import string
 
 from src.database import DatabaseManager
-from src.security import EncryptionManager
+from src.generator import create_generator, strength_label
+from src.replica import DEFAULT_REPLICA_PATH, LocalReplica, ReplicatedDatabase
+from src.search_index import SearchCache
+from src.secret_cache import SecretCache
+from src.kdf import InvalidMasterPassword
+from src.metrics import METRICS_CONFIG, metrics
+from src.security import create_encryption_manager, master_password_state
+from src.workers import BackgroundExecutor
+
+try:
+    from config.config import SECRET_CACHE_CONFIG
+except ImportError:
+    SECRET_CACHE_CONFIG = {}
+
+try:
+    from config.config import REPLICA_CONFIG
+except ImportError:
+    REPLICA_CONFIG = {}
+
+try:
+    from config.config import GENERATOR_CONFIG
+except ImportError:
+    GENERATOR_CONFIG = {}
 
 logger = logging.getLogger(__name__)
 
+# Количество записей, подгружаемых в таблицу за один запрос
+VIEW_PAGE_SIZE = 200
+# Заполнитель для нерасшифрованного пароля
+HIDDEN_PASSWORD = "••••••••"
+# Пауза в наборе текста перед запуском поиска, мс
+SEARCH_DEBOUNCE_MS = 250
+# Период опроса очереди результатов фоновых задач, мс
+WORKER_POLL_MS = 50
+# Количество потоков для работы с БД и шифрованием
+WORKER_THREADS = 4
+# Максимальное количество записей в результатах поиска
+SEARCH_RESULT_LIMIT = 500
+# Попыток ввода мастер-пароля при запуске
+MASTER_PASSWORD_ATTEMPTS = 3
+
+class StartupError(Exception):
+    """Приложение не может начать работу (нет БД, ключа или мастер-пароля)"""
+
+
 class PasswordManagerGUI:
-    def __init__(self, root):
+    def __init__(self, root, started=None):
         self.root = root
         self.root.title("Менеджер паролей")
         self.root.geometry("900x700")
         
-        # Инициализация менеджеров
-        self.encryption = EncryptionManager()
-        self.db = DatabaseManager()
-        if not self.db.connection:
-            messagebox.showerror("Ошибка", "Не удалось подключиться к базе данных")
+        # Окно показывается сразу с заставкой, а подключение к БД и
+        # загрузка ключа идут параллельно в фоне (finish_startup).
+        # started - время начала запуска (perf_counter) для отчета о старте
+        self.started = started if started is not None else time.perf_counter()
+        self.startup_timings = {}
+        self.startup_failed = False
+        self.db = None
+        self.encryption = None
+        self.password_generator = None
+        self.secret_cache = None
+        
+        self.executor = BackgroundExecutor(
+            self.root,
+            max_workers=WORKER_THREADS,
+            poll_interval=WORKER_POLL_MS,
+            on_progress=self.show_progress
+        )
+        
+        self.show_splash()
+        self.executor.submit(self.open_database, on_success=self.on_database_ready,
+                             on_error=self.on_startup_error, description="Подключение к БД")
+        # Запрос мастер-пароля - после первой отрисовки окна
+        self.root.after_idle(self.unlock_encryption)
+    
+    def show_splash(self):
+        """Показывает заставку на время запуска"""
+        self.splash = ttk.Frame(self.root)
+        self.splash.pack(expand=True)
+        ttk.Label(self.splash, text="Менеджер паролей", font=('TkDefaultFont', 16)).pack(pady=10)
+        self.splash_var = tk.StringVar(value="Подключение к базе данных и загрузка ключа...")
+        ttk.Label(self.splash, textvariable=self.splash_var).pack(pady=5)
+        self.splash_progress = ttk.Progressbar(self.splash, mode='indeterminate', length=250)
+        self.splash_progress.pack(pady=10)
+        self.splash_progress.start(10)
+        self.root.update_idletasks()
+        self.record_startup('window')
+    
+    def record_startup(self, stage):
+        """Запоминает время этапа от начала запуска, мс"""
+        seconds = time.perf_counter() - self.started
+        self.startup_timings[stage] = seconds * 1000
+        metrics.observe(f'startup.{stage}', seconds)
+    
+    def open_database(self):
+        """Подключается к хранилищу и проверяет схему (в фоновом потоке)"""
+        db = DatabaseManager()
+        if REPLICA_CONFIG.get('enabled'):
+            # Чтение из локальной реплики, работа без связи с сервером
+            replica = LocalReplica(REPLICA_CONFIG.get('path', DEFAULT_REPLICA_PATH))
+            db = ReplicatedDatabase(db, replica)
+        if not db.is_available():
+            raise StartupError("Не удалось подключиться к базе данных")
+        
+        # Проверенная схема не проверяется при каждом запуске
+        if db.pool and not db.ensure_schema():
+            db.close()
+            raise StartupError("Не удалось создать таблицу")
+        return db
+    
+    def on_database_ready(self, db):
+        if self.startup_failed:
+            db.close()
             return
+        self.db = db
+        self.record_startup('database')
+        self.finish_startup()
+    
+    def unlock_encryption(self, attempt=1):
+        """Загружает ключи в фоне; мастер-пароль запрашивается в главном потоке"""
+        first_run = master_password_state()
+        password = None
+        if first_run is not None:
+            self.splash_var.set("Ожидание мастер-пароля...")
+            password = self.ask_master_password(first_run)
+            self.splash_var.set("Разблокировка хранилища...")
+        
+        def on_error(e):
+            if isinstance(e, InvalidMasterPassword) and attempt < MASTER_PASSWORD_ATTEMPTS and password:
+                logger.warning(f"Разблокировка не удалась (попытка {attempt}): {e}")
+                messagebox.showerror("Ошибка", str(e))
+                self.unlock_encryption(attempt + 1)
+            else:
+                self.on_startup_error(e)
         
-        if not self.db.create_table():
-            messagebox.showerror("Ошибка", "Не удалось создать таблицу")
+        self.executor.submit(create_encryption_manager, ask_password=lambda first_run: password,
+                             on_success=self.on_encryption_ready, on_error=on_error,
+                             description="Загрузка ключа")
+    
+    def on_encryption_ready(self, encryption):
+        if self.startup_failed:
             return
+        self.encryption = encryption
+        self.record_startup('encryption')
+        self.finish_startup()
+    
+    def on_startup_error(self, error):
+        """Сообщает, что приложение не может начать работу"""
+        if self.startup_failed:
+            return
+        self.startup_failed = True
+        logger.error(f"Ошибка запуска: {error}")
+        self.splash_progress.stop()
+        self.splash_var.set(f"Ошибка запуска: {error}")
+        messagebox.showerror("Ошибка", str(error))
+    
+    def finish_startup(self):
+        """Строит интерфейс, когда готовы и хранилище, и ключи"""
+        if self.db is None or self.encryption is None:
+            return
+        
+        # Необязательный кэш расшифрованных паролей
+        if SECRET_CACHE_CONFIG.get('enabled'):
+            self.secret_cache = SecretCache(
+                max_entries=SECRET_CACHE_CONFIG.get('max_entries', 256),
+                ttl=SECRET_CACHE_CONFIG.get('ttl', 60)
+            )
+            self.db.add_listener(self.secret_cache.on_change)
+            self.root.after(int(self.secret_cache.ttl * 1000), self.purge_secret_cache)
         
+        self.splash_progress.stop()
+        self.splash.destroy()
         self.setup_ui()
-        logger.info("Приложение запущено")
-    
+        if isinstance(self.db, ReplicatedDatabase):
+            self.sync_replica()
+        if METRICS_CONFIG.get('export_path'):
+            self.schedule_metrics_export()
+        
+        self.record_startup('ready')
+        timings = self.startup_timings
+        summary = (f"окно {timings['window']:.0f} мс, БД {timings['database']:.0f} мс, "
+                   f"ключ {timings['encryption']:.0f} мс, готово {timings['ready']:.0f} мс")
+        logger.info(f"Приложение запущено: {summary}")
+        print(f"[INFO] Запуск: {summary}")
+        self.status_var.set(f"Готов к работе (запуск {timings['ready']:.0f} мс)")
+
+    def ask_master_password(self, first_run):
+        """Запрашивает мастер-пароль (при первом запуске - с подтверждением)"""
+        if not first_run:
+            return simpledialog.askstring("Мастер-пароль", "Введите мастер-пароль:", show='*', parent=self.root)
+        
+        while True:
+            password = simpledialog.askstring(
+                "Мастер-пароль", "Придумайте мастер-пароль.\nБез него пароли не восстановить!",
+                show='*', parent=self.root
+            )
+            if not password:
+                return None
+            confirmation = simpledialog.askstring("Мастер-пароль", "Повторите мастер-пароль:", show='*', parent=self.root)
+            if password == confirmation:
+                return password
+            messagebox.showerror("Ошибка", "Пароли не совпадают")
+
     def setup_ui(self):
         """Настраивает пользовательский интерфейс"""
         # Статус бар
+        status_frame = ttk.Frame(self.root, relief='sunken')
+        status_frame.pack(side='bottom', fill='x')
+        
         self.status_var = tk.StringVar()
         self.status_var.set("Готов к работе")
-        status_bar = ttk.Label(self.root, textvariable=self.status_var, relief='sunken')
-        status_bar.pack(side='bottom', fill='x')
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var)
+        status_bar.pack(side='left', fill='x', expand=True)
+        
+        # Индикатор фоновых операций
+        self.progress_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.progress_var).pack(side='right', padx=5)
+        self.progress_bar = ttk.Progressbar(status_frame, mode='indeterminate', length=100)
         
         # Создаем вкладки
         self.notebook = ttk.Notebook(self.root)
@@ -46,6 +233,7 @@ class PasswordManagerGUI:
         self.create_add_tab()
         self.create_view_tab()
         self.create_search_tab()
+        self.create_diagnostics_tab()
     
     def create_add_tab(self):
         """Создает вкладку добавления пароля"""
@@ -103,15 +291,53 @@ class PasswordManagerGUI:
         toolbar.pack(fill='x', padx=10, pady=5)
         
         ttk.Button(toolbar, text="Обновить", command=self.view_all_passwords).pack(side='left', padx=2)
+        ttk.Button(toolbar, text="Показать/скрыть пароль", command=self.toggle_reveal_selected).pack(side='left', padx=2)
         ttk.Button(toolbar, text="Копировать пароль", command=self.copy_password).pack(side='left', padx=2)
         ttk.Button(toolbar, text="Удалить", command=self.delete_selected).pack(side='left', padx=2)
         
-        # Поле для вывода
-        self.view_result_text = scrolledtext.ScrolledText(self.view_frame, height=20, width=80)
-        self.view_result_text.pack(padx=10, pady=10, fill='both', expand=True)
+        # Таблица паролей: строки подгружаются страницами при прокрутке,
+        # пароли расшифровываются только по запросу пользователя
+        table_frame = ttk.Frame(self.view_frame)
+        table_frame.pack(padx=10, pady=10, fill='both', expand=True)
+        
+        self.view_tree, scrollbar = self.create_password_table(table_frame)
+        self.view_tree.configure(yscrollcommand=lambda first, last: self.on_view_scroll(scrollbar, first, last))
         
-        # Загружаем данные
-        self.view_all_passwords()
+        self.view_tree.bind('<Double-1>', lambda event: self.toggle_reveal_selected())
+        
+        # Состояние виртуализированного списка
+        self.view_rows = {}
+        # Отсортированные (view_sort_key, iid) загруженных строк - в порядке таблицы
+        self.view_keys = []
+        self.view_revealed = set()
+        self.view_loaded = 0
+        self.view_total = 0
+        self.view_last_key = None
+        self.view_loading = False
+        self.view_generation = 0
+        # Версия хранилища, до которой таблица актуальна (лента изменений)
+        self.view_version = None
+        # Записи загружаются при первом открытии вкладки (on_tab_changed)
+        self.view_opened = False
+    
+    def create_password_table(self, parent):
+        """Создает таблицу записей с прокруткой"""
+        columns = ('service', 'username', 'password', 'created_at')
+        tree = ttk.Treeview(parent, columns=columns, show='headings', selectmode='browse')
+        tree.heading('service', text="Сервис")
+        tree.heading('username', text="Пользователь")
+        tree.heading('password', text="Пароль")
+        tree.heading('created_at', text="Добавлен")
+        tree.column('service', width=220)
+        tree.column('username', width=200)
+        tree.column('password', width=200)
+        tree.column('created_at', width=150)
+        
+        scrollbar = ttk.Scrollbar(parent, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        return tree, scrollbar
     
     def create_search_tab(self):
         """Создает вкладку поиска"""
@@ -122,16 +348,129 @@ class PasswordManagerGUI:
         search_frame = ttk.Frame(self.search_frame)
         search_frame.pack(fill='x', padx=10, pady=10)
         
-        ttk.Label(search_frame, text="Поиск по сервису:").grid(row=0, column=0, padx=5, pady=5)
+        ttk.Label(search_frame, text="Сервис или пользователь:").grid(row=0, column=0, padx=5, pady=5)
         self.search_entry = ttk.Entry(search_frame, width=40)
         self.search_entry.grid(row=0, column=1, padx=5, pady=5)
+        self.search_entry.bind('<KeyRelease>', self.on_search_input)
+        self.search_entry.bind('<Return>', lambda event: self.search_passwords(warn_empty=True))
         
-        ttk.Button(search_frame, text="Искать", command=self.search_passwords).grid(row=0, column=2, padx=5)
+        ttk.Button(search_frame, text="Искать", 
+                  command=lambda: self.search_passwords(warn_empty=True)).grid(row=0, column=2, padx=5)
         ttk.Button(search_frame, text="Сбросить", command=self.reset_search).grid(row=0, column=3, padx=5)
         
+        # Действия с найденной записью
+        toolbar = ttk.Frame(self.search_frame)
+        toolbar.pack(fill='x', padx=10)
+        
+        ttk.Button(toolbar, text="Показать/скрыть пароль", 
+                  command=lambda: self.toggle_reveal(self.search_tree, self.search_rows, self.search_revealed)).pack(side='left', padx=2)
+        ttk.Button(toolbar, text="Копировать пароль", 
+                  command=lambda: self.copy_row_password(self.search_tree, self.search_rows)).pack(side='left', padx=2)
+        
         # Результаты поиска
-        self.search_result_text = scrolledtext.ScrolledText(self.search_frame, height=20, width=80)
-        self.search_result_text.pack(padx=10, pady=10, fill='both', expand=True)
+        table_frame = ttk.Frame(self.search_frame)
+        table_frame.pack(padx=10, pady=10, fill='both', expand=True)
+        self.search_tree, _ = self.create_password_table(table_frame)
+        self.search_tree.bind('<Double-1>', lambda event: self.toggle_reveal(
+            self.search_tree, self.search_rows, self.search_revealed))
+        
+        # Поиск по мере ввода: запросы выполняются в фоне,
+        # результаты устаревших запросов отбрасываются
+        self.search_rows = {}
+        self.search_revealed = set()
+        self.search_cache = SearchCache()
+        self.search_after_id = None
+        self.search_generation = 0
+        self.search_future = None
+
+    def create_diagnostics_tab(self):
+        """Создает вкладку диагностики: время операций и самые долгие вызовы"""
+        self.diagnostics_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.diagnostics_frame, text="Диагностика")
+        
+        toolbar = ttk.Frame(self.diagnostics_frame)
+        toolbar.pack(fill='x', padx=10, pady=5)
+        ttk.Button(toolbar, text="Обновить", command=self.refresh_diagnostics).pack(side='left', padx=2)
+        ttk.Button(toolbar, text="Сбросить", command=self.reset_diagnostics).pack(side='left', padx=2)
+        ttk.Button(toolbar, text="Экспорт...", command=self.export_metrics_dialog).pack(side='left', padx=2)
+        self.pool_metrics_var = tk.StringVar()
+        ttk.Label(toolbar, textvariable=self.pool_metrics_var).pack(side='left', padx=10)
+        
+        columns = ('count', 'avg', 'p95', 'max', 'total')
+        self.operations_tree = ttk.Treeview(self.diagnostics_frame, columns=columns, height=12)
+        self.operations_tree.heading('#0', text="Операция")
+        self.operations_tree.column('#0', width=260)
+        for column, title in zip(columns, ("Вызовов", "Среднее, мс", "p95, мс", "Макс., мс", "Всего, мс")):
+            self.operations_tree.heading(column, text=title)
+            self.operations_tree.column(column, width=100, anchor='e')
+        self.operations_tree.pack(fill='both', expand=True, padx=10, pady=5)
+        
+        ttk.Label(self.diagnostics_frame, text="Самые долгие вызовы:").pack(anchor='w', padx=10)
+        self.slowest_tree = ttk.Treeview(self.diagnostics_frame, columns=('ms', 'detail', 'at'), height=8)
+        self.slowest_tree.heading('#0', text="Операция")
+        self.slowest_tree.column('#0', width=260)
+        for column, title, width in (('ms', "мс", 100), ('detail', "Подробности", 260), ('at', "Время", 150)):
+            self.slowest_tree.heading(column, text=title)
+            self.slowest_tree.column(column, width=width)
+        self.slowest_tree.pack(fill='both', expand=True, padx=10, pady=5)
+        
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+
+    def on_tab_changed(self, event=None):
+        selected = self.notebook.select()
+        if selected == str(self.view_frame) and not self.view_opened:
+            self.view_opened = True
+            self.view_all_passwords()
+        elif selected == str(self.diagnostics_frame):
+            self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        """Показывает текущие метрики (операции - по суммарному времени)"""
+        snapshot = metrics.snapshot()
+        
+        self.operations_tree.delete(*self.operations_tree.get_children())
+        operations = sorted(snapshot['operations'].items(), key=lambda item: item[1]['total_ms'], reverse=True)
+        for name, stats in operations:
+            self.operations_tree.insert('', 'end', text=name, values=(
+                stats['count'], f"{stats['avg_ms']:.2f}", f"{stats['p95_ms']:.1f}",
+                f"{stats['max_ms']:.1f}", f"{stats['total_ms']:.0f}"
+            ))
+        
+        self.slowest_tree.delete(*self.slowest_tree.get_children())
+        for entry in snapshot['slowest']:
+            self.slowest_tree.insert('', 'end', text=entry['operation'], values=(
+                f"{entry['ms']:.1f}", entry['detail'] or '', entry['at']
+            ))
+        
+        pool = self.db.pool_metrics()
+        if pool:
+            self.pool_metrics_var.set("Пул соединений: " + ", ".join(f"{key}={value}" for key, value in pool.items()))
+
+    def reset_diagnostics(self):
+        metrics.reset()
+        self.refresh_diagnostics()
+
+    def export_metrics_dialog(self):
+        """Сохраняет метрики в файл JSON или Prometheus (.prom)"""
+        path = filedialog.asksaveasfilename(
+            title="Экспорт метрик", defaultextension='.json',
+            filetypes=[("JSON", '*.json'), ("Prometheus", '*.prom')]
+        )
+        if not path:
+            return
+        try:
+            metrics.export(path)
+            self.update_status(f"Метрики сохранены: {path}")
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить метрики: {e}")
+
+    def schedule_metrics_export(self):
+        """Периодически записывает метрики в METRICS_CONFIG['export_path']"""
+        try:
+            metrics.export(METRICS_CONFIG['export_path'])
+        except OSError as e:
+            logger.warning(f"Не удалось записать метрики: {e}")
+        self.root.after(int(METRICS_CONFIG.get('export_interval', 60) * 1000), self.schedule_metrics_export)
 
     def toggle_password_visibility(self):
         """Переключает видимость пароля"""
@@ -141,12 +480,20 @@ class PasswordManagerGUI:
             self.password_entry.config(show='*')
 
     def generate_password(self):
-        """Генерирует случайный пароль"""
-        length = 12
-        characters = string.ascii_letters + string.digits + "!@#$%^&*"
-        password = ''.join(random.choice(characters) for i in range(length))
+        """Генерирует случайный пароль по политике из GENERATOR_CONFIG"""
+        if self.password_generator is None:
+            try:
+                self.password_generator = create_generator(GENERATOR_CONFIG)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Неверные настройки генератора паролей: {e}")
+                messagebox.showerror("Ошибка", f"Неверные настройки генератора паролей: {e}")
+                return
+
+        password = self.password_generator.generate()
         self.password_entry.delete(0, tk.END)
         self.password_entry.insert(0, password)
+        bits = self.password_generator.entropy_bits
+        self.update_status(f"Сгенерирован пароль: {bits:.0f} бит энтропии ({strength_label(bits)})")
 
     def add_password_gui(self):
         """Добавляет пароль через графический интерфейс"""
@@ -158,11 +505,12 @@ class PasswordManagerGUI:
             messagebox.showerror("Ошибка", "Все поля должны быть заполнены!")
             return
         
-        try:
+        def save():
             # Шифруем пароль перед сохранением
             encrypted_password = self.encryption.encrypt_password(password)
-            action = self.db.add_or_update_password(service, username, encrypted_password)
-            
+            return self.db.add_or_update_password(service, username, encrypted_password)
+        
+        def on_saved(action):
             result_text = f"Пароль успешно {action}!\n\n"
             result_text += f"Сервис: {service}\n"
             result_text += f"Пользователь: {username}\n"
@@ -177,152 +525,424 @@ class PasswordManagerGUI:
             self.username_entry.delete(0, tk.END)
             self.password_entry.delete(0, tk.END)
             
-            # Обновляем список паролей
-            self.view_all_passwords()
+            # Обновляем список паролей только на изменившиеся записи
+            self.search_cache.invalidate()
+            self.refresh_view_changes()
             self.update_status(f"Пароль для {service} {action}")
-            
-        except Exception as e:
+        
+        def on_error(e):
             messagebox.showerror("Ошибка", f"Ошибка при сохранении пароля: {e}")
             logger.error(f"Ошибка при добавлении пароля: {e}")
+        
+        self.executor.submit(save, on_success=on_saved, on_error=on_error,
+                             description="Сохранение пароля")
 
     def view_all_passwords(self):
-        """Показывает все сохраненные пароли"""
-        try:
-            results = self.db.get_all_passwords()
-            
-            result_text = "ВСЕ СОХРАНЕННЫЕ ПАРОЛИ:\n"
-            result_text += "=" * 60 + "\n\n"
-            
-            if results:
-                for i, row in enumerate(results, 1):
-                    try:
-                        # Расшифровываем пароль для отображения
-                        decrypted_password = self.encryption.decrypt_password(row['password_text'])
-                        
-                        result_text += f"{i}. СЕРВИС: {row['service']}\n"
-                        result_text += f"   Пользователь: {row['username']}\n"
-                        result_text += f"   Пароль: {decrypted_password}\n"
-                        result_text += f"   Добавлен: {row['created_at']}\n"
-                        result_text += "-" * 40 + "\n"
-                    except Exception as decrypt_error:
-                        # Если не удалось расшифровать, показываем ошибку
-                        result_text += f"{i}. СЕРВИС: {row['service']}\n"
-                        result_text += f"   Пользователь: {row['username']}\n"
-                        result_text += f"   ОШИБКА ДЕШИФРОВАНИЯ: {decrypt_error}\n"
-                        result_text += f"   Добавлен: {row['created_at']}\n"
-                        result_text += "-" * 40 + "\n"
-                
-                result_text += f"\nВсего сохранено записей: {len(results)}"
-            else:
-                result_text += "Нет сохраненных паролей.\n"
-                result_text += "Добавьте пароли во вкладке 'Добавить пароль'"
-            
-            self.view_result_text.delete(1.0, tk.END)
-            self.view_result_text.insert(1.0, result_text)
-            self.update_status(f"Загружено {len(results)} записей")
-            
-        except Exception as e:
+        """Перезагружает таблицу паролей с первой страницы"""
+        if not self.view_opened:
+            # Вкладка еще не открывалась - загрузится при открытии
+            return
+        # Страницы, запрошенные до перезагрузки, больше не нужны
+        self.view_generation += 1
+        generation = self.view_generation
+        self.view_loading = True
+        
+        def load():
+            # Версия берется до чтения: изменения, попавшие в выборку,
+            # повторно применятся лентой без вреда
+            try:
+                version = self.db.get_change_version()
+            except Exception as e:
+                logger.warning(f"Лента изменений недоступна: {e}")
+                version = None
+            total = self.db.count_passwords()
+            rows = self.db.get_passwords_page(VIEW_PAGE_SIZE)
+            return version, total, rows
+        
+        def on_loaded(result):
+            if generation != self.view_generation:
+                return
+            version, total, rows = result
+            self.view_version = version
+            self.view_tree.delete(*self.view_tree.get_children())
+            self.view_rows.clear()
+            self.view_keys.clear()
+            self.view_revealed.clear()
+            self.view_loaded = 0
+            self.view_last_key = None
+            self.view_total = total
+            self.append_view_page(rows)
+            self.update_status(f"Всего записей: {self.view_total}")
+        
+        def on_error(e):
+            self.view_loading = False
             error_msg = f"Ошибка при загрузке паролей: {e}"
             messagebox.showerror("Ошибка", error_msg)
             logger.error(f"Ошибка при просмотре паролей: {e}")
+        
+        self.executor.submit(load, on_success=on_loaded, on_error=on_error,
+                             description="Загрузка паролей")
 
-    def search_passwords(self):
+    def load_next_view_page(self):
+        """Запрашивает следующую страницу записей в фоне"""
+        if self.view_loading or self.view_loaded >= self.view_total:
+            return
+        
+        generation = self.view_generation
+        self.view_loading = True
+        
+        def on_loaded(rows):
+            if generation == self.view_generation:
+                self.append_view_page(rows)
+        
+        def on_error(e):
+            self.view_loading = False
+            logger.error(f"Ошибка при подгрузке страницы: {e}")
+            self.update_status(f"Ошибка при подгрузке записей: {e}")
+        
+        self.executor.submit(self.db.get_passwords_page, VIEW_PAGE_SIZE, after=self.view_last_key,
+                             on_success=on_loaded, on_error=on_error,
+                             description="Подгрузка записей")
+
+    @metrics.timed('ui.append_view_page')
+    def append_view_page(self, rows):
+        """Добавляет загруженную страницу записей в таблицу"""
+        for row in rows:
+            iid = str(row['id'])
+            self.view_rows[iid] = row
+            insort(self.view_keys, (self.view_sort_key(row), iid))
+            self.view_tree.insert('', 'end', iid=iid, values=(
+                row['service'], row['username'], HIDDEN_PASSWORD, row['created_at']
+            ))
+        
+        self.view_loaded += len(rows)
+        self.view_loading = False
+        if rows:
+            self.view_last_key = (rows[-1]['service'], rows[-1]['username'])
+        else:
+            # Таблица изменилась после подсчета - больше загружать нечего
+            self.view_total = self.view_loaded
+
+    def refresh_view_changes(self):
+        """Применяет к таблице изменения хранилища после последней загрузки"""
+        if self.view_version is None:
+            self.view_all_passwords()
+            return
+        
+        generation = self.view_generation
+        since = self.view_version
+        
+        def on_loaded(feed):
+            if generation != self.view_generation:
+                return
+            if since != self.view_version:
+                # Параллельное обновление уже применило часть изменений
+                if feed['version'] > self.view_version:
+                    self.refresh_view_changes()
+                return
+            if feed['reset']:
+                self.view_all_passwords()
+                return
+            self.apply_view_changes(feed)
+            if feed['more']:
+                self.refresh_view_changes()
+        
+        def on_error(e):
+            logger.warning(f"Не удалось получить изменения, таблица перезагружается: {e}")
+            self.view_all_passwords()
+        
+        self.executor.submit(self.db.get_changes, since, limit=VIEW_PAGE_SIZE,
+                             on_success=on_loaded, on_error=on_error,
+                             description="Обновление записей")
+
+    @staticmethod
+    def view_sort_key(row):
+        # Приближение сортировки БД без учета регистра
+        return row['service'].casefold(), row['username'].casefold()
+
+    def beyond_loaded_rows(self, key):
+        """Запись с ключом key относится к еще не загруженным страницам"""
+        if self.view_last_key is None:
+            return False
+        return key > self.view_sort_key({'service': self.view_last_key[0], 'username': self.view_last_key[1]})
+
+    def insert_view_row(self, iid, row):
+        """Вставляет запись в таблицу на место по сортировке"""
+        entry = (self.view_sort_key(row), iid)
+        index = bisect_left(self.view_keys, entry)
+        self.view_keys.insert(index, entry)
+        self.view_rows[iid] = row
+        self.view_tree.insert('', index, iid=iid, values=(
+            row['service'], row['username'], HIDDEN_PASSWORD, row['created_at']
+        ))
+
+    def remove_view_row(self, iid):
+        """Убирает запись из таблицы"""
+        row = self.view_rows.pop(iid)
+        index = bisect_left(self.view_keys, (self.view_sort_key(row), iid))
+        del self.view_keys[index]
+        self.view_revealed.discard(iid)
+        self.view_tree.delete(iid)
+
+    @metrics.timed('ui.apply_view_changes')
+    def apply_view_changes(self, feed):
+        """Вносит в таблицу удаленные и измененные записи из ленты.
+
+        Место записи ищется двоичным поиском в view_keys, поэтому
+        обновление стоит O(изменений * log загруженных строк).
+        """
+        # Сначала удаления: id удаленной записи может получить новая
+        for row in feed['deleted']:
+            iid = str(row['id'])
+            if self.view_tree.exists(iid):
+                self.remove_view_row(iid)
+                self.view_loaded -= 1
+                self.view_total -= 1
+            elif self.beyond_loaded_rows(self.view_sort_key(row)):
+                # Запись с еще не загруженной страницы
+                self.view_total -= 1
+        
+        for row in feed['rows']:
+            iid = str(row['id'])
+            key = self.view_sort_key(row)
+            if self.view_tree.exists(iid):
+                self.view_revealed.discard(iid)
+                if key != self.view_sort_key(self.view_rows[iid]):
+                    # Запись переименована - переносим на новое место
+                    self.remove_view_row(iid)
+                    self.insert_view_row(iid, row)
+                    continue
+                self.view_rows[iid] = row
+                self.view_tree.item(iid, values=(
+                    row['service'], row['username'], HIDDEN_PASSWORD, row['created_at']
+                ))
+                continue
+            
+            self.view_total += 1
+            beyond = self.beyond_loaded_rows(key)
+            if beyond and self.view_loaded < self.view_total - 1:
+                # Попадет в таблицу с одной из следующих страниц
+                continue
+            
+            self.insert_view_row(iid, row)
+            self.view_loaded += 1
+            if beyond or self.view_last_key is None:
+                self.view_last_key = (row['service'], row['username'])
+        
+        self.view_total = max(self.view_total, self.view_loaded)
+        self.view_version = feed['version']
+        if feed['rows'] or feed['deleted']:
+            self.update_status(f"Всего записей: {self.view_total}")
+
+    def on_view_scroll(self, scrollbar, first, last):
+        """Подгружает следующую страницу, когда прокрутка дошла до конца"""
+        scrollbar.set(first, last)
+        if float(last) >= 0.95 and self.view_loaded < self.view_total:
+            self.load_next_view_page()
+
+    def get_selected_row(self, tree, rows):
+        """Возвращает выбранную в таблице запись или (None, None)"""
+        selection = tree.selection()
+        if not selection:
+            messagebox.showwarning("Внимание", "Выберите запись в таблице")
+            return None, None
+        iid = selection[0]
+        return iid, rows.get(iid)
+
+    def toggle_reveal(self, tree, rows, revealed):
+        """Показывает или скрывает пароль выбранной записи"""
+        iid, row = self.get_selected_row(tree, rows)
+        if not row:
+            return
+        
+        if iid in revealed:
+            tree.set(iid, 'password', HIDDEN_PASSWORD)
+            revealed.discard(iid)
+            return
+        
+        def on_decrypted(decrypted_password):
+            # Таблица могла быть перезагружена, пока шла расшифровка
+            if rows.get(iid) is row:
+                tree.set(iid, 'password', decrypted_password)
+                revealed.add(iid)
+        
+        self.executor.submit(self.reveal_password, row,
+                             on_success=on_decrypted, on_error=self.show_decrypt_error,
+                             description="Расшифровка")
+
+    def reveal_password(self, row):
+        """Расшифровывает пароль записи (через кэш, если он включен)"""
+        if self.secret_cache is None:
+            return self.encryption.decrypt_password(row['password_text'])
+        
+        password = self.secret_cache.get(row['id'], row['password_text'])
+        if password is None:
+            password = self.encryption.decrypt_password(row['password_text'])
+            self.secret_cache.put(row['id'], row['password_text'], password,
+                                  service=row['service'], username=row['username'])
+        return password
+
+    def purge_secret_cache(self):
+        """Периодически удаляет из кэша пароли с истекшим сроком"""
+        self.secret_cache.purge_expired()
+        self.root.after(int(self.secret_cache.ttl * 1000), self.purge_secret_cache)
+
+    def sync_replica(self):
+        """Синхронизирует локальную реплику с сервером в фоне"""
+        def on_synced(stats):
+            if stats is None:
+                self.status_var.set(f"Нет связи с сервером - данные из локальной копии ({self.get_current_time()})")
+            elif stats['replayed']:
+                # Записи, сохраненные офлайн, получили на сервере новые id
+                self.search_cache.invalidate()
+                self.view_all_passwords()
+            elif stats['applied'] or stats['deleted']:
+                self.search_cache.invalidate()
+                self.refresh_view_changes()
+            self.schedule_replica_sync()
+
+        def on_error(error):
+            logger.error(f"Ошибка синхронизации реплики: {error}")
+            self.schedule_replica_sync()
+
+        self.executor.submit(self.db.sync, on_success=on_synced, on_error=on_error,
+                             description="синхронизация")
+
+    def schedule_replica_sync(self):
+        self.root.after(int(REPLICA_CONFIG.get('sync_interval', 30) * 1000), self.sync_replica)
+
+    def show_decrypt_error(self, decrypt_error):
+        """Показывает ошибку расшифровки"""
+        messagebox.showerror("Ошибка", f"Ошибка дешифрования: {decrypt_error}")
+
+    def toggle_reveal_selected(self):
+        """Показывает или скрывает пароль выбранной записи во вкладке просмотра"""
+        self.toggle_reveal(self.view_tree, self.view_rows, self.view_revealed)
+
+    def on_search_input(self, event=None):
+        """Запускает поиск после паузы в вводе (debounce)"""
+        if event is not None and event.keysym == 'Return':
+            return
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.search_passwords)
+
+    def search_passwords(self, warn_empty=False):
         """Выполняет поиск паролей"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        
         search_term = self.search_entry.get().strip()
         
+        # Новый номер поколения отменяет результаты запросов в полете,
+        # а еще не начатый предыдущий запрос снимаем с очереди
+        self.search_generation += 1
+        if self.search_future is not None:
+            self.search_future.cancel()
+            self.search_future = None
+        
         if not search_term:
-            messagebox.showwarning("Внимание", "Введите поисковый запрос!")
+            self.show_search_results(search_term, [])
+            if warn_empty:
+                messagebox.showwarning("Внимание", "Введите поисковый запрос!")
             return
         
-        try:
-            results = self.db.search_passwords(search_term)
-            
-            result_text = f"РЕЗУЛЬТАТЫ ПОИСКА ('{search_term}'):\n"
-            result_text += "=" * 60 + "\n\n"
-            
-            if results:
-                for i, row in enumerate(results, 1):
-                    try:
-                        decrypted_password = self.encryption.decrypt_password(row['password_text'])
-                        
-                        result_text += f"{i}. СЕРВИС: {row['service']}\n"
-                        result_text += f"   Пользователь: {row['username']}\n"
-                        result_text += f"   Пароль: {decrypted_password}\n"
-                        result_text += f"   Добавлен: {row['created_at']}\n"
-                        result_text += "-" * 40 + "\n"
-                    except Exception as decrypt_error:
-                        result_text += f"{i}. СЕРВИС: {row['service']}\n"
-                        result_text += f"   Пользователь: {row['username']}\n"
-                        result_text += f"   ОШИБКА ДЕШИФРОВАНИЯ: {decrypt_error}\n"
-                        result_text += f"   Добавлен: {row['created_at']}\n"
-                        result_text += "-" * 40 + "\n"
-                
-                result_text += f"\nНайдено записей: {len(results)}"
-            else:
-                result_text += f"По запросу '{search_term}' ничего не найдено.\n"
-            
-            self.search_result_text.delete(1.0, tk.END)
-            self.search_result_text.insert(1.0, result_text)
-            self.update_status(f"Найдено {len(results)} записей")
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка при поиске: {e}")
+        # Сначала пробуем ответить из кэша или сузить прошлый результат
+        results = self.search_cache.get(search_term)
+        if results is None:
+            results = self.search_cache.narrow(search_term)
+            if results is not None:
+                self.search_cache.put(search_term, results, complete=True)
+        if results is not None:
+            self.show_search_results(search_term, results)
+            return
+        
+        generation = self.search_generation
+        
+        def on_found(rows):
+            if generation != self.search_generation:
+                return
+            complete = len(rows) <= SEARCH_RESULT_LIMIT
+            rows = rows[:SEARCH_RESULT_LIMIT]
+            self.search_cache.put(search_term, rows, complete=complete)
+            self.show_search_results(search_term, rows, complete)
+        
+        def on_error(e):
+            if generation == self.search_generation:
+                self.update_status(f"Ошибка при поиске: {e}")
             logger.error(f"Ошибка при поиске: {e}")
+        
+        self.search_future = self.executor.submit(
+            self.db.search_passwords, search_term, limit=SEARCH_RESULT_LIMIT + 1,
+            on_success=on_found, on_error=on_error, description="Поиск"
+        )
+        self.update_status(f"Поиск '{search_term}'...")
+
+    @metrics.timed('ui.show_search_results')
+    def show_search_results(self, search_term, rows, complete=True):
+        """Отображает результаты поиска в таблице"""
+        self.search_tree.delete(*self.search_tree.get_children())
+        self.search_rows.clear()
+        self.search_revealed.clear()
+        
+        for row in rows:
+            iid = str(row['id'])
+            self.search_rows[iid] = row
+            self.search_tree.insert('', 'end', iid=iid, values=(
+                row['service'], row['username'], HIDDEN_PASSWORD, row['created_at']
+            ))
+        
+        if not search_term:
+            return
+        if complete:
+            self.update_status(f"Найдено {len(rows)} записей по запросу '{search_term}'")
+        else:
+            self.update_status(f"Показаны первые {len(rows)} записей по запросу '{search_term}'")
+
+    def copy_row_password(self, tree, rows):
+        """Копирует пароль выбранной записи в буфер обмена"""
+        iid, row = self.get_selected_row(tree, rows)
+        if not row:
+            return
+        
+        def on_decrypted(password):
+            self.root.clipboard_clear()
+            self.root.clipboard_append(password)
+            self.update_status("Пароль скопирован в буфер обмена")
+            messagebox.showinfo("Успех", "Пароль скопирован в буфер обмена")
+        
+        self.executor.submit(self.reveal_password, row,
+                             on_success=on_decrypted, on_error=self.show_decrypt_error,
+                             description="Расшифровка")
 
     def copy_password(self):
-        """Копирует пароль в буфер обмена"""
-        try:
-            selected_text = self.view_result_text.get(tk.SEL_FIRST, tk.SEL_LAST)
-            if selected_text:
-                lines = selected_text.split('\n')
-                for line in lines:
-                    if line.strip().startswith('Пароль:'):
-                        password = line.replace('Пароль:', '').strip()
-                        self.root.clipboard_clear()
-                        self.root.clipboard_append(password)
-                        self.update_status("Пароль скопирован в буфер обмена")
-                        messagebox.showinfo("Успех", "Пароль скопирован в буфер обмена")
-                        return
-                
-                messagebox.showwarning("Внимание", "Не удалось найти пароль в выделенном тексте")
-            else:
-                messagebox.showwarning("Внимание", "Выделите текст с паролем")
-                
-        except tk.TclError:
-            messagebox.showwarning("Внимание", "Выделите текст с паролем")
+        """Копирует пароль выбранной записи во вкладке просмотра"""
+        self.copy_row_password(self.view_tree, self.view_rows)
 
     def delete_selected(self):
         """Удаляет выбранный пароль"""
-        try:
-            selected_text = self.view_result_text.get(tk.SEL_FIRST, tk.SEL_LAST)
-            if selected_text:
-                lines = selected_text.split('\n')
-                service = None
-                username = None
-                
-                for line in lines:
-                    if line.strip().startswith('СЕРВИС:'):
-                        service = line.replace('СЕРВИС:', '').strip()
-                    elif line.strip().startswith('Пользователь:'):
-                        username = line.replace('Пользователь:', '').strip()
-                
-                if service and username:
-                    if messagebox.askyesno("Подтверждение", f"Удалить пароль для {service} ({username})?"):
-                        try:
-                            self.db.delete_password(service, username)
-                            messagebox.showinfo("Успех", "Пароль удален")
-                            self.view_all_passwords()
-                            self.update_status(f"Удален пароль для {service}")
-                            
-                        except Exception as e:
-                            messagebox.showerror("Ошибка", f"Ошибка при удалении: {e}")
-                else:
-                    messagebox.showwarning("Внимание", "Не удалось определить запись для удаления")
-            else:
-                messagebox.showwarning("Внимание", "Выделите запись для удаления")
-                
-        except tk.TclError:
-            messagebox.showwarning("Внимание", "Выделите запись для удаления")
+        iid, row = self.get_selected_row(self.view_tree, self.view_rows)
+        if not row:
+            return
+        
+        service = row['service']
+        username = row['username']
+        if not messagebox.askyesno("Подтверждение", f"Удалить пароль для {service} ({username})?"):
+            return
+        
+        def on_deleted(_):
+            messagebox.showinfo("Успех", "Пароль удален")
+            self.search_cache.invalidate()
+            self.refresh_view_changes()
+            self.update_status(f"Удален пароль для {service}")
+        
+        def on_error(e):
+            messagebox.showerror("Ошибка", f"Ошибка при удалении: {e}")
+        
+        self.executor.submit(self.db.delete_password, service, username,
+                             on_success=on_deleted, on_error=on_error,
+                             description="Удаление пароля")
 
     def clear_form(self):
         """Очищает форму добавления пароля"""
@@ -334,10 +954,28 @@ class PasswordManagerGUI:
 
     def reset_search(self):
         """Сбрасывает поиск"""
+        self.search_generation += 1
         self.search_entry.delete(0, tk.END)
-        self.search_result_text.delete(1.0, tk.END)
+        self.show_search_results('', [])
         self.update_status("Поиск сброшен")
 
+    def show_progress(self, operations):
+        """Показывает в статус баре выполняющиеся фоновые операции"""
+        if not hasattr(self, 'progress_var'):
+            return
+        if operations:
+            text = operations[0]
+            if len(operations) > 1:
+                text += f" (+{len(operations) - 1})"
+            self.progress_var.set(f"Выполняется: {text}")
+            if not self.progress_bar.winfo_ismapped():
+                self.progress_bar.pack(side='right', padx=5)
+                self.progress_bar.start(10)
+        else:
+            self.progress_var.set("")
+            self.progress_bar.stop()
+            self.progress_bar.pack_forget()
+
     def update_status(self, message):
         """Обновляет статус бар"""
         self.status_var.set(f"{self.get_current_time()} | {message}")
@@ -348,5 +986,9 @@ class PasswordManagerGUI:
 
     def __del__(self):
         """Закрывает соединения при удалении объекта"""
-        if hasattr(self, 'db'):
+        if hasattr(self, 'executor'):
+            self.executor.shutdown()
+        if getattr(self, 'secret_cache', None) is not None:
+            self.secret_cache.clear()
+        if getattr(self, 'db', None) is not None:
             self.db.close()
\ No newline at end of file
@@ -0,0 +1,334 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+from cryptography.fernet import Fernet
+
+from src.security import CryptoResult
+
+logger = logging.getLogger(__name__)
+
+# Названия колонок в экспортах браузеров и менеджеров паролей
+# (Chrome, Firefox, Bitwarden, KeePass) и в собственном формате
+FIELD_ALIASES = {
+    'service': ('service', 'name', 'title', 'сервис'),
+    'username': ('username', 'login_username', 'login', 'user', 'email', 'пользователь'),
+    'password': ('password', 'login_password', 'pass', 'пароль'),
+    'url': ('url', 'login_uri', 'uri', 'website', 'origin_url'),
+}
+
+
+def pick(record, field):
+    """Возвращает первое непустое значение поля по списку синонимов.
+
+    Пробелы по краям убираются у всех полей, кроме пароля: пробелы
+    в пароле - его часть.
+    """
+    for alias in FIELD_ALIASES[field]:
+        value = record.get(alias)
+        if value:
+            value = str(value)
+            return value if field == 'password' else value.strip()
+    return ''
+
+
+def normalize_record(record):
+    """Приводит запись экспорта к (service, username, password) или None"""
+    record = {str(key).strip().lower(): value for key, value in record.items() if key is not None}
+
+    # Bitwarden JSON: логин и пароль во вложенном объекте login
+    login = record.get('login')
+    if isinstance(login, dict):
+        record.setdefault('username', login.get('username'))
+        record.setdefault('password', login.get('password'))
+        uris = login.get('uris') or []
+        if uris and isinstance(uris[0], dict):
+            record.setdefault('url', uris[0].get('uri'))
+
+    service = pick(record, 'service')
+    if not service:
+        url = pick(record, 'url')
+        service = (urlparse(url).hostname or url) if url else ''
+    username = pick(record, 'username')
+    password = pick(record, 'password')
+
+    if not service or not username or not password:
+        return None
+    return service, username, password
+
+
+def read_csv(path):
+    """Построчно читает CSV с заголовком"""
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        yield from csv.DictReader(csv_file)
+
+
+def iter_json_array(stream, chunk_size=65536):
+    """Потоково разбирает JSON-массив объектов, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    started = False
+
+    while True:
+        buffer = buffer.lstrip()
+        if not started and buffer:
+            if buffer[0] != '[':
+                raise ValueError("Ожидался JSON-массив")
+            buffer = buffer[1:]
+            started = True
+            continue
+        if started and buffer[:1] == ',':
+            buffer = buffer[1:]
+            continue
+        if started and buffer[:1] == ']':
+            return
+
+        if buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # Объект не поместился в буфер - дочитываем
+                if eof:
+                    raise
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+
+        if eof:
+            raise ValueError("Неожиданный конец JSON-массива")
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+
+def read_json(path):
+    """Читает JSON-массив, JSON Lines или экспорт Bitwarden ({"items": [...]})"""
+    with open(path, encoding='utf-8-sig') as json_file:
+        head = json_file.read(1)
+        while head and head.isspace():
+            head = json_file.read(1)
+        json_file.seek(0)
+
+        if head == '[':
+            yield from iter_json_array(json_file)
+        elif head == '{' and not path.lower().endswith('.jsonl'):
+            # Один объект с вложенным списком нельзя читать потоково
+            # без сторонних библиотек - загружаем его целиком
+            try:
+                data = json.load(json_file)
+            except json.JSONDecodeError:
+                json_file.seek(0)
+                yield from read_json_lines(json_file)
+            else:
+                yield from data.get('items', [])
+        else:
+            yield from read_json_lines(json_file)
+
+
+def read_json_lines(stream):
+    """Читает JSON Lines: по одному объекту в строке"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_records(path, file_format=None):
+    """Возвращает генератор записей файла в зависимости от формата"""
+    if file_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        file_format = 'csv' if extension == '.csv' else 'json'
+    if file_format == 'csv':
+        return read_csv(path)
+    if file_format == 'json':
+        return read_json(path)
+    raise ValueError(f"Неизвестный формат импорта: {file_format}")
+
+
+def iter_batches(items, size):
+    """Разбивает поток на списки по size элементов"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_stats():
+    """Начальная статистика импорта (BulkImporter, AsyncDatabaseManager.bulk_import)"""
+    return {'rows': 0, 'skipped': 0, 'failed': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+
+
+# Fernet рабочего процесса создается один раз в инициализаторе пула
+_worker_fernet = None
+
+
+def _init_worker(primary_key):
+    global _worker_fernet
+    _worker_fernet = Fernet(primary_key)
+
+
+def _encrypt_batch(passwords):
+    """Шифрует порцию паролей в рабочем процессе (как EncryptionManager.encrypt_chunk)"""
+    results = []
+    for password in passwords:
+        try:
+            results.append(CryptoResult(_worker_fernet.encrypt(password.encode('utf-8')).decode('utf-8'), None))
+        except Exception as e:
+            results.append(CryptoResult(None, e))
+    return results
+
+
+class BulkImporter:
+    """Пакетный импорт паролей из CSV / JSON.
+
+    Записи читаются потоково, шифруются порциями через
+    EncryptionManager.encrypt_many (при processes > 0 - в пуле процессов
+    основным ключом связки) и записываются через DatabaseManager.bulk_upsert
+    транзакциями по batch_size строк. В памяти одновременно находится
+    не больше нескольких порций.
+    """
+
+    def __init__(self, db, encryption, batch_size=1000, processes=0):
+        self.db = db
+        self.encryption = encryption
+        self.batch_size = batch_size
+        self.processes = processes
+        self.stats = import_stats()
+
+    def valid_records(self, records):
+        """Отбрасывает записи без сервиса, пользователя или пароля"""
+        for record in records:
+            normalized = normalize_record(record)
+            if normalized is None:
+                self.stats['skipped'] += 1
+                continue
+            yield normalized
+
+    def encrypted_batches(self, batches):
+        """Шифрует порции записей, сохраняя их порядок.
+
+        Отдает пары (порция, список CryptoResult для ее паролей).
+        """
+        if not self.processes:
+            for batch in batches:
+                yield batch, self.encryption.encrypt_many([password for _, _, password in batch])
+            return
+
+        # Рабочим процессам передается только основной ключ связки -
+        # им шифруются новые записи (как MultiFernet.encrypt)
+        primary_key = self.encryption.keys[0]
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                 initargs=(primary_key,)) as pool:
+            # Ограничиваем число порций в работе, чтобы не читать файл целиком
+            in_flight = deque()
+            for batch in batches:
+                in_flight.append((batch, pool.submit(_encrypt_batch, [password for _, _, password in batch])))
+                if len(in_flight) >= self.processes * 2:
+                    batch, future = in_flight.popleft()
+                    yield batch, future.result()
+            while in_flight:
+                batch, future = in_flight.popleft()
+                yield batch, future.result()
+
+    def run(self, records, progress=None, normalized=False):
+        """Импортирует записи; progress(rows, seconds) вызывается после каждой порции.
+
+        normalized=True - records уже кортежи (service, username, password)
+        и записываются без изменений (восстановление архива src.backup).
+        """
+        started = time.perf_counter()
+
+        def rows():
+            batches = iter_batches(records if normalized else self.valid_records(records), self.batch_size)
+            for batch, results in self.encrypted_batches(batches):
+                encrypted = [(service, username, result.value)
+                             for (service, username, _), result in zip(batch, results) if result.error is None]
+                if len(encrypted) < len(batch):
+                    self.stats['failed'] += len(batch) - len(encrypted)
+                    logger.error(f"Не удалось зашифровать {len(batch) - len(encrypted)} записей порции")
+                yield from encrypted
+                self.stats['rows'] += len(encrypted)
+                if progress is not None:
+                    progress(self.stats['rows'], time.perf_counter() - started)
+
+        self.db.bulk_upsert(rows(), chunk_size=self.batch_size)
+
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = elapsed
+        self.stats['rows_per_second'] = self.stats['rows'] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Импорт завершен: {self.stats['rows']} записей, пропущено {self.stats['skipped']}, "
+            f"ошибок шифрования {self.stats['failed']}, "
+            f"{self.stats['rows_per_second']:.0f} записей/с"
+        )
+        return self.stats
+
+    def import_file(self, path, file_format=None, progress=None):
+        """Импортирует файл CSV / JSON"""
+        return self.run(read_records(path, file_format), progress=progress)
+
+
+def main(argv=None):
+    """Импорт из командной строки: python -m src.importer FILE"""
+    parser = argparse.ArgumentParser(description="Пакетный импорт паролей из CSV / JSON")
+    parser.add_argument('path', help="файл экспорта (CSV, JSON, JSON Lines)")
+    parser.add_argument('--format', choices=('csv', 'json'), help="формат файла (по умолчанию по расширению)")
+    parser.add_argument('--batch-size', type=int, default=1000, help="размер порции и транзакции")
+    parser.add_argument('--processes', type=int, default=0,
+                        help="количество процессов для шифрования (0 - в текущем процессе)")
+    args = parser.parse_args(argv)
+
+    from src.database import DatabaseManager
+    from src.kdf import InvalidMasterPassword
+    from src.security import KeyringError, create_encryption_manager
+
+    try:
+        encryption = create_encryption_manager()
+    except (InvalidMasterPassword, KeyringError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    db = DatabaseManager()
+    if not db.pool:
+        return 1
+    if not db.ensure_schema():
+        print("[ERROR] Не удалось создать таблицу")
+        db.close()
+        return 1
+
+    def report(rows, seconds):
+        rate = rows / seconds if seconds > 0 else 0.0
+        print(f"\r[INFO] Импортировано {rows} записей ({rate:.0f} записей/с)", end='', flush=True)
+
+    try:
+        importer = BulkImporter(db, encryption, batch_size=args.batch_size, processes=args.processes)
+        stats = importer.import_file(args.path, file_format=args.format, progress=report)
+        print()
+        print(f"[SUCCESS] Импортировано {stats['rows']} записей за {stats['seconds']:.1f} с "
+              f"({stats['rows_per_second']:.0f} записей/с), пропущено {stats['skipped']}, "
+              f"ошибок шифрования {stats['failed']}")
+        return 0 if stats['failed'] == 0 else 1
+    except Exception as e:
+        print()
+        print(f"[ERROR] Ошибка импорта: {e}")
+        logger.error(f"Ошибка импорта: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import argparse
+import base64
+import getpass
+import json
+import logging
+import os
+import sys
+import time
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KDF_PATH = 'master.kdf'
+KDF_VERSION = 1
+
+# Параметры калибровки scrypt: память на одно вычисление = 128 * r * n байт
+SCRYPT_R = 8
+SCRYPT_P = 1
+MIN_SCRYPT_N = 2 ** 14
+DEFAULT_TARGET_MS = 500
+DEFAULT_MAX_MEMORY_MB = 256
+SALT_SIZE = 16
+
+# Известный текст, по которому проверяется мастер-пароль
+VERIFIER_PLAINTEXT = b'password-manager master key check'
+
+
+class InvalidMasterPassword(Exception):
+    """Мастер-пароль не подходит к сохраненным параметрам"""
+
+
+def scrypt_memory(n, r=SCRYPT_R):
+    return 128 * r * n
+
+
+def derive_key(password, params):
+    """Выводит Fernet-ключ из мастер-пароля по параметрам KDF"""
+    kdf = Scrypt(
+        salt=base64.b64decode(params['salt']),
+        length=32,
+        n=params['n'],
+        r=params['r'],
+        p=params['p']
+    )
+    return base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
+
+
+def measure_scrypt(n, r=SCRYPT_R, p=SCRYPT_P):
+    """Время одного вычисления scrypt с параметром n, с"""
+    started = time.perf_counter()
+    Scrypt(salt=os.urandom(SALT_SIZE), length=32, n=n, r=r, p=p).derive(b'calibration')
+    return time.perf_counter() - started
+
+
+def calibrate(target_ms=DEFAULT_TARGET_MS, max_memory_mb=DEFAULT_MAX_MEMORY_MB, report=None):
+    """Подбирает n для scrypt под целевое время разблокировки на этом компьютере.
+
+    n удваивается, пока вычисление быстрее target_ms и память не
+    превышает max_memory_mb. Возвращает (n, измеренное время в мс).
+    """
+    max_memory = max_memory_mb * 1024 * 1024
+    n = MIN_SCRYPT_N
+    elapsed = measure_scrypt(n)
+    if report is not None:
+        report(n, elapsed)
+
+    while elapsed * 1000 < target_ms and scrypt_memory(n * 2) <= max_memory:
+        # Время растет линейно от n: удвоение, которое сильно превысит
+        # цель, не выполняем
+        if elapsed * 2 * 1000 > target_ms * 1.5:
+            break
+        n *= 2
+        elapsed = measure_scrypt(n)
+        if report is not None:
+            report(n, elapsed)
+
+    return n, elapsed * 1000
+
+
+class MasterKey:
+    """Ключ, выведенный из мастер-пароля.
+
+    В файле параметров (kdf_path) хранятся соль, параметры scrypt,
+    результат калибровки и проверочный токен; сам ключ нигде не
+    сохраняется и живет только в памяти процесса.
+    """
+
+    def __init__(self, key, params, path=DEFAULT_KDF_PATH):
+        self.key = key
+        self.params = params
+        self.path = path
+
+    @staticmethod
+    def exists(path=DEFAULT_KDF_PATH):
+        return os.path.exists(path)
+
+    @classmethod
+    def derive(cls, password, target_ms=DEFAULT_TARGET_MS, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+               path=DEFAULT_KDF_PATH):
+        """Калибрует KDF и выводит ключ с новой солью, не сохраняя параметры"""
+        if not password:
+            raise ValueError("Пароль не может быть пустым")
+
+        n, elapsed_ms = calibrate(target_ms=target_ms, max_memory_mb=max_memory_mb)
+        params = {
+            'version': KDF_VERSION,
+            'algorithm': 'scrypt',
+            'salt': base64.b64encode(os.urandom(SALT_SIZE)).decode('ascii'),
+            'n': n,
+            'r': SCRYPT_R,
+            'p': SCRYPT_P,
+            'target_ms': target_ms,
+            'calibrated_ms': round(elapsed_ms, 1),
+        }
+        key = derive_key(password, params)
+        params['verifier'] = Fernet(key).encrypt(VERIFIER_PLAINTEXT).decode('ascii')
+        logger.info(f"Параметры KDF созданы: scrypt n={n}, {elapsed_ms:.0f} мс")
+        return cls(key, params, path)
+
+    @classmethod
+    def create(cls, password, path=DEFAULT_KDF_PATH, target_ms=DEFAULT_TARGET_MS,
+               max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+        """Калибрует KDF, выводит ключ и сохраняет параметры"""
+        if not password:
+            raise ValueError("Мастер-пароль не может быть пустым")
+
+        master = cls.derive(password, target_ms=target_ms, max_memory_mb=max_memory_mb, path=path)
+        master.save()
+        print(f"[SUCCESS] Мастер-пароль установлен (scrypt n={master.params['n']}, "
+              f"разблокировка ~{master.params['calibrated_ms']:.0f} мс)")
+        return master
+
+    @classmethod
+    def unlock(cls, password, path=DEFAULT_KDF_PATH):
+        """Выводит ключ по сохраненным параметрам и проверяет пароль"""
+        with open(path, encoding='utf-8') as kdf_file:
+            params = json.load(kdf_file)
+        return cls.from_params(password, params, path)
+
+    @classmethod
+    def from_params(cls, password, params, path=None):
+        """Выводит ключ по параметрам KDF (из файла или заголовка архива) и проверяет пароль"""
+        if params.get('algorithm') != 'scrypt':
+            raise ValueError(f"Неподдерживаемый алгоритм KDF: {params.get('algorithm')}")
+
+        started = time.perf_counter()
+        key = derive_key(password, params)
+        try:
+            Fernet(key).decrypt(params['verifier'].encode('ascii'))
+        except InvalidToken:
+            logger.warning("Неверный мастер-пароль")
+            raise InvalidMasterPassword("Неверный мастер-пароль") from None
+
+        logger.info(f"Мастер-пароль проверен за {(time.perf_counter() - started) * 1000:.0f} мс")
+        return cls(key, params, path)
+
+    def save(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as kdf_file:
+            json.dump(self.params, kdf_file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def wrap(self, data):
+        """Шифрует данные (связку ключей) ключом мастер-пароля"""
+        return Fernet(self.key).encrypt(data)
+
+    def unwrap(self, token):
+        try:
+            return Fernet(self.key).decrypt(token)
+        except InvalidToken:
+            raise InvalidMasterPassword("Файл ключей зашифрован другим мастер-паролем") from None
+
+
+def prompt_master_password(first_run):
+    """Запрашивает мастер-пароль в терминале"""
+    if not first_run:
+        return getpass.getpass("Мастер-пароль: ")
+    while True:
+        password = getpass.getpass("Новый мастер-пароль: ")
+        if password and password == getpass.getpass("Повторите мастер-пароль: "):
+            return password
+        print("[ERROR] Пароли пусты или не совпадают, попробуйте еще раз")
+
+
+def main(argv=None):
+    """Замер scrypt на этом компьютере: python -m src.kdf [--target-ms 500]"""
+    parser = argparse.ArgumentParser(description="Калибровка KDF мастер-пароля")
+    parser.add_argument('--target-ms', type=int, default=DEFAULT_TARGET_MS, help="целевое время разблокировки, мс")
+    parser.add_argument('--max-memory-mb', type=int, default=DEFAULT_MAX_MEMORY_MB, help="предел памяти scrypt, МБ")
+    args = parser.parse_args(argv)
+
+    def report(n, seconds):
+        print(f"  n=2^{n.bit_length() - 1:<3} память {scrypt_memory(n) // (1024 * 1024):>4} МБ  {seconds * 1000:8.1f} мс")
+
+    print(f"scrypt r={SCRYPT_R} p={SCRYPT_P}, цель {args.target_ms} мс:")
+    n, elapsed_ms = calibrate(args.target_ms, args.max_memory_mb, report=report)
+    print(f"[INFO] Выбрано n={n} ({elapsed_ms:.0f} мс на разблокировку)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
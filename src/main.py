@@ -1,8 +1,12 @@
 import os
 import sys
+import time
 import tkinter as tk
 import logging
 
+# Начало запуска - время старта в отчете включает импорт модулей
+STARTED = time.perf_counter()
+
 # Настройка кодировки для Windows ДО любых выводов
 if sys.platform.startswith('win'):
     try:
@@ -49,7 +53,7 @@ def main():
         root.geometry("900x700")
         
         # Создаем экземпляр приложения
-        app = PasswordManagerGUI(root)
+        app = PasswordManagerGUI(root, started=STARTED)
         
         # Запускаем главный цикл приложения
         root.mainloop()
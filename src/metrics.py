@@ -0,0 +1,207 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+try:
+    from config.config import METRICS_CONFIG
+except ImportError:
+    METRICS_CONFIG = {}
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы длительности, с
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Сколько самых долгих операций хранить для панели диагностики
+SLOWEST_SIZE = 20
+PROMETHEUS_PREFIX = 'password_manager'
+
+
+class Histogram:
+    """Распределение длительностей одной операции по корзинам BUCKETS"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, fraction):
+        """Оценка квантиля: линейная интерполяция внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKETS[index - 1] if index > 0 else 0.0
+                upper = min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+
+class Metrics:
+    """Счетчики и гистограммы длительности операций (БД, шифрование, UI).
+
+    span() - контекстный менеджер, timed() - декоратор; оба записывают
+    время выполнения в гистограмму операции, а исключение - в счетчик
+    "<операция>.errors". При enabled=False замер не выполняется.
+    Потокобезопасен: операции выполняются в фоновых потоках.
+    """
+
+    def __init__(self, enabled=True, slowest_size=SLOWEST_SIZE):
+        self.enabled = enabled
+        self.slowest_size = slowest_size
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        # Куча (длительность, номер, операция, подробности, время) самых долгих вызовов
+        self.slowest = []
+        self.sequence = itertools.count()
+        self.started_at = time.time()
+
+    def observe(self, name, seconds, detail=None):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+            entry = (seconds, next(self.sequence), name, detail, time.time())
+            if len(self.slowest) < self.slowest_size:
+                heapq.heappush(self.slowest, entry)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def increment(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def span(self, name, detail=None):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment(name + '.errors')
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, detail)
+
+    def timed(self, name):
+        """Декоратор: замеряет каждый вызов функции как операцию name"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    self.increment(name + '.errors')
+                    raise
+                finally:
+                    self.observe(name, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.slowest.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """Текущие значения: операции (мс), счетчики и самые долгие вызовы"""
+        with self.lock:
+            operations = {
+                name: {
+                    'count': histogram.count,
+                    'total_ms': histogram.total * 1000,
+                    'avg_ms': histogram.total / histogram.count * 1000,
+                    'p50_ms': histogram.quantile(0.50) * 1000,
+                    'p95_ms': histogram.quantile(0.95) * 1000,
+                    'max_ms': histogram.max * 1000,
+                }
+                for name, histogram in self.histograms.items()
+            }
+            slowest = [
+                {'operation': name, 'ms': seconds * 1000, 'detail': detail,
+                 'at': datetime.fromtimestamp(at).isoformat(timespec='seconds')}
+                for seconds, _, name, detail, at in sorted(self.slowest, reverse=True)
+            ]
+            return {
+                'since': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+                'operations': operations,
+                'counters': dict(self.counters),
+                'slowest': slowest,
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Текстовый формат Prometheus (для node_exporter textfile collector)"""
+        duration = f'{PROMETHEUS_PREFIX}_operation_duration_seconds'
+        events = f'{PROMETHEUS_PREFIX}_events_total'
+        lines = [f'# HELP {duration} Длительность операций',
+                 f'# TYPE {duration} histogram']
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                label = f'operation="{prometheus_label(name)}"'
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, histogram.buckets):
+                    cumulative += bucket_count
+                    lines.append(f'{duration}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{duration}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f'{duration}_sum{{{label}}} {histogram.total:.6f}')
+                lines.append(f'{duration}_count{{{label}}} {histogram.count}')
+
+            lines += [f'# HELP {events} Счетчики событий', f'# TYPE {events} counter']
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'{events}{{name="{prometheus_label(name)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path, export_format=None):
+        """Атомарно записывает метрики в файл (.prom - Prometheus, иначе JSON)"""
+        if export_format is None:
+            export_format = 'prometheus' if path.endswith('.prom') else 'json'
+        content = self.to_prometheus() if export_format == 'prometheus' else self.to_json()
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(content)
+        os.replace(temp_path, path)
+        logger.debug("Метрики записаны в %s", path)
+
+
+def prometheus_label(value):
+    return re.sub(r'["\\\n]', '_', str(value))
+
+
+# Общий экземпляр для всего приложения
+metrics = Metrics(enabled=METRICS_CONFIG.get('enabled', True))
@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Не удалось получить соединение из пула за отведенное время"""
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений с БД.
+
+    - не больше max_size открытых соединений одновременно;
+    - поток, уже держащий соединение, при вложенном запросе получает
+      то же самое соединение (checkout привязан к потоку);
+    - соединение, простоявшее дольше health_check_interval, перед выдачей
+      проверяется через ping(reconnect=True), поэтому разрыв по
+      wait_timeout на стороне MySQL восстанавливается автоматически;
+    - соединения, простоявшие дольше idle_timeout, закрываются;
+    - счетчики доступны через metrics().
+    """
+
+    def __init__(self, factory, max_size=5, idle_timeout=300,
+                 health_check_interval=30, checkout_timeout=10, disconnect_errors=()):
+        if max_size < 1:
+            raise ValueError("Размер пула должен быть положительным")
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.disconnect_errors = tuple(disconnect_errors)
+
+        self.condition = threading.Condition()
+        self.idle = []
+        self.size = 0
+        self.in_use = 0
+        self.closed = False
+        self.local = threading.local()
+
+        self.stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'created': 0,
+            'closed': 0,
+            'evicted': 0,
+            'reconnects': 0,
+            'discarded': 0,
+            'timeouts': 0,
+        }
+
+    @contextmanager
+    def connection(self):
+        """Выдает соединение на время блока with"""
+        held = getattr(self.local, 'held', None)
+        if held is not None:
+            # Вложенный запрос в том же потоке - то же соединение
+            self.local.depth += 1
+            try:
+                yield held
+            finally:
+                self.local.depth -= 1
+            return
+
+        connection = self.acquire()
+        self.local.held = connection
+        self.local.depth = 1
+        broken = False
+        try:
+            yield connection
+        except Exception as e:
+            broken = self.is_disconnect(e)
+            if not broken:
+                # Незавершенная транзакция не должна попасть в пул
+                try:
+                    connection.rollback()
+                except Exception:
+                    broken = True
+            raise
+        finally:
+            self.local.held = None
+            self.local.depth = 0
+            self.release(connection, broken=broken)
+
+    def acquire(self):
+        """Берет соединение из пула, при необходимости создает новое"""
+        deadline = time.monotonic() + self.checkout_timeout
+        waited = None
+
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("Пул соединений закрыт")
+
+                self.evict_idle_locked()
+
+                if self.idle:
+                    connection, last_used = self.idle.pop()
+                    self.in_use += 1
+                    break
+
+                if self.size < self.max_size:
+                    # Резервируем место, само соединение создаем вне блокировки
+                    self.size += 1
+                    self.in_use += 1
+                    connection, last_used = None, None
+                    break
+
+                if waited is None:
+                    waited = time.monotonic()
+                    self.stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Нет свободных соединений в пуле за {self.checkout_timeout} с"
+                    )
+                self.condition.wait(remaining)
+
+            self.stats['checkouts'] += 1
+            if waited is not None:
+                wait_time = time.monotonic() - waited
+                self.stats['wait_time_total'] += wait_time
+                self.stats['wait_time_max'] = max(self.stats['wait_time_max'], wait_time)
+
+        try:
+            if connection is None:
+                connection = self.factory()
+                self.count('created')
+            elif time.monotonic() - last_used > self.health_check_interval:
+                self.check_health(connection)
+        except Exception:
+            if connection is not None:
+                self.close_quietly(connection)
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+
+        return connection
+
+    def release(self, connection, broken=False):
+        """Возвращает соединение в пул"""
+        with self.condition:
+            self.in_use -= 1
+            if broken or self.closed:
+                self.size -= 1
+                self.stats['discarded' if broken else 'closed'] += 1
+                self.close_quietly(connection)
+            else:
+                self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def check_health(self, connection):
+        """Проверяет соединение и переподключается при разрыве"""
+        thread_id = self.server_thread_id(connection)
+        connection.ping(reconnect=True)
+        if thread_id != self.server_thread_id(connection):
+            self.count('reconnects')
+            logger.info("Соединение с БД восстановлено после разрыва")
+
+    @staticmethod
+    def server_thread_id(connection):
+        try:
+            return connection.thread_id()
+        except Exception:
+            return None
+
+    def is_disconnect(self, error):
+        """Признак того, что соединение после ошибки использовать нельзя"""
+        return isinstance(error, self.disconnect_errors)
+
+    def evict_idle_locked(self):
+        """Закрывает простаивающие соединения (вызывать под блокировкой)"""
+        if not self.idle:
+            return
+        now = time.monotonic()
+        keep = []
+        for connection, last_used in self.idle:
+            if now - last_used > self.idle_timeout:
+                self.size -= 1
+                self.stats['evicted'] += 1
+                self.close_quietly(connection)
+            else:
+                keep.append((connection, last_used))
+        self.idle = keep
+
+    def evict_idle(self):
+        """Закрывает соединения, простоявшие дольше idle_timeout"""
+        with self.condition:
+            self.evict_idle_locked()
+
+    def count(self, name):
+        with self.condition:
+            self.stats[name] += 1
+
+    @staticmethod
+    def close_quietly(connection):
+        try:
+            connection.close()
+        except Exception as e:
+            logger.debug(f"Ошибка при закрытии соединения пула: {e}")
+
+    def metrics(self):
+        """Возвращает снимок счетчиков пула"""
+        with self.condition:
+            metrics = dict(self.stats)
+            metrics['size'] = self.size
+            metrics['in_use'] = self.in_use
+            metrics['idle'] = len(self.idle)
+            metrics['max_size'] = self.max_size
+            return metrics
+
+    def close(self):
+        """Закрывает все свободные соединения и запрещает новые"""
+        with self.condition:
+            self.closed = True
+            for connection, _ in self.idle:
+                self.size -= 1
+                self.stats['closed'] += 1
+                self.close_quietly(connection)
+            self.idle = []
+            self.condition.notify_all()
@@ -0,0 +1,433 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+from src.pool import PoolTimeoutError
+from src.storage import escape_like
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLICA_PATH = 'replica.sqlite3'
+
+# Порядок записей как в MySQL (utf8mb4_unicode_ci - без учета регистра)
+ORDER_BY = "ORDER BY service COLLATE NOCASE, username COLLATE NOCASE"
+
+
+class LocalReplica:
+    """Локальная SQLite-копия таблицы passwords.
+
+    Хранит только шифротексты - пароли расшифровываются так же, как при
+    чтении из MySQL. Кроме записей хранит позицию синхронизации и
+    очередь изменений, сделанных без связи с сервером.
+    """
+
+    def __init__(self, path=DEFAULT_REPLICA_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_schema()
+
+    def create_schema(self):
+        with self.lock:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS passwords (
+                    id INTEGER PRIMARY KEY,
+                    service TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    password_text TEXT NOT NULL,
+                    created_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_service_username
+                    ON passwords (service COLLATE NOCASE, username COLLATE NOCASE);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                CREATE TABLE IF NOT EXISTS pending_writes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    action TEXT NOT NULL,
+                    service TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    password_text TEXT,
+                    queued_at TEXT NOT NULL
+                );
+            """)
+
+    @staticmethod
+    def to_dict(row):
+        return dict(row) if row is not None else None
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(sql, params).fetchall()]
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row['value'] if row is not None else default
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, None if value is None else str(value))
+            )
+
+    # --- Применение изменений с сервера ---
+
+    def apply_rows(self, rows):
+        """Записывает строки с сервера (по id), заменяя локальные черновики"""
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                for row in rows:
+                    # Запись, созданная офлайн, получила на сервере настоящий id
+                    self.connection.execute(
+                        "DELETE FROM passwords WHERE service = ? COLLATE NOCASE "
+                        "AND username = ? COLLATE NOCASE AND id != ?",
+                        (row['service'], row['username'], row['id'])
+                    )
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO passwords (id, service, username, password_text, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (row['id'], row['service'], row['username'], row['password_text'], str(row['created_at']))
+                    )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def delete_ids(self, ids):
+        with self.lock:
+            self.connection.executemany("DELETE FROM passwords WHERE id = ?", [(row_id,) for row_id in ids])
+
+    def delete_missing(self, remote_ids):
+        """Удаляет синхронизированные записи, которых больше нет на сервере"""
+        remote_ids = set(remote_ids)
+        with self.lock:
+            local_ids = [row[0] for row in self.connection.execute("SELECT id FROM passwords WHERE id > 0")]
+            missing = [(row_id,) for row_id in local_ids if row_id not in remote_ids]
+            if missing:
+                self.connection.executemany("DELETE FROM passwords WHERE id = ?", missing)
+            return len(missing)
+
+    def delete_account(self, service, username):
+        with self.lock:
+            return self.connection.execute(
+                "DELETE FROM passwords WHERE service = ? COLLATE NOCASE AND username = ? COLLATE NOCASE",
+                (service, username)
+            ).rowcount
+
+    # --- Очередь изменений, сделанных без связи с сервером ---
+
+    def queue_write(self, action, service, username, password_text=None):
+        """Ставит изменение в очередь и сразу применяет его локально"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.execute(
+                    "INSERT INTO pending_writes (action, service, username, password_text, queued_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (action, service, username, password_text, now)
+                )
+                if action == 'delete':
+                    self.connection.execute(
+                        "DELETE FROM passwords WHERE service = ? COLLATE NOCASE AND username = ? COLLATE NOCASE",
+                        (service, username)
+                    )
+                else:
+                    updated = self.connection.execute(
+                        "UPDATE passwords SET password_text = ? "
+                        "WHERE service = ? COLLATE NOCASE AND username = ? COLLATE NOCASE",
+                        (password_text, service, username)
+                    ).rowcount
+                    if not updated:
+                        # Временный отрицательный id до синхронизации с сервером
+                        self.connection.execute(
+                            "INSERT INTO passwords (id, service, username, password_text, created_at) "
+                            "VALUES ((SELECT MIN(0, IFNULL(MIN(id), 0)) - 1 FROM passwords), ?, ?, ?, ?)",
+                            (service, username, password_text, now)
+                        )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def pending_writes(self):
+        return self.query("SELECT * FROM pending_writes ORDER BY seq")
+
+    def remove_pending(self, seq):
+        with self.lock:
+            self.connection.execute("DELETE FROM pending_writes WHERE seq = ?", (seq,))
+
+    # --- Чтение (тот же интерфейс, что у DatabaseManager) ---
+
+    def count_passwords(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM passwords").fetchone()[0]
+
+    def get_all_passwords(self):
+        return self.query(f"SELECT id, service, username, password_text, created_at FROM passwords {ORDER_BY}")
+
+    def get_passwords_page(self, limit, after=None):
+        if after is None:
+            return self.query(
+                f"SELECT id, service, username, password_text, created_at FROM passwords {ORDER_BY} LIMIT ?",
+                (limit,)
+            )
+        service, username = after
+        return self.query(
+            "SELECT id, service, username, password_text, created_at FROM passwords "
+            "WHERE service > ? COLLATE NOCASE "
+            "OR (service = ? COLLATE NOCASE AND username > ? COLLATE NOCASE) "
+            f"{ORDER_BY} LIMIT ?",
+            (service, service, username, limit)
+        )
+
+    def iter_passwords(self, batch_size=1000):
+        after = None
+        while True:
+            rows = self.get_passwords_page(batch_size, after=after)
+            if not rows:
+                return
+            yield from rows
+            after = (rows[-1]['service'], rows[-1]['username'])
+
+    def get_password(self, service, username=None):
+        if username is None:
+            return self.query(
+                "SELECT id, service, username, password_text, created_at FROM passwords "
+                f"WHERE service = ? COLLATE NOCASE {ORDER_BY}",
+                (service,)
+            )
+        return self.query(
+            "SELECT id, service, username, password_text, created_at FROM passwords "
+            "WHERE service = ? COLLATE NOCASE AND username = ? COLLATE NOCASE",
+            (service, username)
+        )
+
+    def search_passwords(self, search_term, mode='substring', limit=None):
+        if mode not in ('prefix', 'substring'):
+            raise ValueError(f"Неизвестный режим поиска: {mode}")
+        pattern = escape_like(search_term)
+        pattern = f'{pattern}%' if mode == 'prefix' else f'%{pattern}%'
+        sql = (
+            "SELECT id, service, username, password_text, created_at FROM passwords "
+            "WHERE service LIKE ? ESCAPE '\\' OR username LIKE ? ESCAPE '\\' "
+            f"{ORDER_BY}"
+        )
+        params = [pattern, pattern]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.query(sql, params)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class ReplicatedDatabase:
+    """DatabaseManager, читающий из локальной реплики.
+
+    Чтение обслуживается локальной SQLite-копией без сетевых задержек и
+    работает без связи с сервером. Запись идет в MySQL, после чего
+    изменения подтягиваются в реплику; если сервер недоступен, изменение
+    ставится в очередь и отправляется при следующей синхронизации.
+    Остальные методы DatabaseManager доступны напрямую.
+    """
+
+    def __init__(self, db, replica, batch_size=1000):
+        self.db = db
+        self.replica = replica
+        self.batch_size = batch_size
+        self.sync_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def is_available(self):
+        # Реплика читается всегда; запись без связи уходит в очередь
+        return True
+
+    def is_offline_error(self, error):
+        return not self.db.pool or isinstance(error, self.db.disconnect_errors + (PoolTimeoutError,))
+
+    # --- Синхронизация ---
+
+    def sync(self):
+        """Отправляет очередь изменений и подтягивает изменения с сервера.
+
+        Возвращает статистику или None, если сервер недоступен.
+        """
+        with self.sync_lock:
+            if not self.db.pool and not self.db.connect():
+                return None
+            try:
+                stats = {'replayed': self.replay_pending(), 'applied': 0, 'deleted': 0}
+                applied, deleted = self.pull_changes()
+                stats['applied'] += applied
+                stats['deleted'] += deleted
+            except Exception as e:
+                if self.is_offline_error(e):
+                    logger.warning(f"Синхронизация реплики отложена: {e}")
+                    return None
+                raise
+
+            self.replica.set_meta('last_sync', datetime.now().isoformat(timespec='seconds'))
+            if any(stats.values()):
+                logger.info(f"Реплика синхронизирована: {stats}")
+            return stats
+
+    def replay_pending(self):
+        """Отправляет на сервер изменения, сделанные без связи"""
+        replayed = 0
+        for write in self.replica.pending_writes():
+            if write['action'] == 'delete':
+                try:
+                    self.db.delete_password(write['service'], write['username'])
+                except Exception as e:
+                    if self.is_offline_error(e):
+                        raise
+                    # Запись уже удалена на сервере
+                    logger.info(f"Отложенное удаление пропущено: {e}")
+            else:
+                self.db.add_or_update_password(write['service'], write['username'], write['password_text'])
+            self.replica.remove_pending(write['seq'])
+            replayed += 1
+        return replayed
+
+    def pull_changes(self):
+        """Применяет ленту изменений сервера с последней версии реплики.
+
+        Возвращает (изменено, удалено). Первая синхронизация и сброс ленты
+        (reset) выполняются полной копией таблицы.
+        """
+        since = self.replica.get_meta('feed_version')
+        if since is None:
+            return self.copy_all()
+
+        applied = deleted = 0
+        while True:
+            feed = self.db.get_changes(int(since), limit=self.batch_size)
+            if feed['reset']:
+                return self.copy_all()
+            if feed['deleted']:
+                self.replica.delete_ids(row['id'] for row in feed['deleted'])
+                deleted += len(feed['deleted'])
+            if feed['rows']:
+                self.replica.apply_rows(feed['rows'])
+                applied += len(feed['rows'])
+            since = feed['version']
+            self.replica.set_meta('feed_version', since)
+            if not feed['more']:
+                return applied, deleted
+
+    def copy_all(self):
+        """Копирует таблицу целиком и запоминает версию ленты"""
+        # Версия берется до копирования: изменения во время копирования
+        # придут повторно со следующей лентой, применение идемпотентно
+        version = self.db.get_change_version()
+        applied = 0
+        after = None
+        while True:
+            rows = self.db.get_passwords_page(self.batch_size, after=after)
+            if not rows:
+                break
+            self.replica.apply_rows(rows)
+            applied += len(rows)
+            after = (rows[-1]['service'], rows[-1]['username'])
+        deleted = self.replica.delete_missing(self.db.get_password_ids())
+        self.replica.set_meta('feed_version', version)
+        return applied, deleted
+
+    def pull_quietly(self):
+        try:
+            with self.sync_lock:
+                self.pull_changes()
+        except Exception as e:
+            logger.warning(f"Не удалось обновить реплику после записи: {e}")
+
+    # --- Запись ---
+
+    def add_or_update_password(self, service, username, encrypted_password):
+        try:
+            action = self.db.add_or_update_password(service, username, encrypted_password)
+        except Exception as e:
+            if not self.is_offline_error(e):
+                raise
+            self.replica.queue_write('upsert', service, username, encrypted_password)
+            self.db.notify('upsert', service, username)
+            logger.warning(f"Сервер недоступен, пароль для {service} сохранен локально")
+            return "сохранен локально (будет отправлен при подключении)"
+        self.pull_quietly()
+        return action
+
+    def delete_password(self, service, username):
+        try:
+            self.db.delete_password(service, username)
+        except Exception as e:
+            if not self.is_offline_error(e):
+                raise
+            self.replica.queue_write('delete', service, username)
+            self.db.notify('delete', service, username)
+            logger.warning(f"Сервер недоступен, удаление {service} поставлено в очередь")
+            return True
+        self.replica.delete_account(service, username)
+        return True
+
+    def bulk_upsert(self, rows, chunk_size=1000):
+        total = self.db.bulk_upsert(rows, chunk_size=chunk_size)
+        self.pull_quietly()
+        return total
+
+    def update_password_texts(self, updates):
+        updated = self.db.update_password_texts(updates)
+        self.pull_quietly()
+        return updated
+
+    # --- Чтение ---
+
+    def get_change_version(self):
+        """Версия ленты сервера; реплика догоняет ее до возврата.
+
+        Версия и лента (get_changes) берутся с сервера, а записи читаются
+        из реплики, поэтому перед возвратом реплика синхронизируется:
+        прочитанное после вызова содержит все изменения до этой версии.
+        Без связи с сервером бросает исключение, как DatabaseManager.
+        """
+        version = self.db.get_change_version()
+        if self.sync() is None:
+            raise Exception("Нет подключения к базе данных")
+        return version
+
+    def get_changes(self, since_version=0, limit=1000):
+        return self.db.get_changes(since_version, limit=limit)
+
+    def count_passwords(self):
+        return self.replica.count_passwords()
+
+    def get_all_passwords(self):
+        return self.replica.get_all_passwords()
+
+    def get_passwords_page(self, limit, after=None):
+        return self.replica.get_passwords_page(limit, after=after)
+
+    def iter_passwords(self, batch_size=1000):
+        return self.replica.iter_passwords(batch_size=batch_size)
+
+    def get_password(self, service, username=None):
+        return self.replica.get_password(service, username)
+
+    def search_passwords(self, search_term, mode='substring', limit=None):
+        return self.replica.search_passwords(search_term, mode=mode, limit=limit)
+
+    def close(self):
+        self.replica.close()
+        self.db.close()
@@ -0,0 +1,172 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = 'key_rotation.state'
+
+
+class KeyRotationJob:
+    """Перешифровывает все записи основным ключом после смены ключа.
+
+    Таблица обходится порциями по keyset-ключу (service, username).
+    Токены каждой порции перешифровываются в пуле потоков
+    (MultiFernet.rotate: расшифровка старым ключом и шифрование новым;
+    cryptography отпускает GIL), порция записывается одной транзакцией,
+    после чего позиция сохраняется в файл состояния. Прерванную работу
+    можно продолжить с последней записанной порции.
+
+    Другие запущенные копии приложения продолжают шифровать старым
+    ключом, поэтому перешифровку следует выполнять, когда они закрыты.
+    """
+
+    def __init__(self, db, encryption, batch_size=500, workers=4, state_path=DEFAULT_STATE_PATH):
+        self.db = db
+        self.encryption = encryption
+        self.batch_size = batch_size
+        self.workers = workers
+        self.state_path = state_path
+        self.stats = {'rows': 0, 'updated': 0, 'changed': 0, 'failed': 0,
+                      'seconds': 0.0, 'rows_per_second': 0.0}
+
+    def load_state(self):
+        """Возвращает сохраненное состояние или None"""
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, encoding='utf-8') as state_file:
+            return json.load(state_file)
+
+    def save_state(self, state):
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as state_file:
+            json.dump(state, state_file, ensure_ascii=False)
+        os.replace(temp_path, self.state_path)
+
+    @property
+    def in_progress(self):
+        return os.path.exists(self.state_path)
+
+    def start(self):
+        """Создает новый основной ключ и начинает перешифровку с начала таблицы"""
+        if self.in_progress:
+            raise Exception("Перешифровка уже начата - продолжите ее перед новой сменой ключа")
+        self.encryption.rotate_key()
+        self.save_state({'after': None, 'rows': 0})
+
+    def rotate_one(self, row):
+        """Перешифровывает одну запись; возвращает кортеж для UPDATE или None"""
+        try:
+            return self.encryption.rotate_token(row['password_text']), row['id'], row['password_text']
+        except Exception as e:
+            logger.error(f"Не удалось перешифровать {row['service']} ({row['username']}): {e}")
+            return None
+
+    def run(self, progress=None):
+        """Перешифровывает записи с сохраненной позиции до конца таблицы"""
+        state = self.load_state() or {'after': None, 'rows': 0}
+        after = tuple(state['after']) if state['after'] else None
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                rows = self.db.get_passwords_page(self.batch_size, after=after)
+                if not rows:
+                    break
+
+                updates = []
+                for update in pool.map(self.rotate_one, rows):
+                    if update is None:
+                        self.stats['failed'] += 1
+                    else:
+                        updates.append(update)
+
+                updated = self.db.update_password_texts(updates)
+                self.stats['updated'] += updated
+                # Запись изменилась между чтением и обновлением
+                self.stats['changed'] += len(updates) - updated
+                self.stats['rows'] += len(rows)
+
+                after = (rows[-1]['service'], rows[-1]['username'])
+                self.save_state({'after': list(after), 'rows': state['rows'] + self.stats['rows']})
+
+                if progress is not None:
+                    progress(self.stats['rows'], time.perf_counter() - started)
+
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = elapsed
+        self.stats['rows_per_second'] = self.stats['rows'] / elapsed if elapsed > 0 else 0.0
+
+        if self.stats['failed'] == 0 and self.stats['changed'] == 0:
+            # Все записи зашифрованы основным ключом - старые больше не нужны
+            self.encryption.retire_old_keys()
+            os.remove(self.state_path)
+            logger.info(f"Перешифровка завершена: {self.stats}")
+        else:
+            # Оставляем старые ключи, чтобы не потерять непрочитанные записи;
+            # повторный запуск пройдет таблицу заново
+            self.save_state({'after': None, 'rows': 0})
+            logger.warning(f"Перешифровка завершена с ошибками: {self.stats}")
+        return self.stats
+
+
+def main(argv=None):
+    """Смена ключа из командной строки: python -m src.rotation [--new-key]"""
+    parser = argparse.ArgumentParser(description="Смена ключа шифрования и перешифровка записей")
+    parser.add_argument('--new-key', action='store_true',
+                        help="создать новый основной ключ (без флага - продолжить прерванную перешифровку)")
+    parser.add_argument('--batch-size', type=int, default=500, help="записей в одной транзакции")
+    parser.add_argument('--workers', type=int, default=4, help="потоков для перешифровки")
+    parser.add_argument('--state-file', default=DEFAULT_STATE_PATH, help="файл состояния для продолжения")
+    args = parser.parse_args(argv)
+
+    from src.database import DatabaseManager
+    from src.kdf import InvalidMasterPassword
+    from src.security import KeyringError, create_encryption_manager
+
+    try:
+        encryption = create_encryption_manager()
+    except (InvalidMasterPassword, KeyringError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    db = DatabaseManager()
+    if not db.pool:
+        return 1
+    if not db.ensure_schema():
+        print("[ERROR] Не удалось создать таблицу")
+        db.close()
+        return 1
+
+    def report(rows, seconds):
+        rate = rows / seconds if seconds > 0 else 0.0
+        print(f"\r[INFO] Перешифровано {rows} записей ({rate:.0f} записей/с)", end='', flush=True)
+
+    try:
+        job = KeyRotationJob(db, encryption, batch_size=args.batch_size,
+                             workers=args.workers, state_path=args.state_file)
+        if args.new_key:
+            job.start()
+        elif not job.in_progress:
+            print("[INFO] Перешифровка не начата. Используйте --new-key для смены ключа")
+            return 0
+
+        stats = job.run(progress=report)
+        print()
+        print(f"[SUCCESS] Перешифровано {stats['updated']} записей за {stats['seconds']:.1f} с "
+              f"({stats['rows_per_second']:.0f} записей/с), ошибок: {stats['failed']}")
+        return 0 if stats['failed'] == 0 else 1
+    except Exception as e:
+        print()
+        print(f"[ERROR] Ошибка смены ключа: {e}")
+        logger.error(f"Ошибка смены ключа: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import logging
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SearchCache:
+    """LRU-кэш результатов поиска: запрос -> id найденных записей.
+
+    Сами записи хранятся один раз в общем словаре и удаляются, когда на
+    них больше не ссылается ни один закэшированный запрос. Полный
+    (не обрезанный лимитом) результат можно сузить локально, если новый
+    запрос содержит закэшированный как подстроку.
+    """
+
+    def __init__(self, max_terms=64):
+        self.max_terms = max_terms
+        self.entries = OrderedDict()
+        self.rows = {}
+        self.refcounts = Counter()
+
+    @staticmethod
+    def normalize(term):
+        return term.strip().casefold()
+
+    def put(self, term, rows, complete=True):
+        """Сохраняет результат запроса"""
+        key = self.normalize(term)
+        if key in self.entries:
+            self._drop(key)
+
+        ids = tuple(row['id'] for row in rows)
+        for row in rows:
+            self.rows[row['id']] = row
+            self.refcounts[row['id']] += 1
+        self.entries[key] = (ids, complete)
+
+        while len(self.entries) > self.max_terms:
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+
+    def get(self, term):
+        """Возвращает закэшированные записи для запроса или None"""
+        key = self.normalize(term)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        ids, _ = entry
+        return [self.rows[row_id] for row_id in ids]
+
+    def narrow(self, term):
+        """Сужает полный результат более короткого запроса до нового.
+
+        Возвращает None, если подходящего полного результата в кэше нет.
+        """
+        key = self.normalize(term)
+        best = None
+        for cached_key, (ids, complete) in self.entries.items():
+            if complete and cached_key in key and (best is None or len(cached_key) > len(best)):
+                best = cached_key
+        if best is None:
+            return None
+
+        self.entries.move_to_end(best)
+        ids, _ = self.entries[best]
+        return [
+            self.rows[row_id] for row_id in ids
+            if key in self.rows[row_id]['service'].casefold()
+            or key in self.rows[row_id]['username'].casefold()
+        ]
+
+    def invalidate(self):
+        """Сбрасывает кэш (после изменения данных)"""
+        self.entries.clear()
+        self.rows.clear()
+        self.refcounts.clear()
+
+    def _drop(self, key):
+        ids, _ = self.entries.pop(key)
+        for row_id in ids:
+            self.refcounts[row_id] -= 1
+            if self.refcounts[row_id] <= 0:
+                del self.refcounts[row_id]
+                self.rows.pop(row_id, None)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SecretCache:
+    """Ограниченный кэш расшифрованных паролей с коротким временем жизни.
+
+    Ключ - id записи и SHA-256 шифротекста, поэтому после изменения
+    пароля старое значение по новому шифротексту не найдется. Значения
+    хранятся в bytearray и затираются нулями при вытеснении, истечении
+    срока или очистке. Это лишь сокращает время жизни открытого текста:
+    строки, выданные вызывающему коду, Python затереть не позволяет.
+    """
+
+    def __init__(self, max_entries=256, ttl=60, clock=time.monotonic):
+        if max_entries < 1:
+            raise ValueError("Размер кэша должен быть положительным")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.by_account = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0, 'expired': 0}
+
+    @staticmethod
+    def make_key(row_id, encrypted_password):
+        if isinstance(encrypted_password, str):
+            encrypted_password = encrypted_password.encode('utf-8')
+        return row_id, hashlib.sha256(encrypted_password).digest()
+
+    @staticmethod
+    def account_key(service, username):
+        """Учетная запись без учета регистра - как ее сравнивает хранилище
+        (COLLATE NOCASE в SQLite, collation *_ci в MySQL)
+        """
+        return (service.casefold() if service is not None else None,
+                username.casefold() if username is not None else None)
+
+    def get(self, row_id, encrypted_password):
+        """Возвращает пароль из кэша или None"""
+        key = self.make_key(row_id, encrypted_password)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            value, expires_at, account = entry
+            if self.clock() >= expires_at:
+                self.drop(key)
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value.decode('utf-8')
+
+    def put(self, row_id, encrypted_password, password, service=None, username=None):
+        """Кладет расшифрованный пароль в кэш"""
+        key = self.make_key(row_id, encrypted_password)
+        account = self.account_key(service, username)
+        with self.lock:
+            if key in self.entries:
+                self.drop(key)
+            self.entries[key] = (bytearray(password.encode('utf-8')), self.clock() + self.ttl, account)
+            self.by_account.setdefault(account, set()).add(key)
+
+            while len(self.entries) > self.max_entries:
+                oldest = next(iter(self.entries))
+                self.drop(oldest)
+                self.stats['evicted'] += 1
+
+    def invalidate(self, service, username):
+        """Удаляет все значения записи (после изменения или удаления)"""
+        account = self.account_key(service, username)
+        with self.lock:
+            for key in list(self.by_account.get(account, ())):
+                self.drop(key)
+
+    def purge_expired(self):
+        """Удаляет значения с истекшим сроком; возвращает их количество"""
+        now = self.clock()
+        with self.lock:
+            expired = [key for key, (_, expires_at, _) in self.entries.items() if now >= expires_at]
+            for key in expired:
+                self.drop(key)
+            self.stats['expired'] += len(expired)
+            return len(expired)
+
+    def clear(self):
+        """Затирает и удаляет все значения"""
+        with self.lock:
+            for key in list(self.entries):
+                self.drop(key)
+
+    def drop(self, key):
+        """Удаляет значение и затирает буфер (вызывать под блокировкой)"""
+        value, _, account = self.entries.pop(key)
+        value[:] = bytes(len(value))
+        keys = self.by_account.get(account)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_account[account]
+
+    def on_change(self, action, service=None, username=None):
+        """Слушатель изменений DatabaseManager"""
+        if service is None:
+            self.clear()
+        else:
+            self.invalidate(service, username)
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,37 +1,82 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.fernet import InvalidToken
 import os
+import hashlib
 import logging
+import threading
+from collections import namedtuple
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import metrics
+from src.kdf import DEFAULT_KDF_PATH, InvalidMasterPassword, MasterKey, prompt_master_password
+
+try:
+    from config.config import MASTER_PASSWORD_CONFIG
+except ImportError:
+    MASTER_PASSWORD_CONFIG = {}
 
 logger = logging.getLogger(__name__)
 
+# Результат пакетной операции: value при успехе, error - исключение при ошибке
+CryptoResult = namedtuple('CryptoResult', 'value error')
+
+# Меньше этого количества элементов пакет обрабатывается в текущем потоке
+PARALLEL_THRESHOLD = 256
+
+DEFAULT_KEY_PATH = 'encryption.key'
+
+
+class KeyringError(Exception):
+    """Файл ключей есть, но прочитать его не удалось.
+    
+    Новый ключ в этом случае не создается: он затер бы ключи, которыми
+    зашифрованы записи (в том числе еще не перешифрованные после смены ключа).
+    """
+
+
 class EncryptionManager:
-    def __init__(self, key_path='encryption.key'):
+    def __init__(self, key_path=DEFAULT_KEY_PATH, master_key=None):
         self.key_path = key_path
+        # С мастер-паролем (src.kdf.MasterKey) файл ключей хранится
+        # зашифрованным, а открытые ключи есть только в памяти
+        self.master_key = master_key
+        # Файл ключа может содержать несколько ключей (по одному в строке):
+        # первым шифруются новые данные, остальные нужны для расшифровки
+        # записей, еще не перешифрованных после смены ключа
+        self.keys = []
+        self.is_plain_keyring = False
         self.key = self.load_or_create_key()
+        self.pool = None
+        self.pool_lock = threading.Lock()
         
-        # Проверяем валидность ключа перед созданием Fernet
-        try:
-            self.fernet = Fernet(self.key)
-            print("[SUCCESS] Ключ шифрования инициализирован")
-        except Exception as e:
-            logger.error(f"Неверный ключ шифрования: {e}")
-            print(f"[ERROR] Неверный ключ шифрования: {e}")
-            print("[INFO] Генерируем новый ключ...")
-            # Генерируем новый ключ при ошибке
-            self.key = self.generate_new_key()
-            self.fernet = Fernet(self.key)
+        # Ключи уже проверены при загрузке
+        self.fernet = self.build_fernet()
+        print("[SUCCESS] Ключ шифрования инициализирован")
+    
+    def build_fernet(self):
+        """Создает MultiFernet из всех ключей (первый - основной)"""
+        return MultiFernet([Fernet(key) for key in self.keys])
     
     def load_or_create_key(self):
-        """Загружает существующий ключ или создает новый"""
+        """Загружает существующий ключ или создает новый, если файла ключа нет.
+        
+        Если файл есть, но не читается, - исключение KeyringError.
+        """
+        if not os.path.exists(self.key_path):
+            print("[INFO] Файл ключа не найден, создаем новый")
+            return self.generate_new_key()
+        
         try:
-            if os.path.exists(self.key_path):
-                # Читаем как бинарный файл
-                with open(self.key_path, 'rb') as key_file:
-                    key = key_file.read().strip()
-                
-                print(f"[DEBUG] Прочитано {len(key)} байт из файла ключа")
-                
+            # Читаем как бинарный файл
+            with open(self.key_path, 'rb') as key_file:
+                keys = self.read_keyring(key_file.read())
+            
+            logger.debug("Прочитано ключей из файла: %d", len(keys))
+            if not keys:
+                raise ValueError("Файл ключа пуст")
+            
+            for key in keys:
                 # Проверяем базовую валидность ключа
                 if len(key) != 44:  # Fernet ключ всегда 44 байта в base64
                     raise ValueError(f"Неверная длина ключа: {len(key)} (ожидается 44)")
@@ -39,30 +84,99 @@ class EncryptionManager:
                 # Пробуем создать Fernet для проверки ключа
                 try:
                     Fernet(key)
-                    logger.info("Ключ шифрования загружен и проверен")
-                    print("[SUCCESS] Ключ шифрования загружен из файла и проверен")
-                    return key
                 except Exception as fernet_error:
                     raise ValueError(f"Ключ невалиден для Fernet: {fernet_error}")
-            else:
-                print("[INFO] Файл ключа не найден, создаем новый")
-                return self.generate_new_key()
-                
+        
+        except (InvalidMasterPassword, KeyringError):
+            raise
+        
         except Exception as e:
-            logger.error(f"Ошибка при загрузке ключа: {e}. Создаем новый.")
-            print(f"[ERROR] Ошибка при загрузке ключа: {e}")
-            return self.generate_new_key()
+            error_msg = f"Не удалось прочитать файл ключей {self.key_path}: {e}"
+            logger.error(error_msg)
+            print(f"[ERROR] {error_msg}")
+            raise KeyringError(
+                f"{error_msg}. Новый ключ не создан, чтобы не потерять существующие - "
+                "восстановите файл ключей из резервной копии"
+            ) from e
+        
+        self.keys = keys
+        if self.master_key is not None and self.is_plain_keyring:
+            # Переход на мастер-пароль: шифруем существующий файл ключей
+            self.save_keys()
+            logger.info("Файл ключей зашифрован мастер-паролем")
+            print("[SUCCESS] Файл ключей зашифрован мастер-паролем")
+        logger.info("Ключ шифрования загружен и проверен")
+        print("[SUCCESS] Ключ шифрования загружен из файла и проверен")
+        return keys[0]
     
     def generate_new_key(self):
         """Генерирует новый ключ и сохраняет в файл"""
         key = Fernet.generate_key()
-        with open(self.key_path, 'wb') as key_file:
-            key_file.write(key)
+        self.keys = [key]
+        self.save_keys()
         logger.info("Новый ключ шифрования создан")
         print("[SUCCESS] Новый ключ шифрования создан и сохранен")
-        print(f"[DEBUG] Новый ключ: {key.decode('utf-8')}")
         return key
     
+    def read_keyring(self, content):
+        """Разбирает содержимое файла ключей (открытое или зашифрованное)"""
+        keys = content.split()
+        self.is_plain_keyring = all(len(key) == 44 for key in keys)
+        if self.is_plain_keyring:
+            return keys
+        if self.master_key is None:
+            raise InvalidMasterPassword(
+                "Файл ключей зашифрован мастер-паролем - включите MASTER_PASSWORD_CONFIG"
+            )
+        try:
+            return self.master_key.unwrap(content.strip()).split()
+        except InvalidMasterPassword as e:
+            # Мастер-пароль уже проверен по master.kdf - повторный ввод не
+            # поможет: файл ключей поврежден или зашифрован другим паролем
+            raise KeyringError(f"{e} или поврежден ({self.key_path})") from None
+    
+    def save_keys(self):
+        """Атомарно записывает ключи в файл (основной - первым)"""
+        content = b'\n'.join(self.keys)
+        if self.master_key is not None:
+            content = self.master_key.wrap(content)
+        temp_path = self.key_path + '.tmp'
+        with open(temp_path, 'wb') as key_file:
+            key_file.write(content)
+        os.replace(temp_path, self.key_path)
+    
+    def rotate_key(self):
+        """Добавляет новый основной ключ, сохраняя старые для расшифровки.
+        
+        После смены ключа записи в БД нужно перешифровать
+        (src/rotation.py), затем вызвать retire_old_keys().
+        """
+        new_key = Fernet.generate_key()
+        self.keys = [new_key] + self.keys
+        self.save_keys()
+        self.key = new_key
+        self.fernet = self.build_fernet()
+        logger.info(f"Создан новый основной ключ шифрования, всего ключей: {len(self.keys)}")
+        print("[SUCCESS] Создан новый основной ключ шифрования")
+        return new_key
+    
+    def retire_old_keys(self):
+        """Удаляет из файла все ключи, кроме основного"""
+        retired = len(self.keys) - 1
+        self.keys = [self.key]
+        self.save_keys()
+        self.fernet = self.build_fernet()
+        logger.info(f"Старые ключи шифрования удалены: {retired}")
+        return retired
+    
+    @metrics.timed('crypto.rotate_token')
+    def rotate_token(self, encrypted_password):
+        """Перешифровывает токен основным ключом (без раскрытия пароля вызывающему)"""
+        if isinstance(encrypted_password, str):
+            encrypted_password = encrypted_password.encode('utf-8')
+        return self.fernet.rotate(encrypted_password).decode('utf-8')
+    
+    @metrics.timed('crypto.encrypt_password')
     def encrypt_password(self, password):
         """Шифрует пароль"""
         try:
@@ -76,14 +190,110 @@ class EncryptionManager:
             print(f"[ERROR] Ошибка при шифровании пароля: {e}")
             raise
     
+    def get_pool(self):
+        """Возвращает общий пул потоков для пакетных операций"""
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(
+                    max_workers=min(8, os.cpu_count() or 1),
+                    thread_name_prefix='pm-crypto'
+                )
+            return self.pool
+    
+    def map_chunks(self, func, items, chunk_size):
+        """Применяет func к порциям items (в пуле потоков для больших пакетов)"""
+        items = list(items)
+        if len(items) < PARALLEL_THRESHOLD or (os.cpu_count() or 1) == 1:
+            return func(items)
+        
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        results = []
+        for chunk_results in self.get_pool().map(func, chunks):
+            results.extend(chunk_results)
+        return results
+    
+    def decrypt_chunk(self, tokens):
+        """Расшифровывает порцию токенов без логирования каждой ошибки"""
+        decrypt = self.fernet.decrypt
+        results = []
+        append = results.append
+        for token in tokens:
+            try:
+                if isinstance(token, str):
+                    token = token.encode('utf-8')
+                append(CryptoResult(decrypt(token).decode('utf-8'), None))
+            except Exception as e:
+                append(CryptoResult(None, e))
+        return results
+    
+    def encrypt_chunk(self, passwords):
+        """Шифрует порцию паролей без логирования каждой ошибки"""
+        encrypt = self.fernet.encrypt
+        results = []
+        append = results.append
+        for password in passwords:
+            try:
+                if not password:
+                    raise ValueError("Пароль не может быть пустым")
+                append(CryptoResult(encrypt(password.encode('utf-8')).decode('utf-8'), None))
+            except Exception as e:
+                append(CryptoResult(None, e))
+        return results
+    
+    def digest_chunk(self, tokens, algorithm='sha1'):
+        """Хеширует пароли порции; открытый пароль не покидает метод"""
+        decrypt = self.fernet.decrypt
+        results = []
+        append = results.append
+        for token in tokens:
+            try:
+                if isinstance(token, str):
+                    token = token.encode('utf-8')
+                append(CryptoResult(hashlib.new(algorithm, decrypt(token)).hexdigest().upper(), None))
+            except Exception as e:
+                append(CryptoResult(None, e))
+        return results
+    
+    @metrics.timed('crypto.decrypt_many')
+    def decrypt_many(self, tokens, chunk_size=128):
+        """Расшифровывает последовательность токенов.
+        
+        Возвращает список CryptoResult в исходном порядке. Ошибки не
+        прерывают пакет и не пишутся в лог по одной - их возвращает
+        поле error соответствующего элемента.
+        """
+        results = self.map_chunks(self.decrypt_chunk, tokens, chunk_size)
+        metrics.increment('crypto.decrypted', len(results))
+        failed = sum(1 for result in results if result.error is not None)
+        if failed:
+            logger.warning(f"Не удалось расшифровать {failed} из {len(results)} паролей")
+        return results
+    
+    @metrics.timed('crypto.digest_many')
+    def digest_many(self, tokens, algorithm='sha1', chunk_size=128):
+        """Возвращает хеши паролей (hex в верхнем регистре, как в базах
+        утечек) списком CryptoResult; пароли расшифровываются только в памяти
+        """
+        return self.map_chunks(partial(self.digest_chunk, algorithm=algorithm), tokens, chunk_size)
+    
+    @metrics.timed('crypto.encrypt_many')
+    def encrypt_many(self, passwords, chunk_size=128):
+        """Шифрует последовательность паролей, возвращает список CryptoResult"""
+        results = self.map_chunks(self.encrypt_chunk, passwords, chunk_size)
+        metrics.increment('crypto.encrypted', len(results))
+        return results
+    
+    @metrics.timed('crypto.decrypt_password')
     def decrypt_password(self, encrypted_password):
         """Расшифровывает пароль"""
         try:
             if not encrypted_password:
                 raise ValueError("Зашифрованный пароль не может быть пустым")
             
-            # Декодируем из строки в байты
-            encrypted_bytes = encrypted_password.encode('utf-8')
+            # Декодируем из строки в байты (MySQL VARBINARY отдает bytes)
+            encrypted_bytes = encrypted_password
+            if isinstance(encrypted_bytes, str):
+                encrypted_bytes = encrypted_bytes.encode('utf-8')
             
             # Пытаемся расшифровать
             decrypted = self.fernet.decrypt(encrypted_bytes)
@@ -98,8 +308,7 @@ class EncryptionManager:
             print(f"[ERROR] {error_msg}")
             
             # Показываем дополнительную диагностику
-            print(f"[DEBUG] Длина зашифрованных данных: {len(encrypted_password)}")
-            print(f"[DEBUG] Первые 20 символов зашифрованных данных: {encrypted_password[:20]}")
+            logger.debug("Длина зашифрованных данных: %d", len(encrypted_password))
             
             # Создаем информативное сообщение для пользователя
             user_friendly_msg = (
@@ -120,8 +329,7 @@ class EncryptionManager:
             
             # Логируем дополнительную информацию для отладки
             if encrypted_password:
-                print(f"[DEBUG] Тип зашифрованных данных: {type(encrypted_password)}")
-                print(f"[DEBUG] Длина: {len(encrypted_password)}")
+                logger.debug("Тип зашифрованных данных: %s, длина: %d", type(encrypted_password), len(encrypted_password))
             
             raise
     
@@ -156,6 +364,8 @@ class EncryptionManager:
             key_str = self.key.decode('utf-8') if isinstance(self.key, bytes) else str(self.key)
             return {
                 'length': len(self.key),
+                'keys': len(self.keys),
+                'master_password': self.master_key is not None,
                 'first_10_chars': key_str[:10] + '...',
                 'path': self.key_path,
                 'exists': os.path.exists(self.key_path)
@@ -164,6 +374,64 @@ class EncryptionManager:
             return {'error': f"Не удалось получить информацию о ключе: {e}"}
 
 
+def master_password_state():
+    """None - мастер-пароль выключен, иначе признак первого запуска.
+    
+    Позволяет запросить пароль заранее (в GUI - в главном потоке), а
+    вывод ключа create_encryption_manager выполнить в фоне.
+    """
+    if not MASTER_PASSWORD_CONFIG.get('enabled'):
+        return None
+    return not MasterKey.exists(MASTER_PASSWORD_CONFIG.get('kdf_path', DEFAULT_KDF_PATH))
+
+
+def create_encryption_manager(ask_password=prompt_master_password):
+    """Создает EncryptionManager с учетом MASTER_PASSWORD_CONFIG.
+    
+    ask_password(first_run) возвращает мастер-пароль; при первом запуске
+    параметры KDF калибруются под этот компьютер. Неверный пароль -
+    исключение InvalidMasterPassword, поврежденные файлы ключей или
+    параметров KDF - KeyringError.
+    """
+    if not MASTER_PASSWORD_CONFIG.get('enabled'):
+        return EncryptionManager()
+    
+    kdf_path = MASTER_PASSWORD_CONFIG.get('kdf_path', DEFAULT_KDF_PATH)
+    first_run = not MasterKey.exists(kdf_path)
+    if first_run and is_wrapped_keyring(DEFAULT_KEY_PATH):
+        # Новые параметры KDF не подойдут к файлу ключей, зашифрованному
+        # прежним мастер-паролем
+        raise KeyringError(
+            f"Файл ключей {DEFAULT_KEY_PATH} зашифрован мастер-паролем, но параметры {kdf_path} "
+            "не найдены - восстановите их из резервной копии"
+        )
+    password = ask_password(first_run)
+    if not password:
+        raise InvalidMasterPassword("Мастер-пароль не введен")
+    
+    if first_run:
+        master_key = MasterKey.create(
+            password, kdf_path,
+            target_ms=MASTER_PASSWORD_CONFIG.get('target_ms', 500),
+            max_memory_mb=MASTER_PASSWORD_CONFIG.get('max_memory_mb', 256)
+        )
+    else:
+        try:
+            master_key = MasterKey.unlock(password, kdf_path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise KeyringError(f"Не удалось прочитать параметры мастер-пароля {kdf_path}: {e}") from e
+    return EncryptionManager(master_key=master_key)
+
+
+def is_wrapped_keyring(key_path=DEFAULT_KEY_PATH):
+    """Файл ключей существует и зашифрован мастер-паролем"""
+    if not os.path.exists(key_path):
+        return False
+    with open(key_path, 'rb') as key_file:
+        keys = key_file.read().split()
+    return not all(len(key) == 44 for key in keys)
+
+
 # Дополнительная функция для диагностики
 def diagnose_encryption_issue():
     """Функция для диагностики проблем с шифрованием"""
@@ -0,0 +1,26 @@
+"""Хранилища записей для DatabaseManager.
+
+Драйвер выбранного хранилища импортируется только при его создании,
+поэтому для SQLite не нужен pymysql, а для MySQL - ничего лишнего.
+"""
+
+from src.storage.base import StorageBackend, escape_like
+
+ENGINES = ('mysql', 'sqlite')
+
+
+def create_backend(storage_config=None, db_config=None, pool_config=None):
+    """Создает хранилище по STORAGE_CONFIG (по умолчанию MySQL)"""
+    storage_config = storage_config or {}
+    engine = storage_config.get('engine', 'mysql')
+
+    if engine == 'mysql':
+        from src.storage.mysql import MySQLBackend
+        return MySQLBackend(db_config or {}, pool_config)
+    if engine == 'sqlite':
+        from src.storage.sqlite import DEFAULT_SQLITE_PATH, SQLiteBackend
+        return SQLiteBackend(storage_config.get('path', DEFAULT_SQLITE_PATH), pool_config)
+    raise ValueError(f"Неизвестное хранилище: {engine} (доступны: {', '.join(ENGINES)})")
+
+
+__all__ = ['ENGINES', 'StorageBackend', 'create_backend', 'escape_like']
@@ -0,0 +1,305 @@
+import logging
+from contextlib import closing, contextmanager
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = "id, service, username, password_text, created_at"
+
+
+def escape_like(term):
+    """Экранирует спецсимволы шаблона LIKE"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class StorageBackend:
+    """Хранилище записей, с которым работает DatabaseManager.
+
+    Реализация задает соединения (pool, open_connection), транзакции,
+    схему и диалектные запросы (вставка/обновление, поиск). Общие запросы
+    написаны здесь один раз с плейсхолдером %s; sql() переводит их в
+    синтаксис драйвера. Методы возвращают строки в виде словарей и
+    пробрасывают исключения драйвера (errors) - сообщения пользователю
+    выводит DatabaseManager.
+    """
+
+    name = None
+    # Базовый класс ошибок драйвера и ошибки потери соединения
+    errors = ()
+    disconnect_errors = ()
+    # Окончание условия LIKE, если драйвер не считает '\' экранирующим символом
+    like_escape = ""
+
+    def __init__(self):
+        self.pool = None
+        self.fulltext_available = False
+
+    # --- Соединения ---
+
+    def connect(self):
+        """Создает пул соединений и проверяет, что соединение открывается"""
+        raise NotImplementedError
+
+    def open_connection(self, streaming=False):
+        """Открывает соединение вне пула (streaming - для долгого обхода)"""
+        raise NotImplementedError
+
+    def connection_hints(self):
+        """Что проверить пользователю, если подключиться не удалось"""
+        return []
+
+    def location(self):
+        """Адрес хранилища для кэша проверки схемы (None - не кэшировать)"""
+        return None
+
+    def sql(self, query):
+        """Переводит запрос с плейсхолдерами %s в синтаксис драйвера"""
+        return query
+
+    @staticmethod
+    def cursor(connection):
+        return closing(connection.cursor())
+
+    def begin(self, connection):
+        connection.begin()
+
+    @contextmanager
+    def transaction(self, connection):
+        """Выполняет блок в транзакции: commit при успехе, rollback при ошибке"""
+        self.begin(connection)
+        try:
+            yield
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    def query(self, query, params=()):
+        with self.pool.connection() as connection, self.cursor(connection) as cursor:
+            cursor.execute(self.sql(query), params)
+            return cursor.fetchall()
+
+    def execute(self, query, params=()):
+        """Выполняет изменяющий запрос; возвращает число затронутых строк"""
+        with self.pool.connection() as connection, self.cursor(connection) as cursor:
+            cursor.execute(self.sql(query), params)
+            return cursor.rowcount
+
+    def metrics(self):
+        return self.pool.metrics() if self.pool else {}
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+
+    # --- Схема ---
+
+    # Миграции схемы по возрастанию номера (src.storage.migrations)
+    migrations = ()
+    # Вставка, пропускающая строку с существующим ключом
+    insert_ignore = "INSERT IGNORE"
+
+    @contextmanager
+    def migration_lock(self):
+        """Не дает нескольким клиентам применять миграции одновременно"""
+        yield
+
+    def ensure_search_indexes(self):
+        """Создает необязательные индексы поиска; возвращает признак
+        полнотекстового поиска
+        """
+        raise NotImplementedError
+
+    # --- Версии изменений ---
+
+    # Текущее время в часовом поясе, в котором пишется created_at
+    now_sql = "CURRENT_TIMESTAMP"
+
+    def next_version(self, cursor, count=1):
+        """Выделяет count версий в текущей транзакции; возвращает первую.
+
+        Счетчик - одна строка vault_version: ее блокировка упорядочивает
+        пишущие транзакции, поэтому версии фиксируются по возрастанию и
+        читатель ленты не пропустит изменение с меньшей версией.
+        """
+        cursor.execute(self.sql("UPDATE vault_version SET version = version + %s WHERE id = 1"), (count,))
+        cursor.execute("SELECT version FROM vault_version WHERE id = 1")
+        return cursor.fetchone()['version'] - count + 1
+
+    def current_version(self):
+        return self.query("SELECT version FROM vault_version WHERE id = 1")[0]['version']
+
+    def fetch_changes(self, since_version=0, limit=1000):
+        """Изменения с версией больше since_version (см. DatabaseManager.get_changes)"""
+        state = self.query("SELECT version, pruned_version FROM vault_version WHERE id = 1")[0]
+        current = state['version']
+        if since_version < state['pruned_version']:
+            # Нужные отметки об удалении уже очищены - только полная перезагрузка
+            return {'version': current, 'rows': [], 'deleted': [], 'more': False, 'reset': True}
+
+        rows = self.query(f"""
+            SELECT {COLUMNS}, updated_at, version
+            FROM passwords
+            WHERE version > %s AND version <= %s
+            ORDER BY version
+            LIMIT %s
+        """, (since_version, current, limit))
+        upper = rows[-1]['version'] if len(rows) >= limit else current
+
+        deleted = self.query("""
+            SELECT id, service, username, version
+            FROM password_tombstones
+            WHERE version > %s AND version <= %s
+            ORDER BY version
+            LIMIT %s
+        """, (since_version, upper, limit))
+        if len(deleted) >= limit:
+            upper = deleted[-1]['version']
+            rows = [row for row in rows if row['version'] <= upper]
+
+        return {'version': upper, 'rows': rows, 'deleted': deleted, 'more': upper < current, 'reset': False}
+
+    def prune_tombstones(self, before):
+        """Удаляет отметки об удалении старше before; возвращает их количество"""
+        with self.pool.connection() as connection:
+            with self.transaction(connection), self.cursor(connection) as cursor:
+                cursor.execute(
+                    self.sql("SELECT MAX(version) AS version FROM password_tombstones WHERE deleted_at < %s"),
+                    (before,)
+                )
+                version = cursor.fetchone()['version']
+                if version is None:
+                    return 0
+                cursor.execute(self.sql("DELETE FROM password_tombstones WHERE version <= %s"), (version,))
+                pruned = cursor.rowcount
+                cursor.execute(
+                    self.sql("UPDATE vault_version SET pruned_version = %s WHERE id = 1 AND pruned_version < %s"),
+                    (version, version)
+                )
+                return pruned
+
+    # --- Запись ---
+
+    upsert_sql = None
+
+    def upsert(self, service, username, encrypted_password):
+        """Добавляет или обновляет запись; возвращает True для новой записи"""
+        raise NotImplementedError
+
+    def bulk_upsert(self, rows, chunk_size=1000):
+        """Пишет строки порциями, каждую одним executemany в транзакции"""
+        total = 0
+        chunk = []
+        with self.pool.connection() as connection:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    total += self.write_chunk(connection, chunk)
+                    chunk = []
+            if chunk:
+                total += self.write_chunk(connection, chunk)
+        return total
+
+    def write_chunk(self, connection, chunk):
+        """Записывает одну порцию строк в транзакции, каждой строке - своя версия"""
+        with self.transaction(connection), self.cursor(connection) as cursor:
+            first = self.next_version(cursor, len(chunk))
+            cursor.executemany(
+                self.sql(self.upsert_sql),
+                [tuple(row) + (first + offset,) for offset, row in enumerate(chunk)]
+            )
+        return len(chunk)
+
+    def update_password_texts(self, updates):
+        """Заменяет шифротексты (new, id, old) одной транзакцией"""
+        with self.pool.connection() as connection:
+            with self.transaction(connection), self.cursor(connection) as cursor:
+                first = self.next_version(cursor, len(updates))
+                cursor.executemany(
+                    self.sql(f"UPDATE passwords SET password_text = %s, version = %s, updated_at = {self.now_sql} "
+                             "WHERE id = %s AND password_text = %s"),
+                    [(new, first + offset, row_id, old) for offset, (new, row_id, old) in enumerate(updates)]
+                )
+                return cursor.rowcount
+
+    def delete(self, service, username):
+        """Удаляет запись, оставляя отметку для ленты изменений; возвращает
+        число удаленных строк
+        """
+        with self.pool.connection() as connection:
+            with self.transaction(connection), self.cursor(connection) as cursor:
+                version = self.next_version(cursor)
+                cursor.execute(self.sql("""
+                    INSERT INTO password_tombstones (version, id, service, username)
+                    SELECT %s, id, service, username
+                    FROM passwords
+                    WHERE service = %s AND username = %s
+                """), (version, service, username))
+                cursor.execute(
+                    self.sql("DELETE FROM passwords WHERE service = %s AND username = %s"), (service, username)
+                )
+                return cursor.rowcount
+
+    # --- Чтение ---
+
+    def fetch_all(self):
+        return self.query(f"SELECT {COLUMNS} FROM passwords ORDER BY service, username")
+
+    def fetch_page(self, limit, after=None):
+        if after is None:
+            return self.query(f"SELECT {COLUMNS} FROM passwords ORDER BY service, username LIMIT %s", (limit,))
+        service, username = after
+        return self.query(f"""
+            SELECT {COLUMNS}
+            FROM passwords
+            WHERE service > %s OR (service = %s AND username > %s)
+            ORDER BY service, username
+            LIMIT %s
+        """, (service, service, username, limit))
+
+    def iter_rows(self, batch_size=1000):
+        """Построчно отдает все записи через отдельное соединение вне пула"""
+        connection = self.open_connection(streaming=True)
+        try:
+            with self.cursor(connection) as cursor:
+                cursor.execute(f"SELECT {COLUMNS} FROM passwords ORDER BY service, username")
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+        finally:
+            connection.close()
+
+    def fetch_ids(self):
+        return [row['id'] for row in self.query("SELECT id FROM passwords")]
+
+    def fetch_account(self, service, username=None):
+        if username is None:
+            return self.query(
+                f"SELECT {COLUMNS} FROM passwords WHERE service = %s ORDER BY username", (service,)
+            )
+        return self.query(
+            f"SELECT {COLUMNS} FROM passwords WHERE service = %s AND username = %s", (service, username)
+        )
+
+    def count(self):
+        return self.query("SELECT COUNT(*) AS total FROM passwords")[0]['total']
+
+    def search_condition(self, search_term, mode):
+        """Возвращает условие WHERE и параметры для поиска"""
+        pattern = escape_like(search_term)
+        pattern = f'{pattern}%' if mode == 'prefix' else f'%{pattern}%'
+        condition = f"service LIKE %s{self.like_escape} OR username LIKE %s{self.like_escape}"
+        return condition, [pattern, pattern]
+
+    def search(self, search_term, mode='substring', limit=None):
+        condition, params = self.search_condition(search_term, mode)
+        query = f"SELECT {COLUMNS} FROM passwords WHERE {condition} ORDER BY service, username"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return self.query(query, params)
+
+    def ping(self):
+        self.query("SELECT 1 AS ok")
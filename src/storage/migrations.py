@@ -0,0 +1,170 @@
+"""Версионированные миграции схемы хранилища.
+
+Каждое хранилище перечисляет свои миграции (StorageBackend.migrations)
+по возрастанию номера. Примененные миграции записываются в таблицу
+schema_version; при запуске выполняются только недостающие. Миграции
+идемпотентны - проверяют, что изменение еще не сделано, - поэтому базы,
+созданные до появления schema_version, обновляются с первой миграции.
+
+Заполнение столбцов в больших таблицах (MigrationRunner.backfill)
+выполняется короткими транзакциями по диапазонам id, чтобы не держать
+блокировку всей таблицы и не мешать работе других клиентов.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# apply(backend, runner) выполняет миграцию; повторный вызов ничего не меняет
+Migration = namedtuple('Migration', 'version description apply')
+
+# Строк таблицы passwords (по диапазону id) в одной транзакции заполнения
+DEFAULT_BATCH_SIZE = 1000
+# Пауза между порциями заполнения, с - дает выполниться запросам других клиентов
+DEFAULT_BATCH_PAUSE = 0.01
+# Сообщать о ходе заполнения не чаще, с
+PROGRESS_INTERVAL = 1.0
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at VARCHAR(19) NOT NULL,
+        duration_ms INT NOT NULL DEFAULT 0
+    )
+"""
+
+
+def latest_version(backend):
+    """Номер последней миграции хранилища (версия актуальной схемы)"""
+    return backend.migrations[-1].version if backend.migrations else 0
+
+
+class MigrationRunner:
+    """Применяет недостающие миграции хранилища по порядку.
+
+    Миграции выполняются под блокировкой хранилища (migration_lock), так
+    что несколько одновременно запущенных клиентов не применяют их
+    параллельно. progress(message) получает сообщения о ходе миграций.
+    """
+
+    def __init__(self, backend, batch_size=DEFAULT_BATCH_SIZE, batch_pause=DEFAULT_BATCH_PAUSE, progress=None):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.progress = progress
+
+    def report(self, message):
+        logger.info(message)
+        if self.progress is not None:
+            self.progress(message)
+
+    def applied_versions(self):
+        self.backend.execute(SCHEMA_VERSION_TABLE)
+        return {row['version'] for row in self.backend.query("SELECT version FROM schema_version")}
+
+    def current_version(self):
+        """Наибольший номер примененной миграции (0 - не применялись)"""
+        return max(self.applied_versions(), default=0)
+
+    def pending(self):
+        applied = self.applied_versions()
+        return [migration for migration in self.backend.migrations if migration.version not in applied]
+
+    def history(self):
+        self.backend.execute(SCHEMA_VERSION_TABLE)
+        return self.backend.query(
+            "SELECT version, description, applied_at, duration_ms FROM schema_version ORDER BY version"
+        )
+
+    def run(self, target=None):
+        """Применяет миграции до target (по умолчанию все); возвращает примененные"""
+        applied = []
+        with self.backend.migration_lock():
+            # Другой клиент мог применить миграции, пока мы ждали блокировку
+            for migration in self.pending():
+                if target is not None and migration.version > target:
+                    break
+                self.report(f"Миграция {migration.version}: {migration.description}")
+                started = time.perf_counter()
+                migration.apply(self.backend, self)
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                self.backend.execute(
+                    f"{self.backend.insert_ignore} INTO schema_version (version, description, applied_at, duration_ms) "
+                    "VALUES (%s, %s, %s, %s)",
+                    (migration.version, migration.description,
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S'), duration_ms)
+                )
+                applied.append(migration)
+        return applied
+
+    def backfill(self, assignment, condition, description, params=()):
+        """Выполняет UPDATE passwords SET assignment WHERE condition порциями.
+
+        Каждая порция - диапазон из batch_size id в отдельной транзакции
+        (соединения работают в autocommit). Возвращает число измененных строк.
+        """
+        bounds = self.backend.query("SELECT MIN(id) AS low, MAX(id) AS high FROM passwords")[0]
+        if bounds['low'] is None:
+            return 0
+
+        low, high = bounds['low'], bounds['high']
+        statement = f"UPDATE passwords SET {assignment} WHERE id >= %s AND id < %s AND ({condition})"
+        updated = 0
+        reported = time.perf_counter()
+        for start in range(low, high + 1, self.batch_size):
+            updated += self.backend.execute(statement, (start, start + self.batch_size) + tuple(params))
+            if self.progress is not None and time.perf_counter() - reported >= PROGRESS_INTERVAL:
+                reported = time.perf_counter()
+                done = min(start + self.batch_size, high + 1) - low
+                self.progress(f"{description}: {done}/{high - low + 1} id")
+            if self.batch_pause:
+                time.sleep(self.batch_pause)
+        logger.info(f"{description}: изменено {updated} строк")
+        return updated
+
+
+def main(argv=None):
+    """Миграции схемы: python -m src.storage.migrations status|run"""
+    parser = argparse.ArgumentParser(description="Миграции схемы хранилища паролей")
+    parser.add_argument('command', choices=('status', 'run'))
+    parser.add_argument('--target', type=int, help="применить миграции только до этого номера")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="строк в одной порции заполнения")
+    args = parser.parse_args(argv)
+
+    from src.database import DatabaseManager
+
+    db = DatabaseManager()
+    if not db.pool:
+        return 1
+
+    runner = MigrationRunner(db.backend, batch_size=args.batch_size,
+                             progress=lambda message: print(f"[INFO] {message}"))
+    try:
+        if args.command == 'status':
+            for row in runner.history():
+                print(f"  {row['version']:>3}  {row['applied_at']}  {row['duration_ms']:>7} мс  {row['description']}")
+            for migration in runner.pending():
+                print(f"  {migration.version:>3}  не применена            {migration.description}")
+            print(f"[INFO] Версия схемы: {runner.current_version()} из {latest_version(db.backend)}")
+            return 0
+
+        applied = runner.run(target=args.target)
+        if applied:
+            db.invalidate_schema_cache()
+        print(f"[SUCCESS] Применено миграций: {len(applied)}, версия схемы: {runner.current_version()}")
+        return 0
+    except db.backend.errors as e:
+        print(f"[ERROR] Ошибка миграции: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+import logging
+from contextlib import contextmanager
+
+import pymysql
+
+from src.pool import ConnectionPool
+from src.storage.base import StorageBackend
+from src.storage.migrations import Migration
+
+logger = logging.getLogger(__name__)
+
+# Вставка или обновление записи по ключу unique_service_username.
+# Форма "VALUES (%s, %s, %s, %s)" позволяет pymysql в executemany
+# объединять строки в один многострочный INSERT.
+UPSERT_SQL = """
+    INSERT INTO passwords (service, username, password_text, version)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        password_text = VALUES(password_text),
+        updated_at = CURRENT_TIMESTAMP,
+        version = VALUES(version)
+"""
+
+# Длина токена парсера ngram, если сервер не сообщил @@ngram_token_size
+DEFAULT_NGRAM_TOKEN_SIZE = 2
+
+# Имя блокировки GET_LOCK на время миграций и время ее ожидания, с
+MIGRATION_LOCK = 'password_manager.migrations'
+MIGRATION_LOCK_TIMEOUT = 60
+
+
+def table_columns(backend, table='passwords'):
+    """Столбцы таблицы: {имя: тип}"""
+    rows = backend.query("""
+        SELECT COLUMN_NAME AS name, DATA_TYPE AS type
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return {row['name']: row['type'] for row in rows}
+
+
+def table_indexes(backend, table='passwords'):
+    rows = backend.query("""
+        SELECT DISTINCT INDEX_NAME AS name
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return {row['name'] for row in rows}
+
+
+# --- Миграции схемы ---
+
+def create_passwords_table(backend, runner):
+    backend.execute("""
+        CREATE TABLE IF NOT EXISTS passwords (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            service VARCHAR(255) NOT NULL,
+            username VARCHAR(255) NOT NULL,
+            password_text VARCHAR(500) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            version BIGINT NOT NULL DEFAULT 0,
+            UNIQUE KEY unique_service_username (service, username),
+            KEY idx_version (version)
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+    """)
+
+
+def add_change_tracking(backend, runner):
+    """Столбцы version/updated_at, счетчик версий и таблица удаленных
+    записей (для таблиц, созданных до появления ленты изменений)
+    """
+    if 'version' not in table_columns(backend):
+        backend.execute("""
+            ALTER TABLE passwords
+                ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                ADD COLUMN version BIGINT NOT NULL DEFAULT 0,
+                ADD INDEX idx_version (version)
+        """)
+    # Существующим записям - различные начальные версии
+    runner.backfill("version = id, updated_at = created_at", "version = 0", "Версии существующих записей")
+
+    backend.execute("""
+        CREATE TABLE IF NOT EXISTS vault_version (
+            id TINYINT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            pruned_version BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    backend.execute("""
+        INSERT IGNORE INTO vault_version (id, version)
+        SELECT 1, COALESCE(MAX(version), 0) FROM passwords
+    """)
+    backend.execute("""
+        CREATE TABLE IF NOT EXISTS password_tombstones (
+            version BIGINT PRIMARY KEY,
+            id INT NOT NULL,
+            service VARCHAR(255) NOT NULL,
+            username VARCHAR(255) NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_deleted_at (deleted_at)
+        ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    """)
+
+
+def add_indexes(backend, runner):
+    """Индексы поиска по началу имени пользователя и сортировки по дате"""
+    existing = table_indexes(backend)
+    for name, column in (('idx_username', 'username'), ('idx_created_at', 'created_at')):
+        if name not in existing:
+            # InnoDB строит вторичный индекс без блокировки записи
+            backend.execute(f"ALTER TABLE passwords ADD INDEX {name} ({column})")
+
+
+def store_ciphertext_binary(backend, runner):
+    """password_text: VARCHAR utf8mb4 -> VARBINARY.
+
+    Шифротекст Fernet - ASCII, поэтому перекодировка и сравнение по
+    правилам collation не нужны; драйвер отдает bytes, которые
+    расшифровываются без преобразования строки. MODIFY с изменением типа
+    копирует таблицу с блокировкой записи, поэтому столбец меняется так:
+    новый столбец password_blob заполняется порциями, строки, измененные
+    за это время (по version), переносятся повторно, затем под короткой
+    блокировкой LOCK TABLES столбцы переименовываются.
+    """
+    columns = table_columns(backend)
+    if columns.get('password_text') != 'varbinary':
+        if 'password_blob' not in columns:
+            # Старый столбец допускает NULL: после переименования в него не пишут
+            backend.execute("""
+                ALTER TABLE passwords
+                    ADD COLUMN password_blob VARBINARY(1024) NULL,
+                    MODIFY password_text VARCHAR(500) NULL
+            """)
+        since = backend.current_version()
+        runner.backfill("password_blob = password_text", "password_blob IS NULL", "Перенос шифротекстов")
+        version = backend.current_version()
+        backend.execute("UPDATE passwords SET password_blob = password_text WHERE version > %s", (since,))
+
+        with backend.pool.connection() as connection, backend.cursor(connection) as cursor:
+            cursor.execute("LOCK TABLES passwords WRITE")
+            try:
+                cursor.execute("UPDATE passwords SET password_blob = password_text WHERE version > %s", (version,))
+                cursor.execute("""
+                    ALTER TABLE passwords
+                        CHANGE password_text password_text_old VARCHAR(500) NULL,
+                        CHANGE password_blob password_text VARBINARY(1024) NULL
+                """)
+            finally:
+                cursor.execute("UNLOCK TABLES")
+        columns = table_columns(backend)
+
+    if 'password_text_old' in columns:
+        backend.execute("""
+            ALTER TABLE passwords
+                DROP COLUMN password_text_old,
+                MODIFY password_text VARBINARY(1024) NOT NULL
+        """)
+
+
+MIGRATIONS = (
+    Migration(1, "Таблица passwords", create_passwords_table),
+    Migration(2, "Лента изменений: version, updated_at, vault_version, password_tombstones", add_change_tracking),
+    Migration(3, "Индексы idx_username и idx_created_at", add_indexes),
+    Migration(4, "Шифротекст в VARBINARY", store_ciphertext_binary),
+)
+
+
+class MySQLBackend(StorageBackend):
+    """Хранилище на сервере MySQL (параметры из DB_CONFIG)"""
+
+    name = 'mysql'
+    errors = (pymysql.Error,)
+    disconnect_errors = (pymysql.OperationalError, pymysql.InterfaceError)
+    upsert_sql = UPSERT_SQL
+    migrations = MIGRATIONS
+
+    def __init__(self, db_config, pool_config=None):
+        super().__init__()
+        self.db_config = db_config
+        self.pool_config = pool_config or {}
+        self.ngram_token_size = DEFAULT_NGRAM_TOKEN_SIZE
+        self.ngram_stopwords = None
+        self.search_settings_loaded = False
+
+    def connect(self):
+        # Проверяем наличие всех необходимых параметров
+        required_fields = ['host', 'user', 'password', 'database']
+        for field in required_fields:
+            if field not in self.db_config:
+                raise ValueError(f"Отсутствует обязательный параметр: {field}")
+
+        pool = ConnectionPool(
+            self.open_connection,
+            max_size=self.pool_config.get('max_size', 5),
+            idle_timeout=self.pool_config.get('idle_timeout', 300),
+            health_check_interval=self.pool_config.get('health_check_interval', 30),
+            checkout_timeout=self.pool_config.get('checkout_timeout', 10),
+            disconnect_errors=self.disconnect_errors
+        )
+        with pool.connection():
+            pass
+        self.pool = pool
+        # Параметры поиска читаются при первом поиске по подстроке
+        self.search_settings_loaded = False
+
+    def open_connection(self, streaming=False):
+        """Открывает новое соединение с параметрами из конфигурации.
+
+        Соединения работают в режиме autocommit: каждый запрос сразу видит
+        актуальные данные, а соединение возвращается в пул без открытой
+        транзакции. streaming=True - небуферизованный SSDictCursor.
+        """
+        return pymysql.connect(
+            host=self.db_config['host'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            database=self.db_config['database'],
+            charset=self.db_config.get('charset', 'utf8mb4'),
+            cursorclass=pymysql.cursors.SSDictCursor if streaming else pymysql.cursors.DictCursor,
+            autocommit=True
+        )
+
+    def connection_hints(self):
+        return [
+            f"Хост: {self.db_config.get('host', 'не указан')}",
+            f"Пользователь: {self.db_config.get('user', 'не указан')}",
+            f"База данных: {self.db_config.get('database', 'не указана')}",
+            "Убедитесь, что MySQL сервер запущен",
+            f"Убедитесь, что база данных '{self.db_config.get('database')}' существует",
+        ]
+
+    def location(self):
+        return f"mysql://{self.db_config.get('user')}@{self.db_config.get('host')}/{self.db_config.get('database')}"
+
+    @contextmanager
+    def migration_lock(self):
+        """Именованная блокировка сервера на отдельном соединении"""
+        connection = self.open_connection()
+        try:
+            with self.cursor(connection) as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+                if not cursor.fetchone()['acquired']:
+                    raise pymysql.Error(f"Миграции выполняет другой клиент (ожидание {MIGRATION_LOCK_TIMEOUT} с)")
+                try:
+                    yield
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+        finally:
+            connection.close()
+
+    def load_search_settings(self):
+        """Читает параметры сервера, от которых зависит поиск по FULLTEXT-индексу.
+
+        Парсер ngram не индексирует токены, содержащие стоп-слово ('a',
+        'is', 'of'...). Новый индекс создается без стоп-слов, но индекс,
+        созданный раньше, может их пропускать, поэтому запросы, в которых
+        есть такие токены, выполняются через LIKE.
+        Вызывается при первом поиске по подстроке, а не при подключении.
+        """
+        self.search_settings_loaded = True
+        self.ngram_token_size = DEFAULT_NGRAM_TOKEN_SIZE
+        self.ngram_stopwords = None
+        try:
+            settings = self.query(
+                "SELECT @@ngram_token_size AS token_size, @@innodb_ft_server_stopword_table AS stopword_table"
+            )[0]
+            self.ngram_token_size = int(settings['token_size'])
+            if settings['stopword_table']:
+                schema, table = settings['stopword_table'].split('/', 1)
+                rows = self.query(f"SELECT value FROM `{schema}`.`{table}`")
+            else:
+                rows = self.query("SELECT value FROM INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD")
+            self.ngram_stopwords = frozenset(row['value'].lower() for row in rows)
+        except (pymysql.Error, ValueError) as e:
+            # Без этих параметров FULLTEXT-индекс для поиска не используется
+            logger.warning(f"Параметры парсера ngram недоступны: {e}")
+
+    def fulltext_usable(self, term):
+        """Можно ли отбирать кандидатов для term по FULLTEXT-индексу.
+
+        Индекс используется, только если все n-граммы term гарантированно
+        есть в индексе: term из букв и цифр (без пробелов, кавычек и
+        операторов BOOLEAN MODE), не короче токена и без стоп-слов.
+        """
+        if not self.fulltext_available:
+            return False
+        if not self.search_settings_loaded:
+            self.load_search_settings()
+        size = self.ngram_token_size
+        if self.ngram_stopwords is None:
+            return False
+        if len(term) < size or not term.isalnum():
+            return False
+        grams = {term[i:i + size].lower() for i in range(len(term) - size + 1)}
+        return not any(stopword in gram for gram in grams for stopword in self.ngram_stopwords)
+
+    def ensure_search_indexes(self):
+        """Создает FULLTEXT-индекс поиска подстроки, если его еще нет.
+
+        FULLTEXT-индекс с парсером ngram поддерживается MySQL 5.7.6+;
+        если сервер его не поддерживает, поиск подстроки работает через LIKE.
+        Индекс создается без стоп-слов (innodb_ft_enable_stopword = 0 для
+        сессии), чтобы в нем были все n-граммы. Обычные индексы создают миграции.
+        """
+        if 'ft_service_username' not in table_indexes(self):
+            try:
+                with self.pool.connection() as connection, self.cursor(connection) as cursor:
+                    cursor.execute("SET SESSION innodb_ft_enable_stopword = 0")
+                    try:
+                        cursor.execute(
+                            "ALTER TABLE passwords "
+                            "ADD FULLTEXT INDEX ft_service_username (service, username) WITH PARSER ngram"
+                        )
+                    finally:
+                        cursor.execute("SET SESSION innodb_ft_enable_stopword = DEFAULT")
+                logger.info("Создан FULLTEXT-индекс ft_service_username")
+            except pymysql.Error as e:
+                logger.warning(f"FULLTEXT-индекс недоступен, поиск подстроки через LIKE: {e}")
+                print(f"[INFO] FULLTEXT-индекс недоступен, используется LIKE: {e}")
+                self.fulltext_available = False
+                return False
+
+        self.fulltext_available = True
+        return True
+
+    def upsert(self, service, username, encrypted_password):
+        with self.pool.connection() as connection:
+            with self.transaction(connection), self.cursor(connection) as cursor:
+                version = self.next_version(cursor)
+                # Одна атомарная операция по ключу unique_service_username:
+                # MySQL возвращает 1 для вставки и 2 для обновления строки
+                return cursor.execute(UPSERT_SQL, (service, username, encrypted_password, version)) == 1
+
+    def search_condition(self, search_term, mode, fulltext=True):
+        """При наличии FULLTEXT-индекса кандидаты для поиска подстроки
+        отбираются по нему, а точное совпадение проверяется через LIKE
+        только для найденных строк. fulltext=False - только LIKE.
+        """
+        condition, params = super().search_condition(search_term, mode)
+        if fulltext and mode == 'substring' and self.fulltext_usable(search_term):
+            return (f"MATCH(service, username) AGAINST (%s IN BOOLEAN MODE) AND ({condition})",
+                    [f'"{search_term}"'] + params)
+        return condition, params
@@ -0,0 +1,208 @@
+import itertools
+import logging
+import os
+import sqlite3
+
+from src.pool import ConnectionPool
+from src.storage.base import StorageBackend
+from src.storage.migrations import Migration
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = 'passwords.sqlite3'
+
+LOCAL_TIMESTAMP = "datetime('now', 'localtime')"
+
+# Вставка или обновление записи по уникальному ключу (service, username)
+UPSERT_SQL = f"""
+    INSERT INTO passwords (service, username, password_text, version)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (service, username) DO UPDATE SET
+        password_text = excluded.password_text,
+        updated_at = {LOCAL_TIMESTAMP},
+        version = excluded.version
+"""
+
+# Счетчик имен для баз в памяти (у каждого экземпляра своя база)
+memory_names = itertools.count(1)
+
+
+def dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+# --- Миграции схемы ---
+
+def create_passwords_table(backend, runner):
+    backend.execute(f"""
+        CREATE TABLE IF NOT EXISTS passwords (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            service TEXT NOT NULL COLLATE NOCASE,
+            username TEXT NOT NULL COLLATE NOCASE,
+            password_text TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT ({LOCAL_TIMESTAMP}),
+            updated_at TEXT DEFAULT ({LOCAL_TIMESTAMP}),
+            version INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (service, username)
+        )
+    """)
+
+
+def add_change_tracking(backend, runner):
+    """Столбцы version/updated_at, счетчик версий и таблица удаленных
+    записей (для таблиц, созданных до появления ленты изменений)
+    """
+    columns = {row['name'] for row in backend.query("PRAGMA table_info(passwords)")}
+    if 'version' not in columns:
+        # ALTER TABLE в SQLite не принимает DEFAULT с выражением
+        backend.execute("ALTER TABLE passwords ADD COLUMN updated_at TEXT")
+        backend.execute("ALTER TABLE passwords ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    runner.backfill("version = id, updated_at = created_at", "version = 0", "Версии существующих записей")
+    backend.execute("CREATE INDEX IF NOT EXISTS idx_version ON passwords (version)")
+
+    backend.execute("""
+        CREATE TABLE IF NOT EXISTS vault_version (
+            id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            pruned_version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    backend.execute("""
+        INSERT OR IGNORE INTO vault_version (id, version)
+        SELECT 1, COALESCE(MAX(version), 0) FROM passwords
+    """)
+    backend.execute(f"""
+        CREATE TABLE IF NOT EXISTS password_tombstones (
+            version INTEGER PRIMARY KEY,
+            id INTEGER NOT NULL,
+            service TEXT NOT NULL,
+            username TEXT NOT NULL,
+            deleted_at TEXT NOT NULL DEFAULT ({LOCAL_TIMESTAMP})
+        )
+    """)
+    backend.execute("CREATE INDEX IF NOT EXISTS idx_deleted_at ON password_tombstones (deleted_at)")
+
+
+def add_indexes(backend, runner):
+    """Индексы поиска по началу имени пользователя и сортировки по дате"""
+    backend.execute("CREATE INDEX IF NOT EXISTS idx_username ON passwords (username)")
+    backend.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON passwords (created_at)")
+
+
+# Столбцы SQLite не имеют фиксированного типа, поэтому перехода на
+# двоичный шифротекст (миграция 4 MySQL) здесь нет
+MIGRATIONS = (
+    Migration(1, "Таблица passwords", create_passwords_table),
+    Migration(2, "Лента изменений: version, updated_at, vault_version, password_tombstones", add_change_tracking),
+    Migration(3, "Индексы idx_username и idx_created_at", add_indexes),
+)
+
+
+class SQLiteBackend(StorageBackend):
+    """Встроенное хранилище в файле SQLite - сервер не нужен.
+
+    - журнал WAL: чтение не блокируется записью, каждый поток пула
+      работает со своим соединением;
+    - соединения кэшируют подготовленные запросы (cached_statements),
+      повторные запросы не разбираются заново;
+    - service и username сравниваются и сортируются без учета регистра
+      (COLLATE NOCASE, только для латиницы);
+    - path=':memory:' - временная база в памяти, например для проверок
+      без MySQL.
+    """
+
+    name = 'sqlite'
+    errors = (sqlite3.Error,)
+    like_escape = " ESCAPE '\\'"
+    upsert_sql = UPSERT_SQL
+    now_sql = LOCAL_TIMESTAMP
+    insert_ignore = "INSERT OR IGNORE"
+    migrations = MIGRATIONS
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, pool_config=None, busy_timeout=10, cached_statements=256):
+        super().__init__()
+        self.path = path
+        self.pool_config = pool_config or {}
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.keeper = None
+
+        if path == ':memory:':
+            # Общая для всех соединений база в памяти живет, пока открыто
+            # хотя бы одно соединение
+            self.database = f'file:password_manager_{next(memory_names)}?mode=memory&cache=shared'
+            self.uri = True
+        else:
+            self.database = path
+            self.uri = False
+
+    def connect(self):
+        if self.keeper is None and self.uri:
+            self.keeper = self.open_connection()
+        pool = ConnectionPool(
+            self.open_connection,
+            max_size=self.pool_config.get('max_size', 5),
+            idle_timeout=self.pool_config.get('idle_timeout', 300),
+            # Локальный файл не разрывает соединение - ping не нужен
+            health_check_interval=float('inf'),
+            checkout_timeout=self.pool_config.get('checkout_timeout', 10)
+        )
+        with pool.connection() as connection:
+            if not self.uri:
+                mode = connection.execute("PRAGMA journal_mode=WAL").fetchone()['journal_mode']
+                if mode != 'wal':
+                    logger.warning(f"SQLite: режим WAL недоступен, используется {mode}")
+        self.pool = pool
+
+    def open_connection(self, streaming=False):
+        """Открывает соединение в режиме autocommit (транзакции - явные BEGIN)"""
+        connection = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            uri=self.uri
+        )
+        connection.row_factory = dict_factory
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def connection_hints(self):
+        return [
+            f"Файл базы данных: {self.path}",
+            "Убедитесь, что каталог существует и доступен для записи",
+        ]
+
+    def location(self):
+        # База в памяти создается заново при каждом запуске
+        return None if self.uri else f"sqlite://{os.path.abspath(self.path)}"
+
+    def sql(self, query):
+        return query.replace('%s', '?')
+
+    def begin(self, connection):
+        # Блокировка записи берется сразу, чтобы параллельные транзакции
+        # не упирались в SQLITE_BUSY при повышении блокировки
+        connection.execute("BEGIN IMMEDIATE")
+
+    def ensure_search_indexes(self):
+        """Поиск подстроки в SQLite работает через LIKE (индексы создают миграции)"""
+        self.fulltext_available = False
+        return False
+
+    def upsert(self, service, username, encrypted_password):
+        with self.pool.connection() as connection, self.transaction(connection):
+            existing = connection.execute(
+                "SELECT id FROM passwords WHERE service = ? AND username = ?", (service, username)
+            ).fetchone()
+            with self.cursor(connection) as cursor:
+                version = self.next_version(cursor)
+            connection.execute(self.sql(UPSERT_SQL), (service, username, encrypted_password, version))
+            return existing is None
+
+    def close(self):
+        super().close()
+        if self.keeper is not None:
+            self.keeper.close()
+            self.keeper = None
@@ -0,0 +1,97 @@
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundExecutor:
+    """Выполняет работу с БД и шифрованием вне главного потока Tk.
+
+    Задачи выполняются в пуле потоков, а их результаты передаются через
+    очередь, которую главный поток опрашивает через root.after. Поэтому
+    колбэки on_success/on_error всегда вызываются в главном потоке и
+    могут свободно работать с виджетами.
+    """
+
+    def __init__(self, root, max_workers=4, poll_interval=50, on_progress=None):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_progress = on_progress
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pm-worker')
+        self.results = queue.Queue()
+        self.pending = {}
+        self.closed = False
+        self.root.after(self.poll_interval, self.poll)
+
+    def submit(self, func, *args, on_success=None, on_error=None, description=None, **kwargs):
+        """Ставит func(*args, **kwargs) в очередь на выполнение в фоне.
+
+        Возвращает Future; задачу, которая еще не началась, можно отменить
+        через future.cancel().
+        """
+        if self.closed:
+            raise RuntimeError("Фоновый исполнитель уже остановлен")
+
+        description = description or getattr(func, '__name__', 'задача')
+
+        def run():
+            with metrics.span('worker.task', detail=description):
+                return func(*args, **kwargs)
+
+        future = self.pool.submit(run)
+        self.pending[future] = description
+        future.add_done_callback(lambda done: self.results.put((done, on_success, on_error)))
+        self.notify_progress()
+        return future
+
+    def poll(self):
+        """Передает результаты завершенных задач в главный поток"""
+        changed = False
+        try:
+            while True:
+                future, on_success, on_error = self.results.get_nowait()
+                self.pending.pop(future, None)
+                changed = True
+                if future.cancelled():
+                    continue
+
+                error = future.exception()
+                try:
+                    # Колбэки выполняются в главном потоке - их время
+                    # напрямую задерживает отрисовку окна
+                    with metrics.span('ui.callback'):
+                        if error is not None:
+                            if on_error is not None:
+                                on_error(error)
+                            else:
+                                logger.error(f"Ошибка в фоновой задаче: {error}")
+                        elif on_success is not None:
+                            on_success(future.result())
+                except Exception as e:
+                    logger.error(f"Ошибка в обработчике результата фоновой задачи: {e}")
+        except queue.Empty:
+            pass
+
+        if changed:
+            self.notify_progress()
+        if not self.closed:
+            self.root.after(self.poll_interval, self.poll)
+
+    def notify_progress(self):
+        """Сообщает GUI о текущих выполняющихся операциях"""
+        if self.on_progress is not None:
+            self.on_progress(list(self.pending.values()))
+
+    @property
+    def busy(self):
+        return bool(self.pending)
+
+    def shutdown(self):
+        """Отменяет ожидающие задачи и останавливает пул"""
+        self.closed = True
+        for future in list(self.pending):
+            future.cancel()
+        self.pool.shutdown(wait=False)